@@ -0,0 +1,273 @@
+"""
+SQLite-backed channel layer for running several ASGI workers on one host.
+
+InMemoryChannelLayer only delivers within the process that holds it, so a
+chat message sent to a user connected to another Daphne worker is lost.
+This layer keeps channels and group memberships in one SQLite file that
+every worker on the machine opens (in WAL mode, so polling readers do not
+block writers).
+
+Each process polls with one task per event loop, however many sockets are
+waiting: receive() registers its channel with that poller, which takes the
+next message of every waiting channel in one query on one worker thread,
+backing off from ``poll_interval`` to ``max_poll_interval`` seconds while
+they are all idle. An idle worker with hundreds of sockets therefore costs
+one small query every ``max_poll_interval`` seconds and at most one thread
+of the default executor. Messages left unread past ``expiry`` (channels of
+crashed workers, group members that never came back) are purged at most
+every ``expiry`` seconds by the next send.
+
+Deployments spanning several hosts should use channels_redis instead; the
+interface is the same, only ``CHANNEL_LAYERS`` changes::
+
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'CoFound.channel_layers.SQLiteChannelLayer',
+            'CONFIG': {'location': BASE_DIR / 'channels.sqlite3'},
+        },
+    }
+"""
+import asyncio
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_message (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_message_channel_idx ON channel_message (channel, id);
+CREATE INDEX IF NOT EXISTS channel_message_expires_idx ON channel_message (expires);
+CREATE TABLE IF NOT EXISTS channel_group (
+    name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (name, channel)
+);
+"""
+
+
+@contextmanager
+def _immediate(connection):
+    """A write transaction, taking SQLite's write lock up front"""
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """Channel layer shared by every process that opens the same ``location``"""
+
+    extensions = ['groups', 'flush']
+
+    def __init__(self, location, expiry=60, group_expiry=86400, capacity=100, channel_capacity=None,
+                 poll_interval=0.005, max_poll_interval=0.05, **kwargs):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.location = str(location)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._local = threading.local()
+        # When expired rows were last purged, by any thread of this process
+        self._purged_at = 0
+        # Per event loop: {channel: deque of futures awaiting its next message}
+        self._receivers = {}
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.location, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    # Blocking helpers, run in a worker thread
+
+    def _insert(self, connection, channel, body, now):
+        count = connection.execute(
+            'SELECT COUNT(*) FROM channel_message WHERE channel = ? AND expires > ?', (channel, now)
+        ).fetchone()[0]
+        if count >= self.get_capacity(channel):
+            return False
+        connection.execute(
+            'INSERT INTO channel_message (channel, expires, body) VALUES (?, ?, ?)',
+            (channel, now + self.expiry, body),
+        )
+        return True
+
+    def _purge(self, connection, now):
+        """Drop expired messages and group memberships, at most every ``expiry`` seconds"""
+        if now - self._purged_at < self.expiry:
+            return
+        self._purged_at = now
+        connection.execute('DELETE FROM channel_message WHERE expires <= ?', (now,))
+        connection.execute('DELETE FROM channel_group WHERE expires <= ?', (now,))
+
+    def _send(self, channel, body):
+        connection = self._connection()
+        now = time.time()
+        with _immediate(connection):
+            self._purge(connection, now)
+            return self._insert(connection, channel, body, now)
+
+    def _pop_many(self, channels):
+        """
+        ``{channel: (id, expires, body)}``, taking the oldest live message of
+        each of ``channels`` that has one
+        """
+        connection = self._connection()
+        taken = {}
+        channels = list(channels)
+        # Stay well under SQLite's limit on bound parameters
+        for start in range(0, len(channels), 500):
+            batch = channels[start:start + 500]
+            rows = connection.execute(
+                f'SELECT channel, MIN(id) FROM channel_message '
+                f'WHERE channel IN ({", ".join("?" * len(batch))}) AND expires > ? GROUP BY channel',
+                (*batch, time.time()),
+            ).fetchall()
+            for channel, message_id in rows:
+                row = connection.execute(
+                    'DELETE FROM channel_message WHERE id = ? RETURNING expires, body', (message_id,)
+                ).fetchone()
+                # None if another worker took it first; the next poll looks again
+                if row is not None:
+                    taken[channel] = (message_id, *row)
+        return taken
+
+    def _put_back(self, channel, message_id, expires, body):
+        """Return a taken message to its channel under its old id, so still ahead of later ones"""
+        self._connection().execute(
+            'INSERT INTO channel_message (id, channel, expires, body) VALUES (?, ?, ?, ?)',
+            (message_id, channel, expires, body),
+        )
+
+    def _group_add(self, group, channel):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO channel_group (name, channel, expires) VALUES (?, ?, ?)',
+            (group, channel, time.time() + self.group_expiry),
+        )
+
+    def _group_discard(self, group, channel):
+        self._connection().execute('DELETE FROM channel_group WHERE name = ? AND channel = ?', (group, channel))
+
+    def _group_send(self, group, body):
+        connection = self._connection()
+        now = time.time()
+        with _immediate(connection):
+            self._purge(connection, now)
+            channels = [row[0] for row in connection.execute(
+                'SELECT channel FROM channel_group WHERE name = ? AND expires > ?', (group, now)
+            )]
+            for channel in channels:
+                # A full channel drops the message, as with the other layers
+                self._insert(connection, channel, body, now)
+
+    def _flush(self):
+        connection = self._connection()
+        with _immediate(connection):
+            connection.execute('DELETE FROM channel_message')
+            connection.execute('DELETE FROM channel_group')
+
+    # Channel layer API
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        assert '__asgi_channel__' not in message
+        body = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+        if not await asyncio.to_thread(self._send, channel, body):
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        loop = asyncio.get_running_loop()
+        receivers = self._receivers.get(loop)
+        if receivers is None:
+            receivers = self._receivers[loop] = {}
+            loop.create_task(self._poll(loop, receivers))
+        waiter = loop.create_future()
+        receivers.setdefault(channel, deque()).append(waiter)
+        try:
+            return pickle.loads(await waiter)
+        finally:
+            waiting = receivers.get(channel)
+            if waiting is not None and waiter in waiting:
+                waiting.remove(waiter)
+                if not waiting:
+                    del receivers[channel]
+
+    async def _poll(self, loop, receivers):
+        """Deliver to this loop's receive() calls until none are left waiting"""
+        delay = self.poll_interval
+        try:
+            while receivers:
+                taken = await asyncio.to_thread(self._pop_many, list(receivers))
+                for channel, (message_id, expires, body) in taken.items():
+                    waiting = receivers.get(channel)
+                    while waiting and waiting[0].done():
+                        waiting.popleft()
+                    if waiting:
+                        waiting.popleft().set_result(body)
+                    else:
+                        # The receiver was cancelled while the message was taken: put it back
+                        await asyncio.to_thread(self._put_back, channel, message_id, expires, body)
+                    if waiting is not None and not waiting:
+                        receivers.pop(channel, None)
+                if taken:
+                    delay = self.poll_interval
+                else:
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_poll_interval)
+        finally:
+            del self._receivers[loop]
+            # Fail the waiters rather than leave them hanging if polling broke
+            for waiting in receivers.values():
+                for waiter in waiting:
+                    if not waiter.done():
+                        waiter.set_exception(RuntimeError('Channel layer poller stopped'))
+
+    async def new_channel(self, prefix='specific'):
+        return f'{prefix}.sqlite!{uuid.uuid4().hex}'
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await asyncio.to_thread(self._group_add, group, channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await asyncio.to_thread(self._group_discard, group, channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_group_name(group)
+        await asyncio.to_thread(self._group_send, group, pickle.dumps(message, pickle.HIGHEST_PROTOCOL))
+
+    async def flush(self):
+        await asyncio.to_thread(self._flush)
+
+    async def close(self):
+        # Connections belong to the threads that opened them and close with them
+        pass
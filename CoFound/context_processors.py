@@ -1,89 +1,94 @@
-import base64
+"""
+Template context for every page.
+
+Each value is lazy (SimpleLazyObject): it costs nothing until a template
+uses it and is computed at most once per request after that, so a page
+without the sidebar, such as about or terms, makes no queries here. The
+unread notification count is a column already loaded with the user; the
+sidebar's connection count comes from the cached social graph, and its
+post and profile-view counts are cached per user for
+``SIDEBAR_COUNTS_CACHE_TIMEOUT`` seconds, and dropped by the signals in
+Entrepreneurs/signals.py when the user posts, deletes a post or has their
+profile viewed.
+"""
+from functools import cache as memoize
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject
+
+SIDEBAR_CACHE_PREFIX = 'sidebar:counts:'
+
+
+def _profile_model(user):
+    from Entrepreneurs.models import EntrepreneurProfile
+    from Investors.models import InvestorProfile
+    return {'entrepreneur': EntrepreneurProfile, 'investor': InvestorProfile}.get(user.role)
+
+
+def _profile_image_url(user):
+    model = _profile_model(user)
+    if model is None:
+        return ''
+    profile = model.objects.only('image_blob').filter(user_id=user.pk).first()
+    return profile.image_url if profile else ''
+
+
+def _connections_count(user):
+    from Entrepreneurs import graph
+    if _profile_model(user) is None:
+        return 0
+    links = graph.links(user.pk)
+    return len(links.following) + len(links.collaborators)
+
+
+def _sidebar_key(user_id):
+    return f'{SIDEBAR_CACHE_PREFIX}{user_id}'
+
+
+def forget_sidebar_counts(user_id):
+    """Drop the user's cached sidebar counts, at once and again on commit (as graph.invalidate)"""
+    key = _sidebar_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def _sidebar_counts(user):
+    """``(posts, profile_views)`` for the sidebar, through the cache"""
+    model = _profile_model(user)
+    if model is None:
+        return 0, 0
+    key = _sidebar_key(user.pk)
+    counts = cache.get(key)
+    if counts is None:
+        views = model.objects.filter(user_id=user.pk).values_list('profile_views', flat=True).first()
+        counts = (user.posts.count(), views or 0)
+        cache.set(key, counts, getattr(settings, 'SIDEBAR_COUNTS_CACHE_TIMEOUT', 60))
+    return counts
+
 
 def user_profile_context(request):
     """
-    Adds the user's profile image BLOB to the template context as user_profile_image_blob.
-    Also adds unread notification count and debug info for troubleshooting.
-    Adds sidebar counts for connections, posts, and views for both investors and entrepreneurs.
+    Adds the URL of the user's profile image as user_profile_image_url, their
+    unread notification count, and the sidebar counts of connections, posts
+    and profile views.
     """
-    context = {}
-    debug_info = {}
-
-    # Check if request has user attribute and if user is authenticated
-    if hasattr(request, 'user') and request.user.is_authenticated:
-        try:
-            # Get profile image
-            if request.user.role == 'entrepreneur':
-                profile = getattr(request.user, 'entrepreneur_profile', None)
-            elif request.user.role == 'investor':
-                profile = getattr(request.user, 'investor_profile', None)
-            else:
-                profile = None
-
-            if profile and profile.image:
-                context['user_profile_image_blob'] = profile.image
-                debug_info['profile_image_type'] = str(type(profile.image))
-                debug_info['profile_image_size'] = len(profile.image) if hasattr(profile.image, '__len__') else 'N/A'
-            else:
-                context['user_profile_image_blob'] = None
-                debug_info['profile_image_type'] = 'None'
-                debug_info['profile_image_size'] = 0
-                
-            # Get unread notification count
-            try:
-                from Entrepreneurs.models import Notification
-                unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
-                context['unread_notification_count'] = unread_count
-                debug_info['unread_notifications'] = unread_count
-            except Exception as e:
-                context['unread_notification_count'] = 0
-                debug_info['notification_error'] = str(e)
-
-            # Sidebar counts
-            sidebar_connections_count = 0
-            sidebar_posts_count = 0
-            sidebar_profile_views = 0
-            try:
-                if request.user.role == 'investor':
-                    from Entrepreneurs.models import Favorite, CollaborationRequest
-                    favorites_count = Favorite.objects.filter(user=request.user).count()
-                    accepted_requests = CollaborationRequest.objects.filter(
-                        investor=request.user, status='accepted'
-                    ).count()
-                    sidebar_connections_count = favorites_count + accepted_requests
-                    sidebar_posts_count = request.user.posts.count() if hasattr(request.user, 'posts') else 0
-                    sidebar_profile_views = profile.profile_views if profile else 0
-                elif request.user.role == 'entrepreneur':
-                    from Entrepreneurs.models import Favorite, CollaborationRequest
-                    favorites_count = Favorite.objects.filter(user=request.user).count()
-                    accepted_requests = CollaborationRequest.objects.filter(
-                        entrepreneur=request.user, status='accepted'
-                    ).count()
-                    sidebar_connections_count = favorites_count + accepted_requests
-                    sidebar_posts_count = request.user.posts.count() if hasattr(request.user, 'posts') else 0
-                    sidebar_profile_views = profile.profile_views if profile else 0
-            except Exception as e:
-                debug_info['sidebar_counts_error'] = str(e)
-            context['sidebar_connections_count'] = sidebar_connections_count
-            context['sidebar_posts_count'] = sidebar_posts_count
-            context['sidebar_profile_views'] = sidebar_profile_views
-
-        except Exception as e:
-            context['user_profile_image_blob'] = None
-            context['unread_notification_count'] = 0
-            context['sidebar_connections_count'] = 0
-            context['sidebar_posts_count'] = 0
-            context['sidebar_profile_views'] = 0
-            debug_info['profile_image_error'] = str(e)
-    else:
-        context['user_profile_image_blob'] = None
-        context['unread_notification_count'] = 0
-        context['sidebar_connections_count'] = 0
-        context['sidebar_posts_count'] = 0
-        context['sidebar_profile_views'] = 0
-        debug_info['profile_image_type'] = 'Not authenticated or no user attribute'
-        debug_info['profile_image_size'] = 0
-
-    # Add debug info to context (remove/comment out in production)
-    context['profile_image_debug'] = debug_info
-    return context
\ No newline at end of file
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {
+            'user_profile_image_url': '',
+            'unread_notification_count': 0,
+            'sidebar_connections_count': 0,
+            'sidebar_posts_count': 0,
+            'sidebar_profile_views': 0,
+        }
+
+    sidebar_counts = memoize(lambda: _sidebar_counts(user))
+    return {
+        'user_profile_image_url': SimpleLazyObject(lambda: _profile_image_url(user)),
+        'unread_notification_count': user.unread_notification_count,
+        'sidebar_connections_count': SimpleLazyObject(lambda: _connections_count(user)),
+        'sidebar_posts_count': SimpleLazyObject(lambda: sidebar_counts()[0]),
+        'sidebar_profile_views': SimpleLazyObject(lambda: sidebar_counts()[1]),
+    }
@@ -0,0 +1,55 @@
+"""
+Keyset (cursor) pagination.
+
+Pages are addressed by the (timestamp, id) of the last row seen rather than
+by offset, so fetching page N costs the same as page 1 and rows inserted
+while the user scrolls do not shift or duplicate items. Cursors are opaque
+url-safe strings.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(datetime, pk)``; raises ValueError for a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {cursor!r}') from e
+
+
+def keyset_filter(queryset, field, value, pk, descending=True, pk_field='pk'):
+    """Rows strictly after ``(value, pk)`` in ``(field, pk_field)`` order"""
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'{pk_field}__{op}': pk}))
+
+
+def keyset_page(queryset, cursor=None, limit=20, field='created_at', descending=True, pk_field='pk'):
+    """
+    Return ``(items, next_cursor)`` for one page of ``queryset`` ordered by
+    ``(field, pk_field)``. ``next_cursor`` is None on the last page.
+    ``pk_field`` is the unique tie-breaker; a table that denormalizes
+    another model's ordering (e.g. a timeline of posts) can pass that
+    model's id so its cursors are interchangeable with the original's.
+    """
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = keyset_filter(queryset, field, value, pk, descending, pk_field)
+    ordering = (f'-{field}', f'-{pk_field}') if descending else (field, pk_field)
+    items = list(queryset.order_by(*ordering)[:limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), getattr(last, pk_field))
+    return items, next_cursor
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -181,10 +182,60 @@ WSGI_APPLICATION = 'CoFound.wsgi.application'
 
 ASGI_APPLICATION = 'CoFound.asgi.application'
 
-CHANNEL_LAYERS = {
-    'default': {
+# Channel layer, chosen with the CHANNEL_LAYER environment variable:
+#   memory - one process only (development, tests)
+#   sqlite - several workers on one host sharing a file (see CoFound/channel_layers.py)
+#   redis  - several hosts; needs channels-redis and REDIS_URL
+# Check delivery across workers with `manage.py chat_load_test --workers N`.
+CHANNEL_LAYER_CONFIGS = {
+    'memory': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
     },
+    'sqlite': {
+        'BACKEND': 'CoFound.channel_layers.SQLiteChannelLayer',
+        'CONFIG': {
+            'location': BASE_DIR / 'channels.sqlite3',
+        },
+    },
+    'redis': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0')],
+        },
+    },
+}
+
+CHANNEL_LAYERS = {
+    'default': CHANNEL_LAYER_CONFIGS[os.environ.get('CHANNEL_LAYER', 'memory')],
+}
+
+
+# Cache, chosen with the CACHE environment variable. Signals drop cached
+# social graph links and sidebar counts when they change, but only from the
+# cache the changing process sees, so more than one worker needs a shared one:
+#   memory - one process only (development, tests)
+#   file   - several workers on one host sharing a directory
+#   redis  - several hosts; needs the redis package and REDIS_URL
+CACHE_CONFIGS = {
+    'memory': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        # One entry per active user's graph links; the default of 300 culls constantly
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    },
+}
+
+CACHE = os.environ.get('CACHE', 'memory')
+
+CACHES = {
+    'default': CACHE_CONFIGS[CACHE],
 }
 
 
@@ -202,6 +253,51 @@ DATABASES = {
 # Custom User Model
 AUTH_USER_MODEL = 'Entrepreneurs.User'
 
+# Content-addressed media storage (see CoFound/storage.py)
+BLOB_STORE = {
+    'BACKEND': 'CoFound.storage.LocalFileSystemBlobStore',
+    'OPTIONS': {
+        'LOCATION': BASE_DIR / 'media' / 'blobs',
+    },
+}
+
+# Chat attachments are uploaded in chunks to part files here before moving
+# into the blob store (see ChatUpload in Entrepreneurs/models.py). Chunks stay
+# under DATA_UPLOAD_MAX_MEMORY_SIZE.
+CHAT_UPLOAD_DIR = BASE_DIR / 'media' / 'uploads'
+CHAT_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+CHAT_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Threads rendering resized image variants (see CoFound/variants.py)
+MEDIA_VARIANT_WORKERS = 2
+
+# Threads delivering notifications to whole audiences (see Investors/fanout.py)
+NOTIFICATION_FANOUT_WORKERS = 1
+
+# Likes, comments and messages on the same object within this many seconds share one
+# unread notification (see Investors/services.py)
+NOTIFICATION_AGGREGATION_WINDOW = 60 * 60
+
+# Seconds a user's cached follow/collaboration links live (see Entrepreneurs/graph.py).
+# They are also dropped whenever one of them changes, but with the per-process
+# memory cache other workers would not notice, so there they only live a few seconds
+SOCIAL_GRAPH_CACHE_TIMEOUT = 5 if CACHE == 'memory' else 60 * 60
+
+# Seconds a cached "may A message B" decision lives (see Entrepreneurs/privacy.py).
+# As with graph links, only a shared cache lets other workers see them dropped
+MESSAGE_PRIVACY_CACHE_TTL = 5 if CACHE == 'memory' else 60
+
+# Seconds the sidebar's post and profile-view counts are cached per user
+# (see CoFound/context_processors.py)
+SIDEBAR_COUNTS_CACHE_TIMEOUT = 60
+
+# Days read notifications, and activity log entries, are kept before
+# `manage.py archive_notifications` folds them into monthly totals (see
+# Entrepreneurs/retention.py). Activity logs are kept forever by default:
+# the dashboards count profile views from them
+NOTIFICATION_RETENTION_DAYS = 90
+ACTIVITY_LOG_RETENTION_DAYS = None
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,216 @@
+"""
+Content-addressed blob storage for uploaded media.
+
+Every blob is keyed by the SHA-256 digest of its contents, so uploading the
+same file twice stores a single copy. The backend is chosen by the
+``BLOB_STORE`` setting, in the same shape as ``CHANNEL_LAYERS``::
+
+    BLOB_STORE = {
+        'BACKEND': 'CoFound.storage.LocalFileSystemBlobStore',
+        'OPTIONS': {'LOCATION': BASE_DIR / 'media' / 'blobs'},
+    }
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+CHUNK_SIZE = 64 * 1024
+
+_KEY_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Leading bytes of the formats users actually upload; anything else is served
+# as application/octet-stream unless the uploader told us the content type.
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+    (b'\x1aE\xdf\xa3', 'video/webm'),
+]
+
+
+class BlobNotFound(Exception):
+    """Raised when a key is not present in the blob store"""
+
+
+def is_valid_key(key):
+    return bool(key) and bool(_KEY_RE.match(key))
+
+
+def guess_mime_type(head):
+    """Best-effort content type from the first bytes of a blob"""
+    head = bytes(head[:16])
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:8] == b'ftyp':
+        return 'video/mp4'
+    return 'application/octet-stream'
+
+
+def _as_stream(content):
+    """Accept bytes or any readable file object (e.g. an UploadedFile)"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return io.BytesIO(content)
+    if hasattr(content, 'seek'):
+        try:
+            content.seek(0)
+        except (OSError, ValueError):
+            pass
+    return content
+
+
+class BlobStore:
+    """Base class for blob storage backends"""
+
+    def save(self, content):
+        """Store bytes or a file object and return ``(key, size)``"""
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a binary file object positioned at the start of the blob"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def size(self, key):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def read(self, key):
+        with self.open(key) as f:
+            return f.read()
+
+
+class LocalFileSystemBlobStore(BlobStore):
+    """
+    Stores blobs under ``LOCATION/ab/cd/<sha256>``. Writes go to a temporary
+    file in the same directory and are renamed into place, so readers never
+    see a partially written blob.
+    """
+
+    def __init__(self, location, **options):
+        self.location = Path(location)
+
+    def path(self, key):
+        if not is_valid_key(key):
+            raise BlobNotFound(key)
+        return self.location / key[:2] / key[2:4] / key
+
+    def save(self, content):
+        stream = _as_stream(content)
+        self.location.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            key = digest.hexdigest()
+            final_path = self.path(key)
+            if final_path.exists():
+                # Same content already stored: deduplicate
+                os.unlink(tmp_path)
+            else:
+                final_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return key, size
+
+    def open(self, key):
+        try:
+            return open(self.path(key), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def exists(self, key):
+        try:
+            return self.path(key).exists()
+        except BlobNotFound:
+            return False
+
+    def size(self, key):
+        try:
+            return self.path(key).stat().st_size
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def delete(self, key):
+        try:
+            self.path(key).unlink()
+        except (FileNotFoundError, BlobNotFound):
+            pass
+
+
+class InMemoryBlobStore(BlobStore):
+    """Process-local store, useful for tests"""
+
+    def __init__(self, **options):
+        self.blobs = {}
+
+    def save(self, content):
+        stream = _as_stream(content)
+        data = stream.read()
+        key = hashlib.sha256(data).hexdigest()
+        self.blobs.setdefault(key, bytes(data))
+        return key, len(data)
+
+    def open(self, key):
+        try:
+            return io.BytesIO(self.blobs[key])
+        except KeyError:
+            raise BlobNotFound(key)
+
+    def exists(self, key):
+        return key in self.blobs
+
+    def size(self, key):
+        try:
+            return len(self.blobs[key])
+        except KeyError:
+            raise BlobNotFound(key)
+
+    def delete(self, key):
+        self.blobs.pop(key, None)
+
+
+@lru_cache(maxsize=None)
+def get_blob_store():
+    """Return the configured blob store (one instance per process)"""
+    config = getattr(settings, 'BLOB_STORE', None) or {
+        'BACKEND': 'CoFound.storage.LocalFileSystemBlobStore',
+        'OPTIONS': {'LOCATION': settings.BASE_DIR / 'media' / 'blobs'},
+    }
+    backend = import_string(config['BACKEND'])
+    options = {key.lower(): value for key, value in config.get('OPTIONS', {}).items()}
+    return backend(**options)
+
+
+@receiver(setting_changed)
+def _reset_blob_store(sender, setting, **kwargs):
+    if setting == 'BLOB_STORE':
+        get_blob_store.cache_clear()
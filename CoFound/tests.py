@@ -0,0 +1,536 @@
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.exceptions import ChannelFull
+from PIL import Image
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from Entrepreneurs.models import (
+    User, EntrepreneurProfile, Post, PostMedia, Message, ChatUpload, MediaBlob, MediaVariant,
+)
+from Investors.consumers import UserConsumer
+
+from . import variants
+from .channel_layers import SQLiteChannelLayer
+from .storage import BlobNotFound, InMemoryBlobStore, LocalFileSystemBlobStore, get_blob_store
+
+
+class BlobStoreTests:
+    """Behaviour every blob store backend shares; mixed into one TestCase per backend"""
+
+    data = b'%PDF-1.4 quarterly update'
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+
+    def test_save_keys_by_content_and_reads_back(self):
+        key, size = self.store.save(self.data)
+        self.assertEqual((key, size), (hashlib.sha256(self.data).hexdigest(), len(self.data)))
+        self.assertTrue(self.store.exists(key))
+        self.assertEqual(self.store.size(key), size)
+        with self.store.open(key) as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_same_content_is_stored_once(self):
+        first = self.store.save(self.data)
+        # File objects are read from the start, wherever they were left
+        upload = BytesIO(self.data)
+        upload.read(4)
+        self.assertEqual(self.store.save(upload), first)
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_missing_keys(self):
+        for key in ('0' * 64, '../etc/passwd'):
+            self.assertFalse(self.store.exists(key))
+            with self.assertRaises(BlobNotFound):
+                self.store.open(key)
+        key, _ = self.store.save(self.data)
+        self.store.delete(key)
+        self.store.delete(key)
+        self.assertFalse(self.store.exists(key))
+        with self.assertRaises(BlobNotFound):
+            self.store.size(key)
+
+
+class LocalFileSystemBlobStoreTests(BlobStoreTests, TestCase):
+    def make_store(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.location = Path(tmp.name)
+        return LocalFileSystemBlobStore(self.location)
+
+    def stored_count(self):
+        return sum(1 for path in self.location.rglob('*') if path.is_file())
+
+    def test_blobs_are_sharded_by_key_without_temporary_files(self):
+        key, _ = self.store.save(self.data)
+        self.assertEqual(self.store.path(key), self.location / key[:2] / key[2:4] / key)
+        self.assertEqual(self.stored_count(), 1)
+
+
+class InMemoryBlobStoreTests(BlobStoreTests, TestCase):
+    def make_store(self):
+        return InMemoryBlobStore()
+
+    def stored_count(self):
+        return len(self.store.blobs)
+
+
+class GetBlobStoreTests(TestCase):
+    def test_one_store_per_setting(self):
+        with override_settings(BLOB_STORE={'BACKEND': 'CoFound.storage.InMemoryBlobStore'}):
+            store = get_blob_store()
+            self.assertIsInstance(store, InMemoryBlobStore)
+            self.assertIs(get_blob_store(), store)
+        with tempfile.TemporaryDirectory() as location, override_settings(BLOB_STORE={
+            'BACKEND': 'CoFound.storage.LocalFileSystemBlobStore', 'OPTIONS': {'LOCATION': location},
+        }):
+            store = get_blob_store()
+            self.assertIsInstance(store, LocalFileSystemBlobStore)
+            self.assertEqual(store.location, Path(location))
+        self.assertIsNot(get_blob_store(), store)
+
+
+@override_settings(BLOB_STORE={'BACKEND': 'CoFound.storage.InMemoryBlobStore'})
+class MediaViewTests(TestCase):
+    """Blobs are served by hash with ETags and single byte ranges"""
+
+    data = b'%PDF-1.4 0123456789'
+
+    def setUp(self):
+        self.blob = MediaBlob.objects.store(self.data)
+        self.url = self.blob.get_absolute_url()
+        self.viewer = User.objects.create_user('viewer@example.com', 'pw', role='investor')
+        self.sender = User.objects.create_user('sender@example.com', 'pw', role='entrepreneur')
+        # A chat attachment, readable by the two people in the chat only
+        Message.objects.create(sender=self.sender, receiver=self.viewer, message_type='document', file_blob=self.blob)
+        self.client.force_login(self.viewer)
+
+    def get(self, **headers):
+        return self.client.get(self.url, headers=headers)
+
+    def test_serves_the_blob_with_a_strong_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.data)
+        self.assertEqual(response['ETag'], f'"{self.blob.sha256}"')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Length'], str(len(self.data)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_matching_etag_is_not_modified(self):
+        for tag in (f'"{self.blob.sha256}"', f'W/"{self.blob.sha256}"', f'"other", "{self.blob.sha256}"', '*'):
+            response = self.get(if_none_match=tag)
+            self.assertEqual((response.status_code, response.content), (304, b''))
+            self.assertEqual(response['ETag'], f'"{self.blob.sha256}"')
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_single_range(self):
+        response = self.get(range='bytes=9-12')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.data[9:13])
+        self.assertEqual((response['Content-Range'], response['Content-Length']), (f'bytes 9-12/{len(self.data)}', '4'))
+
+        suffix = self.get(range='bytes=-3')
+        self.assertEqual(b''.join(suffix.streaming_content), self.data[-3:])
+        # An If-Range for other content gets the whole blob
+        self.assertEqual(self.get(range='bytes=0-3', if_range='"other"').status_code, 200)
+        # Multiple ranges are not supported and are ignored
+        self.assertEqual(self.get(range='bytes=0-1,4-5').status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        for header in (f'bytes={len(self.data)}-', 'bytes=-0'):
+            response = self.get(range=header)
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response['Content-Range'], f'bytes */{len(self.data)}')
+        # Ending before it starts is not a range at all, so the whole blob is sent
+        self.assertEqual(self.get(range='bytes=5-2').status_code, 200)
+
+    def test_any_range_of_an_empty_blob_is_unsatisfiable(self):
+        empty = MediaBlob.objects.store(b'')
+        Message.objects.create(sender=self.sender, receiver=self.viewer, message_type='document', file_blob=empty)
+        for header in ('bytes=-3', 'bytes=0-', 'bytes=0-0'):
+            response = self.client.get(empty.get_absolute_url(), headers={'range': header})
+            self.assertEqual((response.status_code, response['Content-Range']), (416, 'bytes */0'))
+        self.assertEqual(self.client.get(empty.get_absolute_url()).status_code, 200)
+
+    def test_private_blobs_are_served_to_their_parties_only(self):
+        self.client.force_login(self.sender)
+        self.assertEqual(self.get().status_code, 200)
+
+        self.client.force_login(User.objects.create_user('stranger@example.com', 'pw', role='investor'))
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(if_none_match=f'"{self.blob.sha256}"').status_code, 404)
+
+        # The same bytes posted to the feed are public
+        post = Post.objects.create(author=self.sender, content='deck')
+        PostMedia.objects.create(post=post, media_type='document', file_name='deck.pdf', file_blob=self.blob)
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_requires_login_and_a_known_hash(self):
+        self.assertEqual(self.client.get(reverse('media', args=['0' * 64])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('media', args=['not-a-hash'])).status_code, 404)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+        self.client.logout()
+        self.assertRedirects(self.get(), f'{settings.LOGIN_URL}?next={self.url}', fetch_redirect_response=False)
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(BLOB_STORE={'BACKEND': 'CoFound.storage.InMemoryBlobStore'})
+@mock.patch.object(variants, '_submit')
+class MediaVariantTests(TestCase):
+    """Resized variants are queued on upload and served for ?w= once rendered"""
+
+    def setUp(self):
+        self.image = MediaBlob.objects.store(png(300, 150))
+        owner = User.objects.create_user('owner@example.com', 'pw', role='entrepreneur')
+        EntrepreneurProfile.objects.create(user=owner, image_blob=self.image)
+        self.client.force_login(User.objects.create_user('viewer@example.com', 'pw', role='investor'))
+
+    def test_schedule_queues_each_preset_width_after_commit(self, submit):
+        with self.captureOnCommitCallbacks(execute=True):
+            variants.schedule_variants(self.image, 'avatar')
+            submit.assert_not_called()
+        self.assertEqual(submit.call_args_list, [mock.call(self.image.sha256, 64, 'webp'),
+                                                 mock.call(self.image.sha256, 128, 'webp')])
+
+        submit.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            variants.schedule_variants(MediaBlob.objects.store(b'%PDF-1.4'), 'feed')
+        submit.assert_not_called()
+
+    def test_render_resizes_and_records_the_variant(self, submit):
+        variant = variants.render_variant(self.image, 128, 'jpeg')
+        self.assertEqual((variant.width, variant.format, variant.blob.mime_type), (128, 'jpeg', 'image/jpeg'))
+        with Image.open(variant.blob.open()) as resized:
+            self.assertEqual((resized.format, resized.size), ('JPEG', (128, 64)))
+        self.assertEqual(variants.render_variant(self.image, 128, 'jpeg'), variant)
+
+        # Images already narrow enough are their own variant
+        small = MediaBlob.objects.store(png(40, 40))
+        self.assertEqual(variants.render_variant(small, 64, 'webp').blob, small)
+
+    def test_select_falls_back_to_the_original_until_rendered(self, submit):
+        self.assertEqual(variants.choose_width(100), 128)
+        self.assertEqual(variants.choose_width(5000), variants.VARIANT_WIDTHS[-1])
+
+        self.assertIsNone(variants.select_variant(self.image, 100, 'image/webp,*/*'))
+        submit.assert_called_once_with(self.image.sha256, 128, 'webp')
+
+        variant = variants.render_variant(self.image, 128, 'webp')
+        self.assertEqual(variants.select_variant(self.image, 100, 'image/webp,*/*'), variant.blob)
+        # Browsers that do not take WebP get JPEG, which is not rendered yet
+        self.assertIsNone(variants.select_variant(self.image, 100, 'image/jpeg'))
+
+        document = MediaBlob.objects.store(b'%PDF-1.4')
+        self.assertEqual(variants.select_variant(document, 100), document)
+
+    def test_media_view_serves_the_variant_for_w(self, submit):
+        url = variants.sized_url(self.image.get_absolute_url(), 100)
+        pending = self.client.get(url, headers={'accept': 'image/webp'})
+        self.assertEqual((pending['ETag'], pending['Cache-Control']),
+                         (f'"{self.image.sha256}"', 'private, max-age=60'))
+        self.assertIn('Accept', pending['Vary'])
+
+        variant = variants.render_variant(self.image, 128, 'webp')
+        response = self.client.get(url, headers={'accept': 'image/webp'})
+        self.assertEqual((response['ETag'], response['Content-Type']), (f'"{variant.blob_id}"', 'image/webp'))
+        self.assertEqual(b''.join(response.streaming_content), variant.blob.read())
+        self.assertEqual(MediaVariant.objects.count(), 1)
+
+
+@override_settings(BLOB_STORE={'BACKEND': 'CoFound.storage.InMemoryBlobStore'}, CHAT_UPLOAD_CHUNK_SIZE=4)
+class ChatUploadTests(TestCase):
+    """Chat attachments arrive in resumable chunks and are sent by id"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings_override = override_settings(CHAT_UPLOAD_DIR=self.tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.sender = User.objects.create_user('sender@example.com', 'pw', role='investor')
+        self.receiver = User.objects.create_user('receiver@example.com', 'pw', role='entrepreneur')
+        self.client.force_login(self.sender)
+
+    def start(self, data=b'%PDF-1.4 hello'):
+        response = self.client.post(reverse('chat_upload_start'), {
+            'file_name': 'deck.pdf', 'file_type': 'application/pdf', 'size': len(data),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, state, offset, chunk):
+        return self.client.put(f"{state['url']}?offset={offset}", chunk, content_type='application/octet-stream')
+
+    def test_chunks_resume_and_complete_into_a_blob(self):
+        data = b'%PDF-1.4 hello'
+        state = self.start(data)
+        self.assertEqual(self.put(state, 0, data[:4]).json()['received'], 4)
+
+        # A repeated or skipped chunk is refused with the offset to resume from
+        conflict = self.put(state, 0, data[:4])
+        self.assertEqual((conflict.status_code, conflict.json()['received']), (409, 4))
+        self.assertEqual(self.put(state, 8, data[8:12]).status_code, 409)
+
+        offset = self.client.get(state['url']).json()['received']
+        while offset < len(data):
+            state = self.put(state, offset, data[offset:offset + 4]).json()
+            offset = state['received']
+        self.assertTrue(state['complete'])
+
+        upload = ChatUpload.objects.get(pk=state['id'])
+        self.assertEqual(upload.blob.read(), data)
+        self.assertFalse(upload.part_path.exists())
+
+    def test_stale_retries_never_touch_accepted_bytes(self):
+        data = b'%PDF-1.4 hello'
+        state = self.start(data)
+        stale = ChatUpload.objects.get(pk=state['id'])
+        self.put(state, 0, data[:4])
+        self.put(state, 4, data[4:8])
+
+        # A retry of the first chunk, loaded before either was accepted
+        self.assertFalse(stale.append(0, data[:4]))
+        self.assertEqual(stale.received, 8)
+        self.assertEqual(stale.part_path.read_bytes(), data[:8])
+
+    def test_failed_writes_release_the_chunk(self):
+        data = b'%PDF-1.4 hello'
+        state = self.start(data)
+        upload = ChatUpload.objects.get(pk=state['id'])
+        with mock.patch('builtins.open', side_effect=OSError('disk full')), self.assertRaises(OSError):
+            upload.append(0, data[:4])
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+        self.assertTrue(upload.append(0, data[:4]))
+
+    def test_failed_finish_can_be_retried(self):
+        data = b'%PDF-1.4 hello'
+        state = self.start(data)
+        upload = ChatUpload.objects.get(pk=state['id'])
+        self.assertTrue(upload.append(0, data[:8]))
+        with mock.patch.object(MediaBlob.objects, 'store', side_effect=OSError('store down')), \
+                self.assertRaises(OSError):
+            upload.append(8, data[8:])
+        upload.refresh_from_db()
+        self.assertEqual((upload.received, upload.is_complete), (8, False))
+
+        self.assertTrue(upload.append(8, data[8:]))
+        upload.refresh_from_db()
+        self.assertEqual(upload.blob.read(), data)
+
+    def test_uploads_are_private_to_their_uploader(self):
+        state = self.start()
+        self.client.force_login(self.receiver)
+        self.assertEqual(self.client.get(state['url']).status_code, 404)
+        self.assertEqual(self.put(state, 0, b'%PDF').status_code, 404)
+
+    def test_message_refers_to_a_finished_upload(self):
+        data = b'%PDF-1.4 hello'
+        state = self.start(data)
+
+        def send(sender, receiver):
+            consumer = UserConsumer()
+            consumer.user = sender
+            return async_to_sync(consumer.save_message)(receiver.id, '', 'document', attachment_id=state['id'])
+
+        with self.assertLogs('Investors.consumers', 'WARNING'):
+            self.assertEqual(send(self.sender, self.receiver)[3], 'Message could not be sent')
+
+        for offset in range(0, len(data), 4):
+            state = self.put(state, offset, data[offset:offset + 4]).json()
+        with self.assertLogs('Investors.consumers', 'WARNING'):
+            self.assertEqual(send(self.receiver, self.sender)[3], 'Message could not be sent')
+
+        sent, notification, unread_count, error = send(self.sender, self.receiver)
+        self.assertIsNone(error)
+        self.assertEqual((notification['type'], unread_count), ('message', 1))
+        message = Message.objects.get(id=sent['id'])
+        self.assertEqual((message.file_name, message.file_type, message.file_size), ('deck.pdf', 'application/pdf', len(data)))
+        self.assertEqual(message.file_data.read(), data)
+
+
+class SQLiteChannelLayerTests(TestCase):
+    """Layers opened on the same file deliver to each other, as separate workers would"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.location = f'{self.tmp.name}/channels.sqlite3'
+
+    def layer(self, **config):
+        return SQLiteChannelLayer(self.location, **config)
+
+    def test_group_send_reaches_channels_added_by_another_layer(self):
+        sender, listener = self.layer(), self.layer()
+
+        async def exchange():
+            first = await listener.new_channel()
+            second = await listener.new_channel()
+            await listener.group_add('chat_1_2', first)
+            await listener.group_add('chat_1_2', second)
+            await sender.group_send('chat_1_2', {'type': 'chat_message', 'content': 'hi'})
+            await listener.group_discard('chat_1_2', second)
+            await sender.group_send('chat_1_2', {'type': 'chat_message', 'content': 'again'})
+            return [await listener.receive(first), await listener.receive(first), await listener.receive(second)]
+
+        received = async_to_sync(exchange)()
+        self.assertEqual([message['content'] for message in received], ['hi', 'again', 'hi'])
+
+    def test_full_channels_refuse_direct_sends(self):
+        layer = self.layer(capacity=2)
+
+        async def overfill():
+            for n in range(3):
+                await layer.send('chat.worker', {'type': 'chat_message', 'n': n})
+
+        with self.assertRaises(ChannelFull):
+            async_to_sync(overfill)()
+
+    def test_one_poller_serves_every_waiting_channel(self):
+        sender, listener = self.layer(), self.layer()
+        polls = []
+        pop_many = listener._pop_many
+
+        def counting_pop_many(channels):
+            polls.append(len(channels))
+            return pop_many(channels)
+
+        async def exchange():
+            channels = [await listener.new_channel() for _ in range(20)]
+            receiving = asyncio.gather(*(listener.receive(channel) for channel in channels))
+            await asyncio.sleep(0.05)
+            for n, channel in enumerate(channels):
+                await sender.send(channel, {'type': 'chat_message', 'n': n})
+            received = await receiving
+            # A cancelled receive leaves its message for the next one
+            waiting = asyncio.ensure_future(listener.receive(channels[0]))
+            await asyncio.sleep(0.02)
+            waiting.cancel()
+            await sender.send(channels[0], {'type': 'chat_message', 'n': 'again'})
+            return [message['n'] for message in received], await listener.receive(channels[0])
+
+        with mock.patch.object(listener, '_pop_many', counting_pop_many):
+            received, again = async_to_sync(exchange)()
+        self.assertEqual(received, list(range(20)))
+        self.assertEqual(again['n'], 'again')
+        self.assertEqual(max(polls), 20)
+        self.assertEqual(listener._receivers, {})
+
+    def test_cancelled_receive_puts_its_message_back_in_order(self):
+        sender, listener = self.layer(), self.layer()
+        pop_many = listener._pop_many
+
+        async def exchange():
+            channel = await listener.new_channel()
+            for n in (1, 2):
+                await sender.send(channel, {'type': 'chat_message', 'n': n})
+            loop = asyncio.get_running_loop()
+            first = asyncio.ensure_future(listener.receive(channel))
+
+            def pop_then_cancel(channels):
+                taken = pop_many(channels)
+                # The receive is cancelled while its message is being taken
+                loop.call_soon_threadsafe(first.cancel)
+                return taken
+
+            with mock.patch.object(listener, '_pop_many', pop_then_cancel):
+                with self.assertRaises(asyncio.CancelledError):
+                    await first
+            return [(await listener.receive(channel))['n'] for _ in range(2)]
+
+        self.assertEqual(async_to_sync(exchange)(), [1, 2])
+
+    def test_expired_messages_are_purged(self):
+        layer = self.layer(expiry=0.05)
+        async_to_sync(layer.send)('gone.worker', {'type': 'chat_message'})
+        time.sleep(0.1)
+        async_to_sync(layer.group_send)('chat_1_2', {'type': 'chat_message'})
+        with closing(sqlite3.connect(self.location)) as connection:
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM channel_message').fetchone()[0], 0)
+
+    def test_load_test_reports_cross_process_delivery(self):
+        sqlite_layer = {'default': {
+            'BACKEND': 'CoFound.channel_layers.SQLiteChannelLayer', 'CONFIG': {'location': self.location},
+        }}
+        out = StringIO()
+        with override_settings(CHANNEL_LAYERS=sqlite_layer):
+            call_command('chat_load_test', workers=2, messages=10, stdout=out)
+        self.assertIn('All 20 deliveries arrived', out.getvalue())
+
+        memory_layer = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+        with override_settings(CHANNEL_LAYERS=memory_layer), self.assertRaises(CommandError):
+            call_command('chat_load_test', workers=2, messages=10, timeout=1, stdout=StringIO())
+
+
+class TemplateContextTests(TestCase):
+    """The shared page context only queries for what a template shows"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('founder@example.com', 'pw', role='entrepreneur')
+        EntrepreneurProfile.objects.create(user=self.user, company_name='Acme', profile_views=3)
+        Post.objects.create(author=self.user, content='hello')
+        self.client.force_login(self.user)
+
+    def sidebar_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        tables = ('profile', 'post', 'favorite', 'collaborationrequest', 'notification')
+        return response, [q['sql'] for q in queries if any(f'{table}"' in q['sql'] for table in tables)]
+
+    def test_pages_without_the_sidebar_make_no_queries(self):
+        _, queries = self.sidebar_queries(reverse('about'))
+        self.assertEqual(queries, [])
+
+    def test_sidebar_counts_are_cached(self):
+        response, first = self.sidebar_queries(reverse('investors:notifications_list'))
+        self.assertEqual(
+            [str(response.context[name]) for name in ('sidebar_posts_count', 'sidebar_profile_views')], ['1', '3']
+        )
+        _, second = self.sidebar_queries(reverse('investors:notifications_list'))
+        self.assertLess(len(second), len(first))
+        self.assertFalse([sql for sql in second if 'COUNT' in sql and '_post"' in sql])
+
+    def test_sidebar_counts_follow_posts_and_profile_views(self):
+        def counts():
+            response = self.client.get(reverse('investors:notifications_list'))
+            return [str(response.context[name]) for name in ('sidebar_posts_count', 'sidebar_profile_views')]
+
+        self.assertEqual(counts(), ['1', '3'])
+        post = Post.objects.create(author=self.user, content='again')
+        self.assertEqual(counts(), ['2', '3'])
+        profile = self.user.entrepreneur_profile
+        profile.profile_views = 4
+        profile.save(update_fields=['profile_views'])
+        self.assertEqual(counts(), ['2', '4'])
+        post.delete()
+        self.assertEqual(counts(), ['1', '4'])
@@ -19,13 +19,17 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from Investors.views import index, home
-from CoFound.views import favicon_view, about_view, contact_view, privacy_view, terms_view, cookies_view, security_view
+from CoFound.views import favicon_view, about_view, contact_view, privacy_view, terms_view, cookies_view, security_view, media_view
+from CoFound.views import chat_upload_start, chat_upload
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('favicon.ico', favicon_view, name='favicon'),  # Explicit favicon handling
     path('', index, name='index'),  # Landing page
     path('home/', home, name='home'),  # Common home page
+    path('media/<str:sha256>/', media_view, name='media'),  # Content-addressed uploads
+    path('uploads/', chat_upload_start, name='chat_upload_start'),  # Chunked chat attachments
+    path('uploads/<uuid:upload_id>/', chat_upload, name='chat_upload'),
     
     # General Pages
     path('about/', about_view, name='about'),
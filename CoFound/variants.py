@@ -0,0 +1,162 @@
+"""
+Resized renditions of uploaded images.
+
+Avatars, logos and feed images are uploaded at whatever size the user had on
+disk, but are displayed at 40-640px. After an upload the fixed widths of the
+blob's preset are rendered in a small thread pool and recorded as
+MediaVariant rows; the media view then serves ``?w=<px>`` from the smallest
+variant at least that wide. A width nobody asked for ahead of time is
+rendered lazily on first request while the original is served meanwhile.
+
+Pillow is optional: without it no variants are made and the originals are
+served as before.
+"""
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+
+from Entrepreneurs.models import MediaBlob, MediaVariant
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - Pillow is optional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_PRESETS = {
+    'avatar': (64, 128),
+    'feed': (640, 1280),
+}
+
+VARIANT_WIDTHS = sorted({width for widths in VARIANT_PRESETS.values() for width in widths})
+
+# Formats we re-encode; GIFs are left alone so animations survive
+RESIZABLE_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
+
+QUALITY = {'webp': 80, 'jpeg': 85}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def is_enabled():
+    return Image is not None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MEDIA_VARIANT_WORKERS', 2),
+                thread_name_prefix='media-variants',
+            )
+        return _executor
+
+
+def sized_url(url, width):
+    """Append the ``w`` query parameter the media view uses to pick a variant"""
+    return f'{url}?w={width}' if url else url
+
+
+def choose_width(requested):
+    """Smallest configured width that is at least ``requested`` pixels"""
+    for width in VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return VARIANT_WIDTHS[-1]
+
+
+def choose_format(accept):
+    return 'webp' if 'image/webp' in (accept or '') and features.check('webp') else 'jpeg'
+
+
+def render_variant(source, width, fmt):
+    """
+    Resize ``source`` to ``width`` pixels wide and store the result.
+    Images already narrower than ``width`` are recorded as their own variant
+    so they are never processed again.
+    """
+    with source.open() as f:
+        image = Image.open(f)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    if image.width <= width:
+        blob = source
+    else:
+        height = max(1, round(image.height * width / image.width))
+        image = image.resize((width, height), Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt.upper(), quality=QUALITY[fmt])
+        blob = MediaBlob.objects.store(buffer.getvalue(), mime_type=f'image/{fmt}')
+
+    try:
+        variant, _ = MediaVariant.objects.get_or_create(
+            source=source, width=width, format=fmt, defaults={'blob': blob}
+        )
+    except IntegrityError:
+        variant = MediaVariant.objects.get(source=source, width=width, format=fmt)
+    return variant
+
+
+def _render_job(key, width, fmt):
+    close_old_connections()
+    try:
+        source = MediaBlob.objects.get(sha256=key)
+        render_variant(source, width, fmt)
+    except Exception:
+        logger.exception('Could not render %spx %s variant of %s', width, fmt, key)
+    finally:
+        with _executor_lock:
+            _pending.discard((key, width, fmt))
+        close_old_connections()
+
+
+def _submit(key, width, fmt):
+    job = (key, width, fmt)
+    with _executor_lock:
+        if job in _pending:
+            return
+        _pending.add(job)
+    _get_executor().submit(_render_job, key, width, fmt)
+
+
+def schedule_variants(blob, preset, fmt='webp'):
+    """Queue every width of ``preset`` for ``blob`` once the upload commits"""
+    if not is_enabled() or blob.mime_type not in RESIZABLE_TYPES:
+        return
+    if fmt == 'webp' and not features.check('webp'):
+        fmt = 'jpeg'
+    for width in VARIANT_PRESETS[preset]:
+        transaction.on_commit(lambda width=width: _submit(blob.sha256, width, fmt))
+
+
+def select_variant(blob, requested_width, accept=''):
+    """
+    Return the MediaBlob to serve for ``blob`` at ``requested_width``.
+    Returns ``blob`` itself when it cannot be resized, or None when the right
+    variant is not rendered yet (it is queued and the caller should serve the
+    original without caching it for long).
+    """
+    if not is_enabled() or blob.mime_type not in RESIZABLE_TYPES:
+        return blob
+    width = choose_width(requested_width)
+    fmt = choose_format(accept)
+    variant = (
+        MediaVariant.objects.filter(source=blob, width=width, format=fmt)
+        .select_related('blob')
+        .first()
+    )
+    if variant:
+        return variant.blob
+    _submit(blob.sha256, width, fmt)
+    return None
@@ -1,9 +1,29 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse, Http404, JsonResponse
 from django.conf import settings
-from django.shortcuts import render
+from django.db.models import Q
+from django.shortcuts import get_object_or_404, render
+from django.contrib.auth.decorators import login_required
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_http_methods, require_POST, require_safe
 import os
+import re
 from pathlib import Path
 
+from CoFound.storage import CHUNK_SIZE, BlobNotFound, is_valid_key
+from CoFound.variants import select_variant
+from Entrepreneurs.models import (
+    ChatUpload, EntrepreneurProfile, MediaBlob, MediaVariant, Message, PostMedia, Startup, StartupDocument,
+)
+from Investors.models import InvestmentDocument, InvestorProfile
+
+MEDIA_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+# Served while a resized variant is still being rendered
+MEDIA_PENDING_CACHE_CONTROL = 'private, max-age=60'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
 def favicon_view(request):
     """
     Serve favicon.ico file
@@ -45,3 +65,232 @@ def cookies_view(request):
 def security_view(request):
     """Security page view"""
     return render(request, 'security.html')
+
+
+def _parse_range(header, size):
+    """
+    Parse a single-range ``Range: bytes=start-end`` header into an inclusive
+    (start, end) pair. Returns None when the header should be ignored (absent,
+    malformed, multi-range or ending before it starts) and raises ValueError
+    when it is unsatisfiable, as every range of an empty blob is.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if start and end and int(end) < int(start):
+        # Not a valid range at all (RFC 9110 14.1.1), so ignored like a malformed one
+        return None
+    if size == 0:
+        # No byte of an empty blob can be selected
+        raise ValueError(header)
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(end), size - 1) if end else size - 1
+    return start, end
+
+
+# Every kind of row that refers to a blob, as (model, blob field, who may read
+# it). None is anyone logged in: profile pictures, logos and post media are
+# shown to everyone; chat attachments and documents only to their parties.
+BLOB_REFERENCES = [
+    (PostMedia, 'file_blob', None),
+    (EntrepreneurProfile, 'image_blob', None),
+    (InvestorProfile, 'image_blob', None),
+    (Startup, 'logo_blob', None),
+    (Message, 'file_blob', ('sender', 'receiver')),
+    (ChatUpload, 'blob', ('uploader',)),
+    (StartupDocument, 'file_blob', ('startup__entrepreneur',)),
+    (InvestmentDocument, 'file_blob', ('investor',)),
+]
+
+
+def _may_read(user, sha256):
+    """
+    Whether ``user`` may read a blob: some row they can see refers to it, or,
+    for a resized variant, to its source. Blobs are shared by content, so a
+    file posted publicly stays readable even where it is also an attachment.
+    """
+    keys = [sha256, *MediaVariant.objects.filter(blob_id=sha256).values_list('source_id', flat=True)]
+    for model, field, readers in BLOB_REFERENCES:
+        rows = model.objects.filter(**{f'{field}__in': keys})
+        if readers is not None:
+            allowed = Q()
+            for reader in readers:
+                allowed |= Q(**{reader: user})
+            rows = rows.filter(allowed)
+        if rows.exists():
+            return True
+    return False
+
+
+def _iter_range(f, start, length):
+    try:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+@login_required
+@require_safe
+def media_view(request, sha256):
+    """
+    Stream a blob from the content-addressed store.
+
+    The URL is the content hash, so the bytes behind it never change: the hash
+    doubles as a strong ETag and responses may be cached indefinitely. Single
+    byte ranges are supported so browsers can seek within videos.
+
+    ``?w=<px>`` asks for an image at least that wide; the closest resized
+    variant is served instead of the original (see CoFound.variants).
+
+    Only blobs the user may see are served (_may_read); anything else is a
+    404, so a guessed hash does not even confirm the file exists.
+    """
+    if not is_valid_key(sha256) or not _may_read(request.user, sha256):
+        raise Http404
+    try:
+        blob = MediaBlob.objects.get(sha256=sha256)
+    except MediaBlob.DoesNotExist:
+        raise Http404
+
+    cache_control = MEDIA_CACHE_CONTROL
+    vary_on_accept = False
+    try:
+        width = int(request.GET.get('w', ''))
+    except ValueError:
+        width = None
+    if width and width > 0:
+        vary_on_accept = True
+        variant = select_variant(blob, width, request.headers.get('Accept', ''))
+        if variant is None:
+            cache_control = MEDIA_PENDING_CACHE_CONTROL
+        else:
+            blob = variant
+
+    etag = f'"{blob.sha256}"'
+    content_type = blob.mime_type or 'application/octet-stream'
+
+    # If-None-Match uses weak comparison, so W/"<sha>" matches as well
+    if_none_match = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        if vary_on_accept:
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+    try:
+        f = blob.open()
+    except BlobNotFound:
+        raise Http404
+    size = blob.size
+
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            f.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(_iter_range(f, start, length), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+    else:
+        response = FileResponse(f, content_type=content_type)
+        response['Content-Length'] = str(size)
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    if vary_on_accept:
+        patch_vary_headers(response, ['Accept'])
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def _upload_state(upload):
+    return {
+        'id': str(upload.pk),
+        'url': reverse('chat_upload', args=[upload.pk]),
+        'file_name': upload.file_name,
+        'file_type': upload.file_type,
+        'size': upload.size,
+        'received': upload.received,
+        'chunk_size': settings.CHAT_UPLOAD_CHUNK_SIZE,
+        'complete': upload.is_complete,
+    }
+
+
+@login_required
+@require_POST
+def chat_upload_start(request):
+    """
+    Begin a chunked chat attachment upload. POST ``file_name``, ``file_type``
+    and ``size``; the response holds the upload id and the URL to PUT chunks to.
+    """
+    file_name = request.POST.get('file_name', '').strip()
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = 0
+    if not file_name or size <= 0:
+        return JsonResponse({'error': 'file_name and a positive size are required'}, status=400)
+    if size > settings.CHAT_UPLOAD_MAX_SIZE:
+        return JsonResponse({'error': 'File is too large'}, status=413)
+
+    upload = ChatUpload.objects.create(
+        uploader=request.user,
+        file_name=file_name[:255],
+        file_type=request.POST.get('file_type', '')[:100],
+        size=size,
+    )
+    return JsonResponse(_upload_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def chat_upload(request, upload_id):
+    """
+    GET reports how much of an upload has arrived. PUT appends the request
+    body at ``?offset=``, which must equal the bytes received so far; a
+    mismatch answers 409 with the current state so the client can resume.
+    """
+    upload = get_object_or_404(ChatUpload, pk=upload_id, uploader=request.user)
+    if request.method == 'GET':
+        return JsonResponse(_upload_state(upload))
+
+    try:
+        offset = int(request.GET.get('offset', ''))
+    except ValueError:
+        return JsonResponse({'error': 'offset is required'}, status=400)
+    data = request.body
+    if not data or len(data) > settings.CHAT_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({'error': 'Chunks must be between 1 byte and chunk_size'}, status=400)
+    if not upload.append(offset, data):
+        return JsonResponse(_upload_state(upload), status=409)
+    return JsonResponse(_upload_state(upload))
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    User, Industry, EntrepreneurProfile, Startup, StartupDocument, Review, CollaborationRequest, Message, Notification, Favorite, ActivityLog, Post, PostMedia, Comment, Meeting
+    User, Industry, MediaBlob, MediaVariant, EntrepreneurProfile, Startup, StartupDocument, Review, CollaborationRequest, Message, Notification, NotificationBroadcast, NotificationArchive, Favorite, ActivityLog, ActivityLogArchive, RetentionCheckpoint, Post, PostMedia, Comment, Meeting
 )
 
 @admin.register(User)
@@ -41,9 +41,9 @@ class CollaborationRequestAdmin(admin.ModelAdmin):
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'sender', 'receiver', 'content', 'timestamp', 'is_read', 'message_type')
+    list_display = ('id', 'sender', 'receiver', 'content', 'timestamp', 'message_type')
     search_fields = ('sender__email', 'receiver__email', 'content')
-    list_filter = ('is_read', 'message_type', 'timestamp')
+    list_filter = ('message_type', 'timestamp')
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
@@ -51,6 +51,18 @@ class NotificationAdmin(admin.ModelAdmin):
     search_fields = ('user__email', 'sender__email', 'title')
     list_filter = ('notification_type', 'is_read', 'created_at')
 
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    list_display = ('id', 'sender', 'audience', 'notification_type', 'status', 'sent', 'total', 'attempts', 'updated_at')
+    search_fields = ('sender__email', 'title')
+    list_filter = ('status', 'audience', 'notification_type')
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'month', 'notification_type', 'count', 'actor_count')
+    search_fields = ('user__email',)
+    list_filter = ('notification_type', 'month')
+
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'target_user', 'created_at')
@@ -62,6 +74,16 @@ class ActivityLogAdmin(admin.ModelAdmin):
     search_fields = ('user__email', 'action')
     list_filter = ('action', 'timestamp')
 
+@admin.register(ActivityLogArchive)
+class ActivityLogArchiveAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'month', 'action', 'count')
+    search_fields = ('user__email',)
+    list_filter = ('action', 'month')
+
+@admin.register(RetentionCheckpoint)
+class RetentionCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('table', 'cutoff', 'last_id', 'archived', 'updated_at')
+
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ('id', 'author', 'content', 'created_at', 'updated_at')
@@ -91,3 +113,16 @@ class IndustryAdmin(admin.ModelAdmin):
     list_display = ('id', 'name', 'description')
     search_fields = ('name',)
     ordering = ('name',)
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'mime_type', 'size', 'created_at')
+    search_fields = ('sha256', 'mime_type')
+    list_filter = ('mime_type',)
+
+
+@admin.register(MediaVariant)
+class MediaVariantAdmin(admin.ModelAdmin):
+    list_display = ('source', 'width', 'format', 'blob', 'created_at')
+    search_fields = ('source__sha256',)
+    list_filter = ('format', 'width')
@@ -1,244 +0,0 @@
-import json
-from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
-from .models import Message, MessageSerializer, User
-from asgiref.sync import sync_to_async
-from django.db.models import Q
-
-class ChatConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.user = self.scope['user']
-        if not self.user or not self.user.is_authenticated:
-            await self.close()
-            return
-        
-        self.other_user_id = self.scope['url_route']['kwargs']['user_id']
-        self.room_name = self.get_room_name(self.user.id, self.other_user_id)
-        self.room_group_name = f'chat_{self.room_name}'
-        
-        # Strict privacy enforcement - reject connection if not allowed
-        allowed = await self.is_allowed(self.user.id, int(self.other_user_id))
-        if not allowed:
-            print(f"WebSocket connection rejected: User {self.user.id} cannot message user {self.other_user_id} due to privacy settings")
-            await self.close(code=4001, reason="Privacy violation: User not allowed to message this user")
-            return
-        
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
-        await self.accept()
-
-    async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
-
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        action = data.get('action')
-        if action == 'send_message':
-            await self.handle_send_message(data)
-        elif action == 'mark_read':
-            await self.handle_mark_read(data)
-
-    async def handle_send_message(self, data):
-        content = data.get('content', '')
-        message_type = data.get('message_type', 'text')
-        file_data = data.get('file_data')  # base64 encoded, if any
-        file_name = data.get('file_name')
-        file_type = data.get('file_type')
-        file_size = data.get('file_size')
-        receiver_id = int(self.other_user_id)
-        # Save message
-        msg = await self.create_message(
-            sender_id=self.user.id,
-            receiver_id=receiver_id,
-            content=content,
-            message_type=message_type,
-            file_data=file_data,
-            file_name=file_name,
-            file_type=file_type,
-            file_size=file_size
-        )
-        if msg is None:
-            return
-        serializer = MessageSerializer(msg)
-        # Only send to group, not echo to sender as receiver
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': serializer.data,
-                'sender_id': self.user.id
-            }
-        )
-
-    async def handle_mark_read(self, data):
-        message_ids = data.get('message_ids', [])
-        await self.mark_messages_read(message_ids)
-        # Optionally notify sender of read receipt
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'read_receipt',
-                'message_ids': message_ids,
-                'reader_id': self.user.id
-            }
-        )
-
-    async def chat_message(self, event):
-        # Only send to the correct user (sender or receiver)
-        message = event['message']
-        sender_id = event.get('sender_id')
-        # Only send to the user if they are sender or receiver
-        if self.user.id == message['sender'] or self.user.id == message['receiver']:
-            await self.send(text_data=json.dumps({
-                'type': 'chat_message',
-                'message': message
-            }))
-
-    async def read_receipt(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'read_receipt',
-            'message_ids': event['message_ids'],
-            'reader_id': event['reader_id']
-        }))
-
-    @staticmethod
-    def get_room_name(user1_id, user2_id):
-        # Deterministic room name for a pair of users
-        return '_'.join(sorted([str(user1_id), str(user2_id)]))
-
-    @database_sync_to_async
-    def is_allowed(self, user_id, other_id):
-        try:
-            user = User.objects.get(id=user_id)
-            other = User.objects.get(id=other_id)
-            if other.message_privacy == 'public':
-                return True
-            # Private: allow if either user follows the other (more permissive friendship)
-            is_friend = (user.favorites.filter(target_user=other).exists() or
-                         user.favorited_by.filter(user=other).exists())
-            return is_friend
-        except Exception:
-            return False
-
-    @database_sync_to_async
-    def create_message(self, sender_id, receiver_id, content, message_type, file_data, file_name, file_type, file_size):
-        try:
-            sender = User.objects.get(id=sender_id)
-            receiver = User.objects.get(id=receiver_id)
-            
-            # Double privacy enforcement - even though connection is protected
-            if receiver.message_privacy == 'private':
-                is_friend = (sender.favorites.filter(target_user=receiver).exists() or
-                             sender.favorited_by.filter(user=receiver).exists())
-                if not is_friend:
-                    print(f"Privacy violation blocked: User {sender_id} attempted to message private user {receiver_id}")
-                    return None
-            
-            msg = Message(
-                sender=sender,
-                receiver=receiver,
-                content=content,
-                message_type=message_type
-            )
-            if file_data:
-                import base64
-                msg.file_data = base64.b64decode(file_data)
-                msg.file_name = file_name
-                msg.file_type = file_type
-                msg.file_size = file_size or 0
-            msg.save()
-            
-            # Send notification to receiver
-            try:
-                from Investors.services import notify_message_received
-                notify_message_received(msg)
-            except Exception as e:
-                print(f"Error sending message notification: {e}")
-            
-            return msg
-        except Exception as e:
-            import traceback
-            print('Error in create_message:', e)
-            traceback.print_exc()
-            return None
-
-    @database_sync_to_async
-    def mark_messages_read(self, message_ids):
-        Message.objects.filter(id__in=message_ids, receiver=self.user).update(is_read=True)
-
-
-class NotificationConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        # Check if user is authenticated
-        if self.scope["user"].is_authenticated:
-            self.user = self.scope["user"]
-            self.room_group_name = f'notifications_{self.user.id}'
-
-            # Join room group
-            await self.channel_layer.group_add(
-                self.room_group_name,
-                self.channel_name
-            )
-
-            await self.accept()
-        else:
-            await self.close()
-
-    async def disconnect(self, close_code):
-        # Leave room group
-        if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
-
-    async def receive(self, text_data):
-        """Handle incoming messages from WebSocket"""
-        try:
-            text_data_json = json.loads(text_data)
-            message_type = text_data_json.get('type')
-            
-            if message_type == 'mark_read':
-                notification_id = text_data_json.get('notification_id')
-                await self.mark_notification_read(notification_id)
-            elif message_type == 'mark_all_read':
-                await self.mark_all_notifications_read()
-                
-        except json.JSONDecodeError:
-            pass
-
-    async def notification_message(self, event):
-        """Send notification to WebSocket"""
-        notification = event['notification']
-        
-        await self.send(text_data=json.dumps({
-            'type': 'notification',
-            'notification': notification
-        }))
-
-    async def unread_count_update(self, event):
-        """Send unread count update to WebSocket"""
-        count = event['count']
-        
-        await self.send(text_data=json.dumps({
-            'type': 'unread_count',
-            'count': count
-        }))
-
-    @database_sync_to_async
-    def mark_notification_read(self, notification_id):
-        """Mark a notification as read"""
-        from Investors.services import NotificationService
-        return NotificationService.mark_as_read(notification_id, self.user)
-
-    @database_sync_to_async
-    def mark_all_notifications_read(self):
-        """Mark all notifications as read"""
-        from Investors.services import NotificationService
-        NotificationService.mark_all_as_read(self.user)
@@ -0,0 +1,195 @@
+"""
+Social graph queries: connection checks and suggestions.
+
+A user's neighbours are the counterparts of their accepted collaboration
+requests plus the users they follow (Favorite). Each user's links are kept
+in the cache as sorted integer arrays (following, followers, collaborators
+and pending requests), loaded for any number of users with two
+``values_list`` queries and dropped by the signals in signals.py whenever
+a Favorite or CollaborationRequest touching that user changes. "Are A and
+B connected" is then a lookup in A's arrays, and walking two hops out for
+suggestions needs no queries once the snapshot is warm.
+
+Invalidation only reaches the workers that share the cache, so a
+deployment with several workers needs a shared cache backend (CACHE in
+settings.py). With the per-process memory cache the links are kept for a
+few seconds only.
+"""
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CollaborationRequest, Favorite, User
+
+# Default number of "people you may know" shown on the network pages
+MUTUAL_SUGGESTIONS = 20
+
+CACHE_PREFIX = 'graph:links:'
+
+
+class Links:
+    """One user's edges, as sorted arrays of user ids"""
+    __slots__ = ('following', 'followers', 'collaborators', 'pending')
+
+    def __init__(self, following=(), followers=(), collaborators=(), pending=()):
+        self.following = array('q', sorted(set(following)))
+        self.followers = array('q', sorted(set(followers)))
+        self.collaborators = array('q', sorted(set(collaborators)))
+        self.pending = array('q', sorted(set(pending)))
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, ids in zip(self.__slots__, state):
+            setattr(self, name, ids)
+
+    @staticmethod
+    def has(ids, user_id):
+        i = bisect_left(ids, user_id)
+        return i < len(ids) and ids[i] == user_id
+
+    def neighbours(self):
+        return set(self.following).union(self.collaborators)
+
+
+def _cache_key(user_id):
+    return f'{CACHE_PREFIX}{user_id}'
+
+
+def _load(user_ids):
+    edges = {user_id: ([], [], [], []) for user_id in user_ids}
+
+    for user_id, target_id in Favorite.objects.filter(
+        Q(user_id__in=user_ids) | Q(target_user_id__in=user_ids)
+    ).values_list('user_id', 'target_user_id'):
+        if user_id in edges:
+            edges[user_id][0].append(target_id)
+        if target_id in edges:
+            edges[target_id][1].append(user_id)
+
+    for investor_id, entrepreneur_id, status in CollaborationRequest.objects.filter(
+        Q(investor_id__in=user_ids) | Q(entrepreneur_id__in=user_ids), status__in=('accepted', 'pending')
+    ).values_list('investor_id', 'entrepreneur_id', 'status'):
+        slot = 2 if status == 'accepted' else 3
+        if investor_id in edges:
+            edges[investor_id][slot].append(entrepreneur_id)
+        if entrepreneur_id in edges:
+            edges[entrepreneur_id][slot].append(investor_id)
+
+    return {user_id: Links(*lists) for user_id, lists in edges.items()}
+
+
+def links_many(user_ids):
+    """``{user_id: Links}`` for ``user_ids``, reading through the cache"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    cached = cache.get_many([_cache_key(user_id) for user_id in user_ids])
+    found = {user_id: cached[_cache_key(user_id)] for user_id in user_ids if _cache_key(user_id) in cached}
+    missing = user_ids - found.keys()
+    if missing:
+        loaded = _load(missing)
+        cache.set_many(
+            {_cache_key(user_id): user_links for user_id, user_links in loaded.items()},
+            getattr(settings, 'SOCIAL_GRAPH_CACHE_TIMEOUT', 5),
+        )
+        found.update(loaded)
+    return found
+
+
+def links(user_id):
+    return links_many([user_id])[user_id]
+
+
+def invalidate(*user_ids):
+    """
+    Forget the cached links of ``user_ids``. Done at once, for reads later in
+    the same transaction, and again on commit, so a snapshot rebuilt from
+    the old rows by a concurrent request does not outlive the change.
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def is_following(user_id, target_id):
+    return Links.has(links(user_id).following, target_id)
+
+
+def are_friends(user_id, other_id):
+    """Either user follows the other (the messaging privacy rule)"""
+    mine = links(user_id)
+    return Links.has(mine.following, other_id) or Links.has(mine.followers, other_id)
+
+
+def connection_status(user_id, other_id):
+    """'accepted', 'pending' or 'none', as shown on connect buttons"""
+    mine = links(user_id)
+    if Links.has(mine.following, other_id) or Links.has(mine.collaborators, other_id):
+        return 'accepted'
+    if Links.has(mine.pending, other_id):
+        return 'pending'
+    return 'none'
+
+
+def follower_ids(user_id):
+    return set(links(user_id).followers)
+
+
+def mutual_ids(user_id, other_id):
+    """Neighbours the two users have in common"""
+    both = links_many([user_id, other_id])
+    return (both[user_id].neighbours() & both[other_id].neighbours()) - {user_id, other_id}
+
+
+def adjacency(user_ids):
+    """Return ``{user_id: set(neighbour ids)}`` for each of ``user_ids``"""
+    graph = {}
+    for user_id, user_links in links_many(user_ids).items():
+        neighbours = user_links.neighbours()
+        neighbours.discard(user_id)
+        graph[user_id] = neighbours
+    return graph
+
+
+def neighbor_ids(user_id):
+    return adjacency([user_id])[user_id]
+
+
+def rank_mutuals(user_id, k=None, neighbors=None):
+    """
+    Second-degree users ranked by how many of ``user_id``'s neighbours link
+    to them, as ``[(candidate_id, mutual_count), ...]``. Existing neighbours
+    and the user themselves are never suggested.
+    """
+    if neighbors is None:
+        neighbors = neighbor_ids(user_id)
+    counts = Counter()
+    for linked in adjacency(neighbors).values():
+        counts.update(linked)
+    for excluded in set(neighbors) | {user_id}:
+        counts.pop(excluded, None)
+
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:k] if k else ranked
+
+
+def suggest_mutuals(user, k=MUTUAL_SUGGESTIONS, neighbors=None):
+    """Top ``k`` suggestions as User objects, each with a ``mutual_count``"""
+    ranked = rank_mutuals(user.id, k, neighbors)
+    users = User.objects.select_related('entrepreneur_profile', 'investor_profile').in_bulk(
+        [candidate_id for candidate_id, _ in ranked]
+    )
+    suggestions = []
+    for candidate_id, mutual_count in ranked:
+        candidate = users.get(candidate_id)
+        if candidate is not None:
+            candidate.mutual_count = mutual_count
+            suggestions.append(candidate)
+    return suggestions
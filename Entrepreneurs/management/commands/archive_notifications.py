@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Entrepreneurs import retention
+from Entrepreneurs.models import RetentionCheckpoint
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold read notifications (and activity log entries, if ACTIVITY_LOG_RETENTION_DAYS is set) older '
+        'than their retention period into monthly totals and delete them in batches. An interrupted run '
+        'is resumed from its checkpoint. Meant to run daily from cron or another scheduler'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', action='append', dest='tables', choices=sorted(retention.TABLES),
+                            help='Only archive this table (may be repeated; default: every table with a '
+                                 'retention period set)')
+        parser.add_argument('--days', type=int,
+                            help="Archive rows older than this many days instead of the table's setting")
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE,
+                            help='Rows archived and deleted per transaction (default: %(default)s)')
+        parser.add_argument('--max-rows', type=int,
+                            help='Stop after about this many rows per table; the next run carries on')
+        parser.add_argument('--restart', action='store_true',
+                            help='Drop the checkpoint of an interrupted run and start over with a new cutoff')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be archived without changing it')
+
+    def handle(self, *args, **options):
+        tables = options['tables'] or retention.due()
+        if options['restart'] and not options['dry_run']:
+            RetentionCheckpoint.objects.filter(table__in=tables).delete()
+
+        for name in tables:
+            try:
+                if options['dry_run']:
+                    self.preview(name, options['days'])
+                else:
+                    self.run(name, options)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+    def preview(self, name, days):
+        counts = retention.preview(name, days)
+        for category, n in sorted(counts.items()):
+            self.stdout.write(f'  {category}: {n}')
+        self.stdout.write(self.style.WARNING(
+            f'{name}: {sum(counts.values())} rows would be archived (dry run, nothing changed)'
+        ))
+
+    def run(self, name, options):
+        def progress(archived, seconds):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{name}: {archived} archived ({archived / max(seconds, 1e-6):.0f} rows/sec)')
+
+        archived, seconds, finished = retention.run(
+            name, days=options['days'], batch_size=options['batch_size'], max_rows=options['max_rows'],
+            progress=progress,
+        )
+        rate = archived / seconds if seconds else 0
+        status = 'done' if finished else 'stopped at --max-rows, will resume'
+        self.stdout.write(self.style.SUCCESS(
+            f'{name}: archived {archived} rows in {seconds:.2f}s ({rate:.0f} rows/sec), {status}'
+        ))
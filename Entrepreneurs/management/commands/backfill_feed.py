@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from Entrepreneurs import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild precomputed home timelines (FeedEntry rows) from follows and accepted collaborations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only rebuild this user id (may be repeated)')
+        parser.add_argument('--limit', type=int, default=timeline.FOLLOW_BACKFILL,
+                            help='Posts copied per followed author (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['user_ids']:
+            users = users.filter(pk__in=options['user_ids'])
+
+        total = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            total += timeline.rebuild(user_id, limit=options['limit'])
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {total} feed entries for {users.count()} users'))
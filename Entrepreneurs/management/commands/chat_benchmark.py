@@ -0,0 +1,127 @@
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from Investors.consumers import UserConsumer
+
+User = get_user_model()
+
+
+class Socket:
+    """One in-process ws/user/ connection driven without a server"""
+
+    def __init__(self, user):
+        scope = {'type': 'websocket', 'path': '/ws/user/', 'headers': [], 'subprotocols': [], 'user': user}
+        self.communicator = ApplicationCommunicator(UserConsumer.as_asgi(), scope)
+
+    async def connect(self):
+        await self.communicator.send_input({'type': 'websocket.connect'})
+        if (await self.communicator.receive_output(5))['type'] != 'websocket.accept':
+            raise CommandError('The consumer refused the connection')
+
+    async def send(self, text):
+        await self.communicator.send_input({'type': 'websocket.receive', 'text': text})
+
+    async def receive(self, timeout):
+        return await self.communicator.receive_output(timeout)
+
+    async def disconnect(self):
+        if self.communicator.future.done():
+            # A receive that timed out has already stopped the consumer
+            return
+        await self.communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.communicator.wait(5)
+
+
+class Command(BaseCommand):
+    help = (
+        'Send chat messages through UserConsumer in this process, from several sockets to one '
+        'receiving socket, and report messages/sec and send-to-delivery latency for one worker. '
+        'Writes to the configured database with throwaway users, which are deleted afterwards'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--senders', type=int, default=4, help='Sending sockets (default: %(default)s)')
+        parser.add_argument('--messages', type=int, default=100,
+                            help='Messages each sender sends (default: %(default)s)')
+        parser.add_argument('--timeout', type=float, default=60.0,
+                            help='Seconds to wait for every delivery (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        senders, count = options['senders'], options['messages']
+        run = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(f'chat-benchmark-{run}-{n}@example.invalid', None, role='investor')
+            for n in range(senders + 1)
+        ]
+        try:
+            elapsed, latencies = asyncio.run(self.run(users[0], users[1:], count, options['timeout']))
+        finally:
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+        expected = senders * count
+        self.stdout.write(f'Senders: {senders}, messages each: {count}')
+        self.stdout.write(f'Delivered {len(latencies)} of {expected} in {elapsed:.2f}s '
+                          f'({len(latencies) / elapsed:.0f} messages/sec)')
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f'Latency: p50 {statistics.median(latencies) * 1000:.1f}ms, '
+                f'p95 {p95 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms'
+            )
+        if len(latencies) < expected:
+            raise CommandError(f'Only {len(latencies)} of {expected} messages reached the receiver')
+
+    async def run(self, receiver, senders, count, timeout):
+        inbox = Socket(receiver)
+        outboxes = [Socket(sender) for sender in senders]
+        for socket in [inbox, *outboxes]:
+            await socket.connect()
+
+        sent_at = {}
+        latencies = []
+
+        async def send_all(socket, n):
+            for seq in range(count):
+                content = f'{n}:{seq}'
+                sent_at[content] = time.perf_counter()
+                await socket.send(json.dumps({'action': 'send_message', 'to': receiver.id, 'content': content}))
+                # Let the consumer pick the frame up, as a real client's pacing would
+                await asyncio.sleep(0)
+
+        async def drain(socket):
+            # Senders get an echo of each message; keep their output queues empty
+            while True:
+                await socket.receive(None)
+
+        started = time.perf_counter()
+        drains = [asyncio.ensure_future(drain(socket)) for socket in outboxes]
+        sends = asyncio.gather(*(send_all(socket, n) for n, socket in enumerate(outboxes)))
+        deadline = started + timeout
+        try:
+            while len(latencies) < len(senders) * count:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    output = await inbox.receive(remaining)
+                except asyncio.TimeoutError:
+                    break
+                frame = json.loads(output.get('text') or '{}')
+                if frame.get('type') == 'chat_message':
+                    latencies.append(time.perf_counter() - sent_at[frame['message']['content']])
+            elapsed = time.perf_counter() - started
+            await sends
+        finally:
+            for task in drains:
+                task.cancel()
+            for socket in [inbox, *outboxes]:
+                await socket.disconnect()
+        return elapsed, latencies
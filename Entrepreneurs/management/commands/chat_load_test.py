@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import queue
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+def _make_layer(config):
+    return import_string(config['BACKEND'])(**config.get('CONFIG', {}))
+
+
+async def _listen(config, group, expected, timeout, ready, results):
+    layer = _make_layer(config)
+    channel = await layer.new_channel()
+    await layer.group_add(group, channel)
+    ready.put(channel)
+
+    latencies = []
+    deadline = time.monotonic() + timeout
+    while len(latencies) < expected:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            message = await asyncio.wait_for(layer.receive(channel), remaining)
+        except asyncio.TimeoutError:
+            break
+        latencies.append(time.time() - message['sent_at'])
+
+    await layer.group_discard(group, channel)
+    results.put(latencies)
+
+
+def _worker(config, group, expected, timeout, ready, results):
+    # Runs in a fresh process, so it builds its own layer from the config alone
+    asyncio.run(_listen(config, group, expected, timeout, ready, results))
+
+
+class Command(BaseCommand):
+    help = (
+        'Start several worker processes that each join one channel-layer group, '
+        'send chat-sized messages to the group from this process and report how many reached every worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Listening processes (default: %(default)s)')
+        parser.add_argument('--messages', type=int, default=50,
+                            help='Messages sent to the group (default: %(default)s)')
+        parser.add_argument('--timeout', type=float, default=15.0,
+                            help='Seconds to wait for workers and deliveries (default: %(default)s)')
+        parser.add_argument('--layer', default='default', help='CHANNEL_LAYERS alias to test (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        workers, count, timeout = options['workers'], options['messages'], options['timeout']
+        try:
+            config = settings.CHANNEL_LAYERS[options['layer']]
+        except KeyError:
+            raise CommandError(f"No channel layer {options['layer']!r} in CHANNEL_LAYERS")
+        self.stdout.write(f"Channel layer: {config['BACKEND']}")
+
+        context = multiprocessing.get_context('spawn')
+        ready, results = context.Queue(), context.Queue()
+        group = f'loadtest.{uuid.uuid4().hex}'
+        processes = [
+            context.Process(target=_worker, args=(config, group, count, timeout, ready, results), daemon=True)
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        try:
+            try:
+                for _ in range(workers):
+                    ready.get(timeout=timeout)
+            except queue.Empty:
+                raise CommandError('Workers did not start listening in time')
+
+            started = time.monotonic()
+            asyncio.run(self.send_all(config, group, count))
+            sent_in = time.monotonic() - started
+
+            latencies = []
+            delivered = []
+            for _ in range(workers):
+                try:
+                    received = results.get(timeout=timeout + 5)
+                except queue.Empty:
+                    received = []
+                delivered.append(len(received))
+                latencies.extend(received)
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+
+        expected = workers * count
+        self.stdout.write(f'Sent {count} messages to {workers} workers in {sent_in:.2f}s')
+        self.stdout.write(f"Delivered per worker: {', '.join(map(str, delivered))}")
+        if latencies:
+            latencies.sort()
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f'Latency: p50 {statistics.median(latencies) * 1000:.1f}ms, '
+                f'p95 {p95 * 1000:.1f}ms, max {latencies[-1] * 1000:.1f}ms'
+            )
+
+        total = sum(delivered)
+        if total < expected:
+            raise CommandError(
+                f'Only {total} of {expected} deliveries arrived; this layer does not reach every worker process'
+            )
+        self.stdout.write(self.style.SUCCESS(f'All {expected} deliveries arrived'))
+
+    @staticmethod
+    async def send_all(config, group, count):
+        layer = _make_layer(config)
+        for seq in range(count):
+            await layer.group_send(group, {'type': 'chat.message', 'seq': seq, 'sent_at': time.time()})
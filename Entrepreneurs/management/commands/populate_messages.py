@@ -1,10 +1,10 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from Entrepreneurs.models import Message
+from Entrepreneurs.models import Conversation, Message
 import random
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import F, Q, Sum
 
 User = get_user_model()
 
@@ -98,7 +98,6 @@ class Command(BaseCommand):
                     receiver=entrepreneur,
                     content=initial_message,
                     timestamp=message_date,
-                    is_read=random.choice([True, False]),
                     message_type='text'
                 )
                 messages_created += 1
@@ -113,7 +112,6 @@ class Command(BaseCommand):
                         receiver=investor,
                         content=response_message,
                         timestamp=response_date,
-                        is_read=random.choice([True, False]),
                         message_type='text'
                     )
                     messages_created += 1
@@ -128,7 +126,6 @@ class Command(BaseCommand):
                             receiver=entrepreneur,
                             content=follow_up_message,
                             timestamp=follow_up_date,
-                            is_read=random.choice([True, False]),
                             message_type='text'
                         )
                         messages_created += 1
@@ -143,7 +140,6 @@ class Command(BaseCommand):
                                 receiver=investor,
                                 content=final_response,
                                 timestamp=final_response_date,
-                                is_read=random.choice([True, False]),
                                 message_type='text'
                             )
                             messages_created += 1
@@ -162,7 +158,6 @@ class Command(BaseCommand):
                         receiver=receiver,
                         content=conversation_message,
                         timestamp=conversation_date,
-                        is_read=random.choice([True, False]),
                         message_type='text'
                     )
                     messages_created += 1
@@ -188,7 +183,6 @@ class Command(BaseCommand):
                         receiver=investor,
                         content=initial_message,
                         timestamp=message_date,
-                        is_read=random.choice([True, False]),
                         message_type='text'
                     )
                     messages_created += 1
@@ -203,7 +197,6 @@ class Command(BaseCommand):
                             receiver=entrepreneur,
                             content=response_message,
                             timestamp=response_date,
-                            is_read=random.choice([True, False]),
                             message_type='text'
                         )
                         messages_created += 1
@@ -214,10 +207,21 @@ class Command(BaseCommand):
             )
         )
         
+        # Each side has read its conversations up to a random point
+        for conversation in Conversation.objects.all():
+            for reader_id, other_id in ((conversation.user_a_id, conversation.user_b_id),
+                                        (conversation.user_b_id, conversation.user_a_id)):
+                received = list(Message.objects.filter(sender_id=other_id, receiver_id=reader_id)
+                                .values_list('id', flat=True))
+                if received and random.random() < 0.5:
+                    Conversation.objects.mark_read(reader_id, other_id, random.choice(received))
+
         # Display statistics
         total_messages = Message.objects.count()
-        unread_messages = Message.objects.filter(is_read=False).count()
-        read_messages = Message.objects.filter(is_read=True).count()
+        unread_messages = Conversation.objects.aggregate(
+            total=Sum(F('unread_a') + F('unread_b'))
+        )['total'] or 0
+        read_messages = total_messages - unread_messages
         
         self.stdout.write(f'Total messages: {total_messages}')
         self.stdout.write(f'Read messages: {read_messages}')
@@ -228,6 +232,5 @@ class Command(BaseCommand):
         for message in Message.objects.all()[:5]:
             self.stdout.write(
                 f'  {message.sender.get_full_name()} → {message.receiver.get_full_name()}: '
-                f'{message.content[:50]}{"..." if len(message.content) > 50 else ""} '
-                f'({"read" if message.is_read else "unread"})'
+                f'{message.content[:50]}{"..." if len(message.content) > 50 else ""}'
             )
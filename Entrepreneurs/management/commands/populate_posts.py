@@ -1,3 +1,4 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from Entrepreneurs.models import Post, Comment, PostMedia
@@ -139,6 +140,9 @@ class Command(BaseCommand):
             )
         )
         
+        # Likes, saves and comments above bypass the views that keep the counters
+        call_command('reconcile_post_counters', stdout=self.stdout)
+
         # Display some statistics
         total_posts = Post.objects.count()
         total_comments = Comment.objects.count()
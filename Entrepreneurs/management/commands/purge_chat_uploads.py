@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Entrepreneurs.models import ChatUpload
+
+
+class Command(BaseCommand):
+    help = 'Delete chat attachment uploads that were abandoned part-way, along with their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Only purge uploads started more than this many hours ago (default: %(default)s)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = ChatUpload.objects.filter(blob__isnull=True, created_at__lt=cutoff)
+
+        purged = 0
+        for upload in stale.iterator():
+            upload.discard_part()
+            purged += 1
+        stale.delete()
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} unfinished chat uploads'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from Entrepreneurs import search
+
+
+class Command(BaseCommand):
+    help = 'Rewrite every document of the people search index from the user, profile and startup tables'
+
+    def handle(self, *args, **options):
+        if not search.enabled():
+            self.stdout.write(self.style.WARNING('The search index needs SQLite FTS5; nothing to rebuild'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'Indexed {search.rebuild()} users'))
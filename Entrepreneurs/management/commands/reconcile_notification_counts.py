@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from Entrepreneurs.models import Notification, User
+
+
+class Command(BaseCommand):
+    help = 'Recount unread_notification_count on users and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted users without fixing them')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        unread = Notification.objects.filter(user=OuterRef('pk'), is_read=False).values('user').annotate(
+            n=Count('*')
+        ).values('n')
+        drifted = User.objects.annotate(actual=Coalesce(Subquery(unread), 0)).exclude(
+            unread_notification_count=F('actual')
+        ).order_by('pk').only('pk', 'email', 'unread_notification_count')
+
+        fixed = []
+        for user in drifted.iterator(chunk_size=options['batch_size']):
+            self.stdout.write(f'User {user.pk}: unread_notification_count {user.unread_notification_count} -> {user.actual}')
+            user.unread_notification_count = user.actual
+            fixed.append(user)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(fixed)} users have drifted counts (dry run, nothing saved)'))
+            return
+
+        User.objects.bulk_update(fixed, ['unread_notification_count'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired unread notification counts on {len(fixed)} users'))
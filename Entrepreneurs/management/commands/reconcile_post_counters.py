@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from Entrepreneurs.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recount like_count, comment_count and save_count on posts and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted posts without fixing them')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        drift = Q()
+        for counter in Post.COUNTERS:
+            drift |= ~Q(**{counter: F(f'actual_{counter}')})
+        drifted = Post.objects.with_actual_counts().filter(drift).order_by('pk')
+
+        fixed = []
+        for post in drifted.iterator(chunk_size=options['batch_size']):
+            changes = []
+            for counter in Post.COUNTERS:
+                actual = getattr(post, f'actual_{counter}')
+                if getattr(post, counter) != actual:
+                    changes.append(f'{counter} {getattr(post, counter)} -> {actual}')
+                    setattr(post, counter, actual)
+            self.stdout.write(f'Post {post.pk}: ' + ', '.join(changes))
+            fixed.append(post)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(fixed)} posts have drifted counters (dry run, nothing saved)'))
+            return
+
+        Post.objects.bulk_update(fixed, Post.COUNTERS, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Repaired counters on {len(fixed)} posts'))
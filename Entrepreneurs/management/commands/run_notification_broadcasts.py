@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Entrepreneurs.models import NotificationBroadcast
+from Investors import fanout
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver notification broadcasts that are still pending, or were left running by a worker '
+        'that stopped, in this process'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale', type=int, default=10,
+                            help='Resume running broadcasts with no progress for this many minutes '
+                                 '(default: %(default)s)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['stale'])
+        resumed = NotificationBroadcast.objects.filter(status='running', updated_at__lt=cutoff).update(
+            status='pending'
+        )
+        if resumed:
+            self.stdout.write(f'Resuming {resumed} stalled broadcasts')
+
+        pending = list(NotificationBroadcast.objects.filter(status='pending').order_by('pk').values_list('pk', flat=True))
+        for job_id in pending:
+            if not fanout.run(job_id):
+                continue
+            job = NotificationBroadcast.objects.get(pk=job_id)
+            self.stdout.write(f'Broadcast {job.pk}: {job.status}, {job.sent}/{job.total} sent'
+                              + (f' ({job.error})' if job.error else ''))
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {len(pending)} notification broadcasts'))
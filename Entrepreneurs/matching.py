@@ -0,0 +1,73 @@
+"""
+Industry matching between investors and entrepreneurs.
+
+Entrepreneurs list their ``industries`` and investors their
+``preferred_industries`` as comma-separated text. Each profile's terms are
+mirrored into ProfileIndustry rows whenever it is saved, so "who on the
+other side shares my industries" is one indexed query whose overlap score
+(the number of shared terms) is counted by the database.
+"""
+from django.db.models import Count
+
+from .models import ProfileIndustry, User
+
+# Default number of same-industry suggestions shown on the network pages
+INDUSTRY_SUGGESTIONS = 20
+
+# Which profile field each side's terms come from
+PROFILE_FIELDS = {
+    'entrepreneur': 'industries',
+    'investor': 'preferred_industries',
+}
+
+OTHER_SIDE = {'entrepreneur': 'investor', 'investor': 'entrepreneur'}
+
+
+def split_terms(value):
+    if not value:
+        return set()
+    return {term.strip().lower()[:100] for term in value.split(',') if term.strip()}
+
+
+def sync_profile(user_id, side, value):
+    """Make ``user_id``'s ProfileIndustry rows for ``side`` match ``value``"""
+    terms = split_terms(value)
+    existing = set(ProfileIndustry.objects.filter(user_id=user_id, side=side).values_list('term', flat=True))
+    if existing - terms:
+        ProfileIndustry.objects.filter(user_id=user_id, side=side, term__in=existing - terms).delete()
+    if terms - existing:
+        ProfileIndustry.objects.bulk_create(
+            [ProfileIndustry(user_id=user_id, side=side, term=term) for term in terms - existing],
+            ignore_conflicts=True,
+        )
+
+
+def industry_matches(user, profile, exclude=(), k=INDUSTRY_SUGGESTIONS):
+    """
+    Users on the other side of ``user``'s role whose industries overlap
+    ``profile``'s, best overlap first, each with an ``industry_overlap``.
+    ``exclude`` holds user ids never to suggest (``user`` is always left out).
+    """
+    side = 'investor' if user.role == 'investor' else 'entrepreneur'
+    terms = split_terms(getattr(profile, PROFILE_FIELDS[side], ''))
+    if not terms:
+        return []
+
+    ranked = list(
+        ProfileIndustry.objects.filter(side=OTHER_SIDE[side], term__in=terms)
+        .exclude(user_id__in=set(exclude) | {user.id})
+        .values('user_id')
+        .annotate(overlap=Count('term'))
+        .order_by('-overlap', 'user_id')
+        .values_list('user_id', 'overlap')[:k]
+    )
+    users = User.objects.select_related('entrepreneur_profile', 'investor_profile').in_bulk(
+        [user_id for user_id, _ in ranked]
+    )
+    matches = []
+    for user_id, overlap in ranked:
+        match = users.get(user_id)
+        if match is not None:
+            match.industry_overlap = overlap
+            matches.append(match)
+    return matches
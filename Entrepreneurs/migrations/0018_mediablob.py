@@ -0,0 +1,111 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from CoFound.storage import get_blob_store, guess_mime_type
+
+# (model, old BinaryField, new MediaBlob foreign key, content-type field)
+BLOB_COLUMNS = [
+    ('entrepreneurprofile', 'image', 'image_blob', None),
+    ('startup', 'logo', 'logo_blob', None),
+    ('startupdocument', 'file_data', 'file_blob', 'file_type'),
+    ('message', 'file_data', 'file_blob', 'file_type'),
+    ('postmedia', 'file_data', 'file_blob', 'file_type'),
+]
+
+
+def move_blobs_to_store(apps, schema_editor):
+    MediaBlob = apps.get_model('Entrepreneurs', 'MediaBlob')
+    store = get_blob_store()
+    for model_name, old_field, new_field, mime_field in BLOB_COLUMNS:
+        Model = apps.get_model('Entrepreneurs', model_name)
+        rows = Model.objects.exclude(**{f'{old_field}__isnull': True}).values_list('pk', flat=True)
+        for pk in rows.iterator():
+            # Load one row's bytes at a time to keep memory flat
+            fields = [old_field, mime_field] if mime_field else [old_field]
+            row = Model.objects.filter(pk=pk).values_list(*fields).first()
+            if not row or not row[0]:
+                continue
+            data = bytes(row[0])
+            mime_type = row[1] if mime_field else ''
+            key, size = store.save(data)
+            MediaBlob.objects.get_or_create(
+                sha256=key,
+                defaults={'size': size, 'mime_type': mime_type or guess_mime_type(data)},
+            )
+            Model.objects.filter(pk=pk).update(**{f'{new_field}_id': key})
+
+
+def restore_blobs_from_store(apps, schema_editor):
+    store = get_blob_store()
+    for model_name, old_field, new_field, mime_field in BLOB_COLUMNS:
+        Model = apps.get_model('Entrepreneurs', model_name)
+        refs = Model.objects.exclude(**{f'{new_field}__isnull': True}).values_list('pk', f'{new_field}_id')
+        for pk, key in refs.iterator():
+            Model.objects.filter(pk=pk).update(**{old_field: store.read(key)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0017_alter_user_managers_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('mime_type', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='entrepreneurprofile',
+            name='image_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='file_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='postmedia',
+            name='file_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='startup',
+            name='logo_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.mediablob'),
+        ),
+        migrations.AddField(
+            model_name='startupdocument',
+            name='file_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.mediablob'),
+        ),
+        migrations.RunPython(move_blobs_to_store, restore_blobs_from_store),
+        migrations.RemoveField(
+            model_name='entrepreneurprofile',
+            name='image',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='file_data',
+        ),
+        migrations.RemoveField(
+            model_name='postmedia',
+            name='file_data',
+        ),
+        migrations.RemoveField(
+            model_name='startup',
+            name='logo',
+        ),
+        migrations.RemoveField(
+            model_name='startupdocument',
+            name='file_data',
+        ),
+    ]
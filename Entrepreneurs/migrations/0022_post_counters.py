@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing(apps, schema_editor):
+    Post = apps.get_model('Entrepreneurs', 'Post')
+    Comment = apps.get_model('Entrepreneurs', 'Comment')
+
+    def count(model):
+        rows = model.objects.filter(post=OuterRef('pk')).values('post').annotate(n=Count('*')).values('n')
+        return Coalesce(Subquery(rows), 0)
+
+    Post.objects.update(
+        like_count=count(Post.likes.through),
+        comment_count=count(Comment),
+        save_count=count(Post.saved_by.through),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0021_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='save_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_existing_profiles(apps, schema_editor):
+    ProfileIndustry = apps.get_model('Entrepreneurs', 'ProfileIndustry')
+    sources = [
+        ('entrepreneur', apps.get_model('Entrepreneurs', 'EntrepreneurProfile'), 'industries'),
+        ('investor', apps.get_model('Investors', 'InvestorProfile'), 'preferred_industries'),
+    ]
+    rows = []
+    for side, model, field in sources:
+        for user_id, value in model.objects.exclude(**{field: ''}).values_list('user_id', field).iterator():
+            terms = {term.strip().lower()[:100] for term in (value or '').split(',') if term.strip()}
+            rows.extend(ProfileIndustry(user_id=user_id, side=side, term=term) for term in terms)
+    ProfileIndustry.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0022_post_counters'),
+        ('Investors', '0008_investor_media_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileIndustry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.CharField(choices=[('entrepreneur', 'Entrepreneur'), ('investor', 'Investor')], max_length=20)),
+                ('term', models.CharField(max_length=100)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='industry_terms', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['side', 'term', 'user'], name='profile_industry_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'side', 'term'), name='unique_profile_industry')],
+            },
+        ),
+        migrations.RunPython(index_existing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def summarize_existing_messages(apps, schema_editor):
+    Message = apps.get_model('Entrepreneurs', 'Message')
+    Conversation = apps.get_model('Entrepreneurs', 'Conversation')
+
+    conversations = {}
+    for pk, sender_id, receiver_id, content, file_name, timestamp, is_read in Message.objects.order_by(
+        'timestamp', 'pk'
+    ).values_list('pk', 'sender_id', 'receiver_id', 'content', 'file_name', 'timestamp', 'is_read').iterator():
+        user_a_id, user_b_id = sorted((sender_id, receiver_id))
+        conversation = conversations.get((user_a_id, user_b_id))
+        if conversation is None:
+            conversation = conversations[user_a_id, user_b_id] = Conversation(user_a_id=user_a_id, user_b_id=user_b_id)
+        conversation.last_message_id = pk
+        conversation.last_sender_id = sender_id
+        conversation.last_message_preview = (content or file_name or '')[:255]
+        conversation.last_message_at = timestamp
+        if not is_read:
+            if receiver_id == user_a_id:
+                conversation.unread_a += 1
+            else:
+                conversation.unread_b += 1
+    Conversation.objects.bulk_create(conversations.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0023_profileindustry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_preview', models.CharField(blank=True, max_length=255)),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_a', models.PositiveIntegerField(default=0)),
+                ('unread_b', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='Entrepreneurs.message')),
+                ('last_sender', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-last_message_at'], name='conversation_user_a_idx'), models.Index(fields=['user_b', '-last_message_at'], name='conversation_user_b_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user_a', 'user_b'), name='unique_conversation_pair')],
+            },
+        ),
+        migrations.RunPython(summarize_existing_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:28
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def watermark_existing_reads(apps, schema_editor):
+    """Each user's watermark is the newest message they had read; anything newer counts as unread"""
+    Message = apps.get_model('Entrepreneurs', 'Message')
+    Conversation = apps.get_model('Entrepreneurs', 'Conversation')
+
+    newest_read = {
+        (sender_id, receiver_id): newest
+        for sender_id, receiver_id, newest in Message.objects.filter(is_read=True).values_list(
+            'sender_id', 'receiver_id'
+        ).annotate(newest=Max('id')).order_by()
+    }
+    unread = {}
+    for sender_id, receiver_id, pk in Message.objects.values_list('sender_id', 'receiver_id', 'pk').iterator():
+        if pk > newest_read.get((sender_id, receiver_id), 0):
+            unread[sender_id, receiver_id] = unread.get((sender_id, receiver_id), 0) + 1
+
+    conversations = list(Conversation.objects.all())
+    for conversation in conversations:
+        a, b = conversation.user_a_id, conversation.user_b_id
+        conversation.read_a = newest_read.get((b, a), 0)
+        conversation.read_b = newest_read.get((a, b), 0)
+        conversation.unread_a = unread.get((b, a), 0)
+        conversation.unread_b = unread.get((a, b), 0)
+    Conversation.objects.bulk_update(conversations, ['read_a', 'read_b', 'unread_a', 'unread_b'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0026_chatupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='read_a',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='read_b',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(watermark_existing_reads, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
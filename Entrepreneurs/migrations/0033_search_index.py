@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+from django.db import migrations
+
+# The documents as of this migration; Entrepreneurs/search.py keeps them up to date
+DOCUMENTS = '''
+    INSERT INTO search_index (rowid, name, email, organisation, about)
+    SELECT u.id,
+           u.first_name || ' ' || u.last_name,
+           u.email,
+           COALESCE(ep.company_name, '') || ' ' || COALESCE(ip.firm_name, '') || ' ' || COALESCE(
+               (SELECT group_concat(s.name, ' ') FROM "Entrepreneurs_startup" s WHERE s.entrepreneur_id = u.id), ''
+           ),
+           COALESCE(ep.bio, '') || ' ' || COALESCE(ep.location, '') || ' ' || COALESCE(ep.industries, '')
+               || ' ' || COALESCE(ep.startup_description, '') || ' ' || COALESCE(ip.bio, '')
+               || ' ' || COALESCE(ip.location, '') || ' ' || COALESCE(ip.preferred_industries, '')
+               || ' ' || COALESCE(ip.portfolio_companies, '') || ' ' || COALESCE(
+                   (SELECT group_concat(s.industry || ' ' || s.description, ' ')
+                    FROM "Entrepreneurs_startup" s WHERE s.entrepreneur_id = u.id), ''
+               )
+    FROM "Entrepreneurs_user" u
+    LEFT JOIN "Entrepreneurs_entrepreneurprofile" ep ON ep.user_id = u.id
+    LEFT JOIN "Investors_investorprofile" ip ON ip.user_id = u.id
+'''
+
+
+def create_search_index(apps, schema_editor):
+    # An FTS5 virtual table; other databases search without an index
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE search_index USING fts5("
+        "name, email, organisation, about, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    schema_editor.execute(DOCUMENTS)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Entrepreneurs', '0032_retention_archives'),
+        ('Investors', '0008_investor_media_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,8 +1,17 @@
-from django.db import models
-from django.db.models import Q
+import os
+import uuid
+from pathlib import Path
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import AbstractUser, Group, Permission, BaseUserManager
 from rest_framework import serializers
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.urls import reverse
+from CoFound.pagination import keyset_filter
+from CoFound.storage import get_blob_store, guess_mime_type
 
 # Choice constants for EntrepreneurProfile
 COMPANY_STAGES = [
@@ -119,6 +128,10 @@ class User(AbstractUser):
     show_followers = models.BooleanField(default=True, help_text='Allow others to see your followers/network')
     created_at = models.DateTimeField(auto_now_add=True)
     last_active = models.DateTimeField(auto_now=True)
+    # Denormalized count of unread notifications, kept in step by signals.py
+    # and NotificationService; `manage.py reconcile_notification_counts`
+    # repairs drift
+    unread_notification_count = models.PositiveIntegerField(default=0)
 
     # Avoid reverse name collisions with auth models
     groups = models.ManyToManyField(
@@ -145,6 +158,151 @@ class User(AbstractUser):
         full = self.get_full_name().strip()
         return f"{full or self.email} ({self.role})"
 
+    @property
+    def profile_image_url(self):
+        """URL of the user's profile picture, or '' if they have none"""
+        for relation in ('entrepreneur_profile', 'investor_profile'):
+            try:
+                url = getattr(self, relation).image_url
+            except (ObjectDoesNotExist, AttributeError):
+                continue
+            if url:
+                return url
+        return ''
+
+
+class MediaBlobManager(models.Manager):
+    def store(self, content, mime_type=''):
+        """Save bytes or an uploaded file in the blob store and return its MediaBlob"""
+        if not mime_type:
+            mime_type = getattr(content, 'content_type', None) or ''
+        if not mime_type:
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                head = bytes(content[:16])
+            else:
+                content.seek(0)
+                head = content.read(16)
+            mime_type = guess_mime_type(head)
+        key, size = get_blob_store().save(content)
+        blob, _ = self.get_or_create(sha256=key, defaults={'size': size, 'mime_type': mime_type})
+        return blob
+
+
+class MediaBlob(models.Model):
+    """
+    Reference to content-addressed bytes in the blob store.
+    Rows are shared: two uploads of the same file point at the same blob.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField(default=0)
+    mime_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = MediaBlobManager()
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.mime_type}, {self.size} bytes)"
+
+    def open(self):
+        return get_blob_store().open(self.sha256)
+
+    def read(self):
+        return get_blob_store().read(self.sha256)
+
+    def get_absolute_url(self):
+        return reverse('media', args=[self.sha256])
+
+
+class MediaVariant(models.Model):
+    """A resized rendition of an image blob, generated by CoFound.variants"""
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('jpeg', 'JPEG'),
+    ]
+
+    source = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name='variants')
+    width = models.PositiveIntegerField()
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'width', 'format'], name='unique_media_variant'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id[:12]} @ {self.width}px {self.format}"
+
+
+class BlobHandle:
+    """
+    Lazy reference to bytes in the blob store, in the spirit of Django's
+    FieldFile. Truth-testing it or asking for its ``url`` never touches the
+    store; the bytes are only fetched by an explicit ``read()`` or ``open()``.
+    """
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __repr__(self):
+        return f"<BlobHandle: {self.key[:12]}>"
+
+    def __eq__(self, other):
+        return isinstance(other, BlobHandle) and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @property
+    def url(self):
+        return reverse('media', args=[self.key])
+
+    def open(self):
+        return get_blob_store().open(self.key)
+
+    def read(self):
+        return get_blob_store().read(self.key)
+
+
+def blob_property(field_name, mime_field=None, variants=None):
+    """
+    Expose a MediaBlob foreign key as a BlobHandle, so ``profile.image`` can be
+    tested and linked to without loading anything; call ``.read()`` for bytes.
+    Assigning bytes or an uploaded file stores it and updates the reference.
+    ``variants`` names a preset in CoFound.variants.VARIANT_PRESETS whose
+    resized copies are generated in the background after each upload.
+    """
+    def getter(self):
+        key = getattr(self, f'{field_name}_id')
+        return BlobHandle(key) if key else None
+
+    def setter(self, value):
+        if not value:
+            setattr(self, field_name, None)
+            return
+        if isinstance(value, BlobHandle):
+            setattr(self, f'{field_name}_id', value.key)
+            return
+        mime_type = getattr(self, mime_field, '') if mime_field else ''
+        blob = MediaBlob.objects.store(value, mime_type=mime_type or '')
+        setattr(self, field_name, blob)
+        if variants:
+            from CoFound.variants import schedule_variants
+            schedule_variants(blob, variants)
+
+    return property(getter, setter)
+
+
+def blob_url(field_name):
+    """URL the media view serves a MediaBlob foreign key from ('' if unset)"""
+    def getter(self):
+        key = getattr(self, f'{field_name}_id')
+        return reverse('media', args=[key]) if key else ''
+
+    return property(getter)
+
 
 class Industry(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -177,11 +335,14 @@ class EntrepreneurProfile(models.Model):
     revenue = models.CharField(max_length=50, choices=REVENUE_RANGES, default='no_revenue')
     funding_raised = models.CharField(max_length=50, choices=FUNDING_RANGES, default='no_funding')
     valuation = models.CharField(max_length=50, choices=VALUATION_RANGES, default='not_specified')
-    image = models.BinaryField(editable=True, null=True, blank=True)
+    image_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     profile_views = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    image = blob_property('image_blob', variants='avatar')
+    image_url = blob_url('image_blob')
+
     def __str__(self):
         return f"{self.user.get_full_name()}'s Entrepreneur Profile"
 
@@ -197,21 +358,13 @@ class Startup(models.Model):
     description = models.TextField()
     industry = models.CharField(max_length=100, choices=INDUSTRY_CHOICES)
     website = models.URLField(blank=True, null=True)
-    logo = models.BinaryField(editable=True,blank=True, null=True)  # BLOB logo
+    logo_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     funding_goal = models.DecimalField(max_digits=12, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
-    def logo_base64(self):
-        if self.logo:
-            import base64
-            return base64.b64encode(self.logo).decode('utf-8')
-        return None
-
-    @property
-    def logo_data(self):
-        """Property to access logo as base64 string for templates"""
-        return self.logo_base64()
+    logo = blob_property('logo_blob', variants='avatar')
+    logo_url = blob_url('logo_blob')
 
     class Meta:
         ordering = ['-created_at', 'name']
@@ -224,23 +377,15 @@ class StartupDocument(models.Model):
     startup = models.ForeignKey(Startup, on_delete=models.CASCADE, related_name="documents")
     title = models.CharField(max_length=255)
 
-    # BLOB file storage
+    # File bytes live in the blob store
     file_name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=100, blank=True)  # e.g., "application/pdf" or "video/mp4"
-    file_data = models.BinaryField(editable=True,blank=True, null=True)
+    file_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
-    def file_base64(self):
-        if self.file_data:
-            import base64
-            return base64.b64encode(self.file_data).decode('utf-8')
-        return None
-
-    @property
-    def file_data_display(self):
-        """Property to access file data as base64 string for templates"""
-        return self.file_base64()
+    file_data = blob_property('file_blob', mime_field='file_type')
+    file_url = blob_url('file_blob')
 
     def __str__(self):
         return f"{self.title} - {self.startup.name}"
@@ -304,6 +449,36 @@ class CollaborationRequest(models.Model):
         return f"{self.investor} → {self.entrepreneur} ({self.status})"
 
 
+class MessageQuerySet(models.QuerySet):
+    def between(self, user_id, other_id):
+        """Both directions of the conversation between two users"""
+        return self.filter(
+            Q(sender_id=user_id, receiver_id=other_id) | Q(sender_id=other_id, receiver_id=user_id)
+        )
+
+    def history(self, before=None, after=None, limit=50):
+        """
+        One page of messages, oldest first, as ``(messages, has_more)``.
+        Without anchors this is the latest ``limit`` messages; ``before`` and
+        ``after`` are message ids to page back from or to sync forward from.
+        ``has_more`` says whether more messages lie further in that direction.
+        Raises ValueError if the anchor is not in this queryset.
+        """
+        anchor_id = after if after is not None else before
+        queryset = self
+        if anchor_id is not None:
+            anchor = self.filter(pk=anchor_id).values_list('timestamp', flat=True).first()
+            if anchor is None:
+                raise ValueError(f'Unknown message: {anchor_id!r}')
+            queryset = keyset_filter(self, 'timestamp', anchor, anchor_id, descending=after is None)
+
+        if after is not None:
+            rows = list(queryset.order_by('timestamp', 'pk')[:limit + 1])
+            return rows[:limit], len(rows) > limit
+        rows = list(queryset.order_by('-timestamp', '-pk')[:limit + 1])
+        return rows[:limit][::-1], len(rows) > limit
+
+
 class Message(models.Model):
     MESSAGE_TYPES = [
         ('text', 'Text'),
@@ -315,21 +490,211 @@ class Message(models.Model):
     receiver = models.ForeignKey(User, on_delete=models.CASCADE, related_name="received_messages")
     content = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
     message_type = models.CharField(max_length=10, choices=MESSAGE_TYPES, default='text')
     # Attachment fields (nullable)
     file_name = models.CharField(max_length=255, blank=True, null=True)
     file_type = models.CharField(max_length=100, blank=True, null=True)
-    file_data = models.BinaryField(editable=True, null=True, blank=True)
+    file_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     file_size = models.PositiveIntegerField(default=0, blank=True, null=True)
 
+    file_data = blob_property('file_blob', mime_field='file_type')
+    file_url = blob_url('file_blob')
+
+    objects = MessageQuerySet.as_manager()
+
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['sender', 'receiver', 'timestamp'], name='message_pair_time_idx'),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} to {self.receiver}"
 
 
+class ConversationManager(models.Manager):
+    @staticmethod
+    def pair(user_id, other_id):
+        """The (user_a, user_b) ids of a conversation; user_a is always the lower id"""
+        return (user_id, other_id) if user_id <= other_id else (other_id, user_id)
+
+    @staticmethod
+    def unread_field(user_a_id, reader_id):
+        return 'unread_a' if reader_id == user_a_id else 'unread_b'
+
+    def for_user(self, user):
+        return self.filter(Q(user_a=user) | Q(user_b=user)).order_by('-last_message_at')
+
+    def unread_total(self, user):
+        totals = self.filter(Q(user_a=user) | Q(user_b=user)).aggregate(
+            a=models.Sum('unread_a', filter=Q(user_a=user)),
+            b=models.Sum('unread_b', filter=Q(user_b=user)),
+        )
+        return (totals['a'] or 0) + (totals['b'] or 0)
+
+    def record_message(self, message):
+        """Make ``message`` the latest of its conversation and count it unread for the receiver"""
+        user_a_id, user_b_id = self.pair(message.sender_id, message.receiver_id)
+        unread = self.unread_field(user_a_id, message.receiver_id)
+        latest = {
+            'last_message_id': message.pk,
+            'last_sender_id': message.sender_id,
+            'last_message_preview': (message.content or message.file_name or '')[:Conversation.PREVIEW_LENGTH],
+            'last_message_at': message.timestamp,
+        }
+        pair = self.filter(user_a_id=user_a_id, user_b_id=user_b_id)
+        if pair.update(**latest, **{unread: F(unread) + 1}):
+            return
+        try:
+            with transaction.atomic():
+                self.create(user_a_id=user_a_id, user_b_id=user_b_id, **latest, **{unread: 1})
+        except IntegrityError:
+            # Another request created the row first
+            pair.update(**latest, **{unread: F(unread) + 1})
+
+    def mark_read(self, reader_id, other_id, upto):
+        """
+        Move ``reader_id``'s read watermark in their conversation with
+        ``other_id`` up to message ``upto`` and recount what is still unread,
+        in one UPDATE. The watermark never moves back or past the latest
+        message. Returns whether anything changed.
+        """
+        user_a_id, user_b_id = self.pair(reader_id, other_id)
+        side = 'a' if reader_id == user_a_id else 'b'
+        remaining = Message.objects.filter(
+            sender_id=other_id, receiver_id=reader_id, id__gt=upto
+        ).order_by().values('receiver_id').annotate(n=Count('id')).values('n')
+        return bool(self.filter(
+            user_a_id=user_a_id, user_b_id=user_b_id, last_message_id__gte=upto, **{f'read_{side}__lt': upto}
+        ).update(**{
+            f'read_{side}': upto,
+            f'unread_{side}': Coalesce(Subquery(remaining), 0),
+        }))
+
+
+class Conversation(models.Model):
+    """
+    Summary of the messages between two users, kept current as messages are
+    sent and read so the inbox is one query over this table.
+    """
+    PREVIEW_LENGTH = 255
+
+    user_a = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    user_b = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Messages in this conversation not yet read by user_a / user_b
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+    # Read watermarks: the id of the newest message each user has read.
+    # Everything the other user sent up to it counts as read.
+    read_a = models.PositiveBigIntegerField(default=0)
+    read_b = models.PositiveBigIntegerField(default=0)
+
+    objects = ConversationManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_a', 'user_b'], name='unique_conversation_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['user_a', '-last_message_at'], name='conversation_user_a_idx'),
+            models.Index(fields=['user_b', '-last_message_at'], name='conversation_user_b_idx'),
+        ]
+
+    def __str__(self):
+        return f"Conversation between {self.user_a_id} and {self.user_b_id}"
+
+    def other(self, user):
+        return self.user_b if user.pk == self.user_a_id else self.user_a
+
+    def unread_for(self, user):
+        return self.unread_a if user.pk == self.user_a_id else self.unread_b
+
+    def read_upto(self):
+        """``{user_id: watermark}`` for both users, as MessageSerializer expects"""
+        return {self.user_a_id: self.read_a, self.user_b_id: self.read_b}
+
+
+class ChatUpload(models.Model):
+    """
+    A chat attachment uploaded over HTTP in chunks before it is sent.
+    Chunks are appended to a part file under CHAT_UPLOAD_DIR; when the last
+    byte arrives the file moves into the blob store and ``blob`` is set.
+    Chat frames then refer to the upload by id instead of carrying bytes.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_uploads')
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.received}/{self.size} bytes)"
+
+    @property
+    def is_complete(self):
+        return self.blob_id is not None
+
+    @property
+    def part_path(self):
+        location = getattr(settings, 'CHAT_UPLOAD_DIR', settings.BASE_DIR / 'media' / 'uploads')
+        return Path(location) / f'{self.pk}.part'
+
+    def append(self, offset, data):
+        """
+        Write the chunk ``data`` starting at byte ``offset``. Only the next
+        expected offset is accepted, so a client resumes by asking for
+        ``received`` and sending from there; returns False if ``offset`` is
+        not that point or the chunk would run past ``size``.
+        """
+        end = offset + len(data)
+        if end > self.size:
+            return False
+        with transaction.atomic():
+            # Claim the chunk before touching the file. The row stays locked
+            # until the write commits, and a stale or repeated chunk claims
+            # nothing, so it can never overwrite or truncate accepted bytes
+            if not ChatUpload.objects.filter(pk=self.pk, received=offset, blob__isnull=True).update(received=end):
+                self.refresh_from_db(fields=['received', 'blob'])
+                return False
+            path = self.part_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'r+b' if path.exists() else 'wb') as f:
+                f.seek(offset)
+                f.write(data)
+                f.truncate()
+        self.received = end
+        if self.received == self.size:
+            try:
+                self.finish()
+            except Exception:
+                # Give the last chunk back, so the client's retry of it stores
+                # the file again instead of meeting a 409 forever
+                ChatUpload.objects.filter(pk=self.pk, received=end, blob__isnull=True).update(received=offset)
+                self.received = offset
+                raise
+        return True
+
+    def finish(self):
+        """Move the completed part file into the blob store"""
+        with open(self.part_path, 'rb') as f:
+            self.blob = MediaBlob.objects.store(f, mime_type=self.file_type)
+        self.save(update_fields=['blob'])
+        self.discard_part()
+
+    def discard_part(self):
+        try:
+            os.unlink(self.part_path)
+        except FileNotFoundError:
+            pass
+
+
 # Notification types
 NOTIFICATION_TYPES = [
     ('follow', 'Follow'),
@@ -350,6 +715,12 @@ class Notification(models.Model):
     message = models.TextField()
     related_object_id = models.PositiveIntegerField(null=True, blank=True)
     related_object_type = models.CharField(max_length=50, null=True, blank=True)
+    # How many events this row stands for once repeats are collapsed into it
+    # (see NotificationService.create_notification)
+    actor_count = models.PositiveIntegerField(default=1)
+    # Ids of the users already counted in a collapsed like or comment, so an
+    # actor coming back is not counted again
+    actor_ids = models.JSONField(default=list, blank=True)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -358,6 +729,8 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['created_at']),
+            # Keyset pagination of a user's notifications walks (created_at, id) backwards
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_keyset_idx'),
         ]
 
     def __str__(self):
@@ -384,6 +757,78 @@ class Notification(models.Model):
             return "Just now"
 
 
+def adjust_unread_notifications(user_ids, delta):
+    """Move the unread_notification_count of one user id, or a list of them, by ``delta`` (never below zero)"""
+    if not isinstance(user_ids, (list, tuple, set)):
+        user_ids = [user_ids]
+    User.objects.filter(pk__in=user_ids).update(
+        unread_notification_count=Greatest(F('unread_notification_count') + delta, 0)
+    )
+
+
+class NotificationBroadcast(models.Model):
+    """
+    One notification sent to a whole audience (the sender's followers, or
+    every investor), written out in batches by Investors/fanout.py.
+    ``cursor`` is the id of the last recipient done, so a retried or
+    resumed run carries on from there; ``sent`` of ``total`` is progress.
+    """
+    AUDIENCE_CHOICES = [
+        ('followers', 'Followers of the sender'),
+        ('investors', 'All investors'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_broadcasts')
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES)
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_object_type = models.CharField(max_length=50, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    sent = models.PositiveIntegerField(default=0)
+    cursor = models.PositiveBigIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    def __str__(self):
+        return f"{self.notification_type} to {self.audience} of {self.sender} ({self.sent}/{self.total}, {self.status})"
+
+
+class NotificationArchive(models.Model):
+    """
+    Monthly totals of a user's read notifications of one type, kept after
+    the rows themselves are deleted by Entrepreneurs/retention.py.
+    ``count`` is rows archived, ``actor_count`` the events they stood for.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_archives')
+    month = models.DateField(help_text='First day of the month')
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    count = models.PositiveIntegerField(default=0)
+    actor_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'notification_type'], name='notification_archive_month_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} {self.notification_type} notifications for {self.user} in {self.month:%Y-%m}"
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="favorites")
     target_user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="favorited_by")
@@ -397,6 +842,33 @@ class Favorite(models.Model):
         return f"{self.user} favorited {self.target_user}"
 
 
+class ProfileIndustry(models.Model):
+    """
+    One normalized industry term from a profile's comma-separated
+    industries (entrepreneurs) or preferred_industries (investors), kept in
+    step by signals so industry matching is an indexed lookup by term.
+    """
+    SIDE_CHOICES = [
+        ('entrepreneur', 'Entrepreneur'),
+        ('investor', 'Investor'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='industry_terms')
+    side = models.CharField(max_length=20, choices=SIDE_CHOICES)
+    term = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'side', 'term'], name='unique_profile_industry'),
+        ]
+        indexes = [
+            models.Index(fields=['side', 'term', 'user'], name='profile_industry_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} ({self.side}): {self.term}"
+
+
 class ActivityLog(models.Model):
     ACTION_TYPES = [
         ('login', 'Login'),
@@ -417,6 +889,79 @@ class ActivityLog(models.Model):
         return f"{self.user} - {self.action}"
 
 
+class ActivityLogArchive(models.Model):
+    """Monthly totals of a user's activity log entries of one action, kept after retention.py deletes them"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activity_log_archives')
+    month = models.DateField(help_text='First day of the month')
+    action = models.CharField(max_length=50, choices=ActivityLog.ACTION_TYPES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'action'], name='activity_log_archive_month_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} {self.action} for {self.user} in {self.month:%Y-%m}"
+
+
+class RetentionCheckpoint(models.Model):
+    """
+    Progress of a retention run over one table (retention.py): the cutoff
+    it archives before and the last id it has done. Cleared when the run
+    finishes, so only an interrupted run is resumed.
+    """
+    table = models.CharField(max_length=50, unique=True)
+    cutoff = models.DateTimeField()
+    last_id = models.PositiveBigIntegerField(default=0)
+    archived = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.table} before {self.cutoff:%Y-%m-%d}: {self.archived} archived, at id {self.last_id}"
+
+
+# Comments a post card shows; the rest are fetched when asked for (post_comments)
+FEED_COMMENTS = 3
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Everything a post card renders, in a fixed number of queries.
+        Profile pictures and attachments come back as blob references only;
+        their bytes are streamed separately by the media view. Like, comment
+        and save totals come from the counter columns, and the viewer's own
+        like/save state from mark_viewer_state(). Only each post's latest
+        FEED_COMMENTS comments are loaded (Post.recent_comments).
+        """
+        return self.select_related(
+            'author', 'author__entrepreneur_profile', 'author__investor_profile'
+        ).prefetch_related(
+            'media_files',
+            Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related(
+                    'author', 'author__entrepreneur_profile', 'author__investor_profile'
+                ).order_by('-created_at', '-id')[:FEED_COMMENTS],
+                to_attr='latest_comments',
+            ),
+        )
+
+    def with_actual_counts(self):
+        """Annotate ``actual_<counter>`` with the live row count behind each counter column"""
+        def count(model, field='post'):
+            rows = model.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(n=Count('*')).values('n')
+            return Coalesce(Subquery(rows), 0)
+
+        return self.annotate(
+            actual_like_count=count(Post.likes.through),
+            actual_comment_count=count(Comment),
+            actual_save_count=count(Post.saved_by.through),
+        )
+
+
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField(blank=True)  # Make content optional for media-only posts
@@ -425,12 +970,73 @@ class Post(models.Model):
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
     saved_by = models.ManyToManyField(User, related_name='saved_posts', blank=True)
 
+    # Denormalized totals of likes, comments and saved_by, kept in step by the
+    # views with F() updates; `manage.py reconcile_post_counters` repairs drift
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    save_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    COUNTERS = ('like_count', 'comment_count', 'save_count')
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the feed walks (created_at, id) backwards
+            models.Index(fields=['-created_at', '-id'], name='post_feed_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.author.get_full_name() or self.author.email}'s post @ {self.created_at:%Y-%m-%d}"
 
+    @property
+    def recent_comments(self):
+        """The latest FEED_COMMENTS comments, oldest first"""
+        latest = getattr(self, 'latest_comments', None)
+        if latest is None:
+            latest = self.comments.select_related('author').order_by('-created_at', '-id')[:FEED_COMMENTS]
+        return list(latest)[::-1]
+
+    def adjust_counter(self, field, delta):
+        Post.objects.filter(pk=self.pk).update(**{field: F(field) + delta})
+
+    def _toggle_membership(self, relation, counter, user):
+        through = relation.through
+        with transaction.atomic():
+            removed, _ = through.objects.filter(post_id=self.pk, user_id=user.pk).delete()
+            if removed:
+                self.adjust_counter(counter, -removed)
+            else:
+                _, created = through.objects.get_or_create(post_id=self.pk, user_id=user.pk)
+                if created:
+                    self.adjust_counter(counter, 1)
+        self.refresh_from_db(fields=[counter])
+        return not removed
+
+    def toggle_like(self, user):
+        """Like or unlike for ``user``; returns True if the post is now liked"""
+        return self._toggle_membership(Post.likes, 'like_count', user)
+
+    def toggle_save(self, user):
+        """Save or unsave for ``user``; returns True if the post is now saved"""
+        return self._toggle_membership(Post.saved_by, 'save_count', user)
+
+
+def mark_viewer_state(posts, user):
+    """
+    Set ``liked_by_viewer`` and ``saved_by_viewer`` on a page of posts with one
+    lookup per relation, instead of loading every like and save of every post.
+    """
+    posts = list(posts)
+    ids = [post.pk for post in posts]
+    liked = set(Post.likes.through.objects.filter(user_id=user.pk, post_id__in=ids).values_list('post_id', flat=True))
+    saved = set(Post.saved_by.through.objects.filter(user_id=user.pk, post_id__in=ids).values_list('post_id', flat=True))
+    for post in posts:
+        post.liked_by_viewer = post.pk in liked
+        post.saved_by_viewer = post.pk in saved
+    return posts
+
 class PostMedia(models.Model):
     MEDIA_TYPES = [
         ('image', 'Image'),
@@ -442,24 +1048,17 @@ class PostMedia(models.Model):
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
     file_name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=100, blank=True)
-    file_data = models.BinaryField(editable=True, null=True, blank=True)
+    file_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     file_size = models.PositiveIntegerField(default=0)
     position = models.PositiveIntegerField(default=0)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    file_data = blob_property('file_blob', mime_field='file_type', variants='feed')
+    file_url = blob_url('file_blob')
+
     class Meta:
         ordering = ['position', 'uploaded_at', 'id']
 
-    def file_base64(self):
-        if self.file_data:
-            import base64
-            return base64.b64encode(self.file_data).decode('utf-8')
-        return None
-
-    @property
-    def file_data_display(self):
-        return self.file_base64()
-
     def __str__(self):
         return f"{self.media_type} - {self.file_name} for {self.post}"
 
@@ -479,23 +1078,51 @@ class Comment(models.Model):
         return f"Comment by {self.author.get_full_name() or self.author.email} on {self.post_id}"
 
 
+class FeedEntry(models.Model):
+    """
+    One post in one user's home timeline, written when the post is created
+    (fan-out on write) so reading a feed is a single range scan per user.
+    ``created_at`` is copied from the post to keep that scan on this table.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='feed_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-post']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_feed_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='feed_entry_timeline_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in {self.user_id}'s feed"
+
+
 class MessageSerializer(serializers.ModelSerializer):
+    """
+    Pass the conversation's ``read_upto()`` as the ``read_upto`` context to
+    fill in ``is_read``; without it every message reads as unread.
+    """
     sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
     receiver_name = serializers.CharField(source='receiver.get_full_name', read_only=True)
-    file_base64 = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
+    file_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
         fields = [
             'id', 'sender', 'sender_name', 'receiver', 'receiver_name', 'content', 'timestamp',
-            'is_read', 'message_type', 'file_name', 'file_type', 'file_size', 'file_base64'
+            'is_read', 'message_type', 'file_name', 'file_type', 'file_size', 'file_url'
         ]
 
-    def get_file_base64(self, obj):
-        if obj.file_data:
-            import base64
-            return base64.b64encode(obj.file_data).decode('utf-8')
-        return None
+    def get_is_read(self, obj):
+        return obj.pk <= self.context.get('read_upto', {}).get(obj.receiver_id, 0)
+
+    def get_file_url(self, obj):
+        return obj.file_url or None
 
 
 class Meeting(models.Model):
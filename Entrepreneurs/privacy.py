@@ -0,0 +1,111 @@
+"""
+Who may message whom.
+
+A user whose ``message_privacy`` is 'private' only hears from friends
+(either user follows the other); anyone may message a 'public' user.
+can_message() answers that for a (sender, receiver) pair, and
+messageable() for one sender and many receivers, as the inbox and search
+need. Answers are kept in the cache for ``MESSAGE_PRIVACY_CACHE_TTL``
+seconds, so a warm chat's send path makes no privacy queries.
+
+A Favorite between the pair changing (signals.py) deletes that pair's two
+entries. The receiver changing their message_privacy (message_settings)
+replaces their generation key, which every entry about them is checked
+against on read, so all of them go at once without being listed. As with
+the social graph, these only reach workers sharing the cache (CACHE in
+settings.py). A decision is always made from the database rather than the
+cached graph, whose snapshots may be older than that.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Favorite, User
+
+CACHE_PREFIX = 'privacy:'
+
+
+def _decision_key(sender_id, receiver_id):
+    return f'{CACHE_PREFIX}{receiver_id}:{sender_id}'
+
+
+def _generation_key(receiver_id):
+    return f'{CACHE_PREFIX}generation:{receiver_id}'
+
+
+def _timeout():
+    return getattr(settings, 'MESSAGE_PRIVACY_CACHE_TTL', 5)
+
+
+def _decide(sender_id, receiver_ids):
+    privacies = dict(User.objects.filter(id__in=receiver_ids).values_list('id', 'message_privacy'))
+    allowed = {receiver_id for receiver_id, privacy in privacies.items() if privacy == 'public'}
+    private = privacies.keys() - allowed
+    if private:
+        for user_id, target_id in Favorite.objects.filter(
+            Q(user_id=sender_id, target_user_id__in=private) | Q(user_id__in=private, target_user_id=sender_id)
+        ).values_list('user_id', 'target_user_id'):
+            allowed.add(target_id if user_id == sender_id else user_id)
+    return {receiver_id: receiver_id in allowed for receiver_id in receiver_ids}
+
+
+def messageable(sender_id, receiver_ids):
+    """The ids among ``receiver_ids`` that ``sender_id`` may message"""
+    sender_id = int(sender_id)
+    receiver_ids = {int(receiver_id) for receiver_id in receiver_ids} - {sender_id}
+    if not receiver_ids:
+        return set()
+
+    cached = cache.get_many(
+        [_generation_key(receiver_id) for receiver_id in receiver_ids]
+        + [_decision_key(sender_id, receiver_id) for receiver_id in receiver_ids]
+    )
+    decisions = {}
+    generations = {}
+    for receiver_id in receiver_ids:
+        generations[receiver_id] = cached.get(_generation_key(receiver_id))
+        entry = cached.get(_decision_key(sender_id, receiver_id))
+        if entry is not None and entry[0] == generations[receiver_id]:
+            decisions[receiver_id] = entry[1]
+
+    missing = receiver_ids - decisions.keys()
+    if missing:
+        decided = _decide(sender_id, missing)
+        # Stored under the generation read before deciding, so a privacy
+        # change made meanwhile leaves the entry already out of date
+        cache.set_many(
+            {_decision_key(sender_id, receiver_id): (generations[receiver_id], allowed)
+             for receiver_id, allowed in decided.items()},
+            _timeout(),
+        )
+        decisions.update(decided)
+    return {receiver_id for receiver_id, allowed in decisions.items() if allowed}
+
+
+def can_message(sender_id, receiver_id):
+    """Whether ``sender_id`` may message ``receiver_id``"""
+    return int(receiver_id) in messageable(sender_id, [receiver_id])
+
+
+def forget_pair(user_id, other_id):
+    """
+    Drop the decisions between two users, both ways (their follow links
+    changed). As graph.invalidate: at once and again on commit.
+    """
+    keys = [_decision_key(user_id, other_id), _decision_key(other_id, user_id)]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _new_generation(user_id):
+    # Kept as long as the entries it outdates: once it expires, so have they
+    cache.set(_generation_key(user_id), uuid.uuid4().hex, _timeout())
+
+
+def forget_receiver(user_id):
+    """Drop every decision about messaging ``user_id`` (their message_privacy changed)"""
+    _new_generation(user_id)
+    transaction.on_commit(lambda: _new_generation(user_id))
@@ -0,0 +1,164 @@
+"""
+Retention for the notification and activity log tables.
+
+Read notifications older than ``NOTIFICATION_RETENTION_DAYS`` (and, if
+``ACTIVITY_LOG_RETENTION_DAYS`` is set, activity log entries older than
+that) are folded into monthly per-user totals (NotificationArchive,
+ActivityLogArchive) and deleted, ``BATCH_SIZE`` rows at a time in id
+order. Each batch's totals, its deletion and the table's
+RetentionCheckpoint commit together, so a run that stops part way loses
+nothing and the next run resumes after the last committed batch, with
+the same cutoff.
+
+Batches go in one raw DELETE, without loading the rows or sending
+post_delete: the only receiver, the unread notification counter
+(signals.py), has nothing to do for the read notifications archived here.
+
+``manage.py archive_notifications`` runs it; schedule that daily (cron, a
+systemd timer) or call run_all() from whatever scheduler the deployment
+has. ``max_rows`` bounds a run's length, leaving the rest for the next.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import ActivityLog, ActivityLogArchive, Notification, NotificationArchive, RetentionCheckpoint
+
+BATCH_SIZE = 1000
+
+
+class Table:
+    """How one table is archived: its rows' time and category fields, and which rows qualify"""
+
+    def __init__(self, model, archive, time_field, category, setting, only=None, sums=()):
+        self.model = model
+        self.archive = archive
+        self.time_field = time_field
+        self.category = category
+        self.setting = setting
+        self.only = only or {}
+        # Fields added up into the archive field of the same name
+        self.sums = sums
+
+    def retention_days(self):
+        return getattr(settings, self.setting, None)
+
+    def expired(self, cutoff):
+        return self.model.objects.filter(**{f'{self.time_field}__lt': cutoff}, **self.only)
+
+
+TABLES = {
+    'notifications': Table(
+        Notification, NotificationArchive, 'created_at', 'notification_type', 'NOTIFICATION_RETENTION_DAYS',
+        only={'is_read': True}, sums=('actor_count',),
+    ),
+    'activity_logs': Table(ActivityLog, ActivityLogArchive, 'timestamp', 'action', 'ACTIVITY_LOG_RETENTION_DAYS'),
+}
+
+
+def month_of(value):
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def _fold(table, rows):
+    """Add ``rows`` (pk, user_id, category, time, *sums) to their monthly archive rows"""
+    totals = {}
+    for _, user_id, category, at, *sums in rows:
+        counts = totals.setdefault((user_id, month_of(at), category), [0] * (1 + len(sums)))
+        counts[0] += 1
+        for i, value in enumerate(sums, 1):
+            counts[i] += value
+
+    users, months, categories = (set(key[i] for key in totals) for i in range(3))
+    existing = {
+        (archive.user_id, archive.month, getattr(archive, table.category)): archive
+        for archive in table.archive.objects.select_for_update().filter(
+            user_id__in=users, month__in=months, **{f'{table.category}__in': categories}
+        )
+    }
+    new = []
+    for key, counts in totals.items():
+        archive = existing.get(key)
+        if archive is None:
+            archive = table.archive(user_id=key[0], month=key[1], **{table.category: key[2]})
+            new.append(archive)
+        archive.count += counts[0]
+        for field, value in zip(table.sums, counts[1:]):
+            setattr(archive, field, getattr(archive, field) + value)
+    table.archive.objects.bulk_update(existing.values(), ['count', *table.sums])
+    table.archive.objects.bulk_create(new)
+
+
+def _checkpoint(name, days):
+    """The interrupted run of ``name`` to resume, or a fresh one archiving rows older than ``days``"""
+    checkpoint = RetentionCheckpoint.objects.filter(table=name).first()
+    if checkpoint is not None:
+        return checkpoint
+    days = days or TABLES[name].retention_days()
+    if not days:
+        raise ValueError(f'No retention period set for {name}')
+    return RetentionCheckpoint(table=name, cutoff=timezone.now() - timedelta(days=days))
+
+
+def preview(name, days=None):
+    """``{category: rows}`` that a run of ``name`` would archive now; writes nothing"""
+    table = TABLES[name]
+    checkpoint = _checkpoint(name, days)
+    expired = table.expired(checkpoint.cutoff).filter(pk__gt=checkpoint.last_id)
+    return dict(expired.values_list(table.category).annotate(n=Count('*')).order_by())
+
+
+def run(name, days=None, batch_size=None, max_rows=None, progress=None):
+    """
+    Archive and delete the expired rows of table ``name``: rows older than
+    ``days`` (default: the table's setting), or those left by an
+    interrupted run. Stops after about ``max_rows`` if given. Calls
+    ``progress(archived, seconds)`` after each batch and returns
+    ``(archived, seconds, finished)``. Raises ValueError if the table has
+    no retention period and no run to resume.
+    """
+    table = TABLES[name]
+    batch_size = batch_size or BATCH_SIZE
+    checkpoint = _checkpoint(name, days)
+    fields = ('pk', 'user_id', table.category, table.time_field, *table.sums)
+
+    started = time.monotonic()
+    archived = 0
+    finished = False
+    while max_rows is None or archived < max_rows:
+        with transaction.atomic():
+            rows = list(
+                table.expired(checkpoint.cutoff).filter(pk__gt=checkpoint.last_id).order_by('pk')
+                .values_list(*fields)[:batch_size]
+            )
+            if not rows:
+                finished = True
+                break
+            _fold(table, rows)
+            expired = table.model.objects.filter(pk__in=[row[0] for row in rows])
+            expired._raw_delete(expired.db)
+            checkpoint.last_id = rows[-1][0]
+            checkpoint.archived += len(rows)
+            checkpoint.save()
+        archived += len(rows)
+        if progress is not None:
+            progress(archived, time.monotonic() - started)
+
+    if finished and checkpoint.pk is not None:
+        checkpoint.delete()
+    return archived, time.monotonic() - started, finished
+
+
+def due():
+    """Tables with a retention period set, or an interrupted run to finish"""
+    resuming = set(RetentionCheckpoint.objects.values_list('table', flat=True))
+    return [name for name, table in TABLES.items() if table.retention_days() or name in resuming]
+
+
+def run_all(batch_size=None, max_rows=None):
+    """Run every table that is due (the entry point for a scheduler); ``{table: run() result}``"""
+    return {name: run(name, batch_size=batch_size, max_rows=max_rows) for name in due()}
@@ -0,0 +1,142 @@
+"""
+People search.
+
+Every user has one document in the ``search_index`` SQLite FTS5 table
+(rowid = user id): their name, their email, their organisation (company
+or firm name and their startups' names) and an "about" column (bio,
+location, industries, startup and portfolio descriptions). signals.py
+rewrites a user's document whenever the user, their profile or one of
+their startups changes, so a search is one indexed MATCH instead of a
+``LIKE '%...%'`` scan of the user table.
+
+Each word of a query matches as a prefix ("ali acm" finds Alice of Acme)
+and results are ranked by bm25, with name and organisation matches
+weighted above email and about text. On databases other than SQLite the
+index does not exist and search() falls back to substring filters.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import EntrepreneurProfile, Startup, User
+
+TABLE = 'search_index'
+
+# bm25 weights of the name, email, organisation and about columns
+WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+
+# Fields whose change rewrites a document; saves touching only others
+# (last_login, profile_views...) leave the index alone
+USER_FIELDS = {'first_name', 'last_name', 'email'}
+PROFILE_FIELDS = {
+    'company_name', 'firm_name', 'bio', 'location', 'industries', 'preferred_industries',
+    'startup_description', 'portfolio_companies',
+}
+
+WORD = re.compile(r'\w+')
+
+
+def _documents_sql():
+    from Investors.models import InvestorProfile
+
+    user, entrepreneur, investor, startup = (
+        model._meta.db_table for model in (User, EntrepreneurProfile, InvestorProfile, Startup)
+    )
+    return f'''
+        SELECT u.id,
+               u.first_name || ' ' || u.last_name,
+               u.email,
+               COALESCE(ep.company_name, '') || ' ' || COALESCE(ip.firm_name, '') || ' ' || COALESCE(
+                   (SELECT group_concat(s.name, ' ') FROM "{startup}" s WHERE s.entrepreneur_id = u.id), ''
+               ),
+               COALESCE(ep.bio, '') || ' ' || COALESCE(ep.location, '') || ' ' || COALESCE(ep.industries, '')
+                   || ' ' || COALESCE(ep.startup_description, '') || ' ' || COALESCE(ip.bio, '')
+                   || ' ' || COALESCE(ip.location, '') || ' ' || COALESCE(ip.preferred_industries, '')
+                   || ' ' || COALESCE(ip.portfolio_companies, '') || ' ' || COALESCE(
+                       (SELECT group_concat(s.industry || ' ' || s.description, ' ')
+                        FROM "{startup}" s WHERE s.entrepreneur_id = u.id), ''
+                   )
+        FROM "{user}" u
+        LEFT JOIN "{entrepreneur}" ep ON ep.user_id = u.id
+        LEFT JOIN "{investor}" ip ON ip.user_id = u.id
+    '''
+
+
+def enabled():
+    return connection.vendor == 'sqlite'
+
+
+def index(*user_ids):
+    """Rewrite the documents of ``user_ids`` from their current rows (dropping those of deleted users)"""
+    if not enabled() or not user_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid IN ({placeholders})', user_ids)
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, name, email, organisation, about) '
+            f'{_documents_sql()} WHERE u.id IN ({placeholders})',
+            user_ids,
+        )
+
+
+def rebuild():
+    """Rewrite every document; returns how many were written"""
+    if not enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(f'INSERT INTO {TABLE} (rowid, name, email, organisation, about) {_documents_sql()}')
+        return cursor.rowcount
+
+
+def match_expression(query):
+    """The FTS5 query for ``query``: every word, as a prefix; None if it has no words"""
+    words = WORD.findall(query.lower())
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _fallback(query, exclude):
+    users = User.objects.all()
+    for word in WORD.findall(query):
+        users = users.filter(
+            Q(first_name__icontains=word) | Q(last_name__icontains=word) | Q(email__icontains=word)
+            | Q(entrepreneur_profile__company_name__icontains=word) | Q(investor_profile__firm_name__icontains=word)
+        )
+    if exclude is not None:
+        users = users.exclude(id=exclude)
+    return users.order_by('first_name', 'last_name', 'id')
+
+
+def search(query, exclude=None, limit=20):
+    """
+    ``(users, total)``: the best ``limit`` users matching ``query``, best
+    first, with their profiles loaded, and how many match in all.
+    ``exclude`` is a user id to leave out (the searcher).
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return [], 0
+    if not enabled():
+        users = _fallback(query, exclude).select_related('entrepreneur_profile', 'investor_profile')
+        return list(users[:limit]), users.count()
+
+    where = f'{TABLE} MATCH %s' + (' AND rowid != %s' if exclude is not None else '')
+    params = [expression] + ([exclude] if exclude is not None else [])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {TABLE} WHERE {where} ORDER BY bm25({TABLE}, {", ".join(map(str, WEIGHTS))}) LIMIT %s',
+            params + [limit],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if len(ids) < limit:
+            total = len(ids)
+        else:
+            cursor.execute(f'SELECT count(*) FROM {TABLE} WHERE {where}', params)
+            total = cursor.fetchone()[0]
+
+    users = User.objects.select_related('entrepreneur_profile', 'investor_profile').in_bulk(ids)
+    return [users[user_id] for user_id in ids if user_id in users], total
@@ -0,0 +1,152 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from CoFound.context_processors import forget_sidebar_counts
+from . import graph, matching, privacy, search, timeline
+from .models import (
+    CollaborationRequest, Conversation, EntrepreneurProfile, Favorite, Message, Notification, Post, Startup, User,
+    adjust_unread_notifications,
+)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: timeline.fan_out(instance))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_sidebar_post_count(sender, instance, created=True, **kwargs):
+    # post_delete passes no ``created``; edits leave the count alone
+    if created:
+        forget_sidebar_counts(instance.author_id)
+
+
+@receiver(post_save, sender=EntrepreneurProfile)
+@receiver(post_save, sender='Investors.InvestorProfile')
+def forget_sidebar_profile_views(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'profile_views' in update_fields:
+        forget_sidebar_counts(instance.user_id)
+
+
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    if created:
+        Conversation.objects.record_message(instance)
+
+
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    # Marking read goes through NotificationService, which adjusts the count itself
+    if created and not instance.is_read:
+        adjust_unread_notifications(instance.user_id, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        adjust_unread_notifications(instance.user_id, -1)
+
+
+@receiver(post_save, sender=CollaborationRequest)
+def sync_collaboration_timelines(sender, instance, **kwargs):
+    if instance.status == 'accepted':
+        timeline.follow(instance.investor_id, instance.entrepreneur_id)
+        timeline.follow(instance.entrepreneur_id, instance.investor_id)
+    elif instance.status != 'pending':
+        # An accepted request may later be cancelled; unfollow is a no-op
+        # while another link between the two users remains
+        timeline.unfollow(instance.investor_id, instance.entrepreneur_id)
+        timeline.unfollow(instance.entrepreneur_id, instance.investor_id)
+
+
+@receiver(post_delete, sender=CollaborationRequest)
+def drop_collaboration_timelines(sender, instance, **kwargs):
+    if instance.status == 'accepted':
+        timeline.unfollow(instance.investor_id, instance.entrepreneur_id)
+        timeline.unfollow(instance.entrepreneur_id, instance.investor_id)
+
+
+@receiver(post_save, sender=Favorite)
+def follow_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.target_user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def unfollow_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.target_user_id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_follow_links(sender, instance, **kwargs):
+    graph.invalidate(instance.user_id, instance.target_user_id)
+    privacy.forget_pair(instance.user_id, instance.target_user_id)
+
+
+@receiver(post_save, sender=CollaborationRequest)
+@receiver(post_delete, sender=CollaborationRequest)
+def invalidate_collaboration_links(sender, instance, **kwargs):
+    graph.invalidate(instance.investor_id, instance.entrepreneur_id)
+
+
+def _sync_industries(side, instance, update_fields):
+    field = matching.PROFILE_FIELDS[side]
+    # Most saves (e.g. the profile_views bump) do not touch the industries
+    if update_fields is not None and field not in update_fields:
+        return
+    matching.sync_profile(instance.user_id, side, getattr(instance, field))
+
+
+@receiver(post_save, sender=EntrepreneurProfile)
+def index_entrepreneur_industries(sender, instance, update_fields=None, **kwargs):
+    _sync_industries('entrepreneur', instance, update_fields)
+
+
+@receiver(post_save, sender='Investors.InvestorProfile')
+def index_investor_industries(sender, instance, update_fields=None, **kwargs):
+    _sync_industries('investor', instance, update_fields)
+
+
+@receiver(post_delete, sender=EntrepreneurProfile)
+def unindex_entrepreneur_industries(sender, instance, **kwargs):
+    matching.sync_profile(instance.user_id, 'entrepreneur', '')
+
+
+@receiver(post_delete, sender='Investors.InvestorProfile')
+def unindex_investor_industries(sender, instance, **kwargs):
+    matching.sync_profile(instance.user_id, 'investor', '')
+
+
+@receiver(post_save, sender=User)
+def index_user(sender, instance, update_fields=None, **kwargs):
+    # Logins and last_active bumps save the user without touching the document
+    if update_fields is None or search.USER_FIELDS & set(update_fields):
+        search.index(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def unindex_user(sender, instance, **kwargs):
+    search.index(instance.pk)
+
+
+@receiver(post_save, sender=EntrepreneurProfile)
+@receiver(post_save, sender='Investors.InvestorProfile')
+def index_profile(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or search.PROFILE_FIELDS & set(update_fields):
+        search.index(instance.user_id)
+
+
+@receiver(post_delete, sender=EntrepreneurProfile)
+@receiver(post_delete, sender='Investors.InvestorProfile')
+def unindex_profile(sender, instance, **kwargs):
+    search.index(instance.user_id)
+
+
+@receiver(post_save, sender=Startup)
+@receiver(post_delete, sender=Startup)
+def index_startup_owner(sender, instance, **kwargs):
+    search.index(instance.entrepreneur_id)
@@ -1,3 +1,543 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from CoFound.storage import get_blob_store
+from Investors.models import InvestorProfile
+
+from . import graph, matching, privacy, retention, search, timeline
+from .models import (
+    User, EntrepreneurProfile, Post, Comment, Favorite, CollaborationRequest, FeedEntry, ProfileIndustry,
+    Message, Conversation, Notification, mark_viewer_state, ActivityLog, ActivityLogArchive, NotificationArchive,
+    RetentionCheckpoint, Startup,
+)
+
+
+class FeedTimelineTests(TestCase):
+    """Fan-out-on-write timelines follow the follow/collaboration graph"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.reader = User.objects.create_user('reader@example.com', 'pw', role='investor')
+        self.stranger = User.objects.create_user('stranger@example.com', 'pw', role='entrepreneur')
+
+    def create_post(self, author, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, content=content)
+
+    def feed_ids(self, user):
+        posts, _ = timeline.timeline_page(user, limit=50)
+        return [post.id for post in posts]
+
+    def test_new_post_fans_out_to_followers(self):
+        Favorite.objects.create(user=self.reader, target_user=self.author)
+        post = self.create_post(self.author, 'hello')
+        stranger_post = self.create_post(self.stranger, 'unrelated')
+
+        self.assertEqual(self.feed_ids(self.reader), [post.id])
+        self.assertTrue(FeedEntry.objects.filter(user=self.author, post=post).exists())
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader, post=stranger_post).exists())
+
+    def test_toggle_connection_backfills_and_removes(self):
+        older = self.create_post(self.author, 'before follow')
+        self.client.force_login(self.reader)
+        url = reverse('investors:toggle_connect', args=[self.author.id])
+
+        self.client.post(url)
+        self.assertEqual(self.feed_ids(self.reader), [older.id])
+
+        self.client.post(url)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_unfollow_keeps_posts_of_accepted_collaborator(self):
+        post = self.create_post(self.author, 'update')
+        CollaborationRequest.objects.create(investor=self.reader, entrepreneur=self.author, status='accepted')
+        Favorite.objects.create(user=self.reader, target_user=self.author)
+
+        timeline.unfollow(self.reader.id, self.author.id)
+        self.assertEqual(self.feed_ids(self.reader), [post.id])
+
+    def test_empty_timeline_falls_back_to_global_feed(self):
+        posts = [self.create_post(self.stranger, f'post {n}') for n in range(3)]
+        FeedEntry.objects.all().delete()
+
+        page, next_cursor = timeline.timeline_page(self.reader, limit=2)
+        self.assertEqual([p.id for p in page], [posts[2].id, posts[1].id])
+        page, _ = timeline.timeline_page(self.reader, cursor=next_cursor, limit=2)
+        self.assertEqual([p.id for p in page], [posts[0].id])
+
+    def test_fallback_is_decided_on_the_first_page_only(self):
+        Favorite.objects.create(user=self.reader, target_user=self.author)
+        posts = [self.create_post(self.author, f'post {n}') for n in range(3)]
+
+        with CaptureQueriesContext(connection) as first:
+            page, next_cursor = timeline.timeline_page(self.reader, limit=2)
+        with CaptureQueriesContext(connection) as second:
+            page, _ = timeline.timeline_page(self.reader, cursor=next_cursor, limit=2)
+        self.assertEqual([p.id for p in page], [posts[0].id])
+        self.assertEqual(len(second), len(first) - 1)
+
+    def test_own_posts_do_not_replace_the_global_feed(self):
+        other = self.create_post(self.stranger, 'from someone else')
+        own = self.create_post(self.reader, 'my first post')
+        self.assertEqual(self.feed_ids(self.reader), [own.id, other.id])
+
+        Favorite.objects.create(user=self.reader, target_user=self.author)
+        followed = self.create_post(self.author, 'followed')
+        self.assertEqual(self.feed_ids(self.reader), [followed.id, own.id])
+
+        # Unfollowing through the ORM, not the view, still updates the timeline
+        Favorite.objects.filter(user=self.reader, target_user=self.author).delete()
+        self.assertEqual(self.feed_ids(self.reader), [followed.id, own.id, other.id])
+
+
+class PostCounterTests(TestCase):
+    """Like, comment and save totals live on Post and follow the views"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.viewer = User.objects.create_user('viewer@example.com', 'pw', role='investor')
+        self.post = Post.objects.create(author=self.author, content='hello')
+        self.client.force_login(self.viewer)
+
+    def test_like_and_save_toggle_counters(self):
+        like_url = reverse('investors:like_post', args=[self.post.id])
+        save_url = reverse('investors:toggle_save', args=[self.post.id])
+
+        self.assertEqual(self.client.post(like_url).json()['likes_count'], 1)
+        self.client.post(save_url)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.save_count), (1, 1))
+
+        [marked] = mark_viewer_state([self.post], self.viewer)
+        self.assertTrue(marked.liked_by_viewer and marked.saved_by_viewer)
+
+        self.assertEqual(self.client.post(like_url).json()['likes_count'], 0)
+        self.assertFalse(self.client.post(save_url).json()['saved'])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.save_count), (0, 0))
+
+    def test_comment_counter(self):
+        response = self.client.post(reverse('investors:add_comment', args=[self.post.id]), {'content': 'Nice'})
+        comment_id = response.json()['comment']['id']
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        self.client.post(reverse('investors:delete_comment', args=[comment_id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+        # A concurrent delete removed the row after the view loaded it
+        response = self.client.post(reverse('investors:add_comment', args=[self.post.id]), {'content': 'Again'})
+        comment_id = response.json()['comment']['id']
+        stale = [Comment.objects.get(pk=comment_id) for _ in range(2)]
+        Comment.objects.filter(pk=comment_id).delete()
+        for app in ('Investors', 'Entrepreneurs'):
+            with mock.patch(f'{app}.views.get_object_or_404', return_value=stale.pop()):
+                self.client.post(reverse(f'{app.lower()}:delete_comment', args=[comment_id]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.post.likes.add(self.viewer)
+        Comment.objects.create(post=self.post, author=self.viewer, content='direct')
+        Post.objects.filter(pk=self.post.pk).update(save_count=7)
+
+        call_command('reconcile_post_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count, self.post.save_count), (1, 1, 0))
+
+
+class SocialGraphTests(TestCase):
+    """Second-degree suggestions are ranked by mutual connections in constant queries"""
+
+    def setUp(self):
+        cache.clear()
+        self.me, self.a, self.b, self.c, self.x, self.y = [
+            User.objects.create_user(f'user{n}@example.com', 'pw', role='investor') for n in range(6)
+        ]
+        Favorite.objects.create(user=self.me, target_user=self.a)
+        Favorite.objects.create(user=self.me, target_user=self.b)
+        CollaborationRequest.objects.create(investor=self.me, entrepreneur=self.c, status='accepted')
+        # x is linked from a, b and c; y only from a; b is also linked from a
+        for neighbour in (self.a, self.b, self.c):
+            Favorite.objects.create(user=neighbour, target_user=self.x)
+        Favorite.objects.create(user=self.a, target_user=self.y)
+        Favorite.objects.create(user=self.a, target_user=self.b)
+        CollaborationRequest.objects.create(investor=self.y, entrepreneur=self.me, status='pending')
+
+    def test_ranked_by_mutual_count(self):
+        self.assertEqual(graph.neighbor_ids(self.me.id), {self.a.id, self.b.id, self.c.id})
+        self.assertEqual(graph.rank_mutuals(self.me.id), [(self.x.id, 3), (self.y.id, 1)])
+
+    def test_suggestions_use_constant_queries(self):
+        for n in range(10):
+            extra = User.objects.create_user(f'extra{n}@example.com', 'pw', role='entrepreneur')
+            Favorite.objects.create(user=self.me, target_user=extra)
+            Favorite.objects.create(user=extra, target_user=self.y)
+
+        with self.assertNumQueries(5):
+            suggestions = graph.suggest_mutuals(self.me, k=1)
+        self.assertEqual([(u, u.mutual_count) for u in suggestions], [(self.y, 11)])
+
+    def test_warm_snapshot_answers_without_queries(self):
+        graph.links_many([self.me.id, self.y.id])
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.are_friends(self.me.id, self.a.id))
+            self.assertFalse(graph.are_friends(self.me.id, self.x.id))
+            self.assertEqual(graph.connection_status(self.me.id, self.c.id), 'accepted')
+            self.assertEqual(graph.connection_status(self.me.id, self.y.id), 'pending')
+            self.assertEqual(graph.follower_ids(self.y.id), {self.a.id})
+
+    def test_changes_invalidate_both_users(self):
+        graph.links_many([self.me.id, self.x.id])
+        Favorite.objects.create(user=self.x, target_user=self.me)
+        self.assertTrue(graph.are_friends(self.me.id, self.x.id))
+        self.assertEqual(graph.mutual_ids(self.me.id, self.x.id), set())
+
+        Favorite.objects.filter(user=self.me, target_user=self.a).delete()
+        self.assertNotIn(self.a.id, graph.neighbor_ids(self.me.id))
+        self.assertEqual(graph.connection_status(self.me.id, self.a.id), 'none')
+
+
+class IndustryMatchingTests(TestCase):
+    """Industry suggestions come from the ProfileIndustry index, ranked by overlap"""
+
+    def setUp(self):
+        self.investor = User.objects.create_user('vc@example.com', 'pw', role='investor')
+        self.profile = InvestorProfile.objects.create(user=self.investor, preferred_industries='AI, Fintech, healthtech')
+        self.founders = []
+        for n, industries in enumerate(['fintech, ai', 'Healthtech', 'spacetech', 'AI,fintech,healthtech']):
+            founder = User.objects.create_user(f'founder{n}@example.com', 'pw', role='entrepreneur')
+            EntrepreneurProfile.objects.create(user=founder, industries=industries)
+            self.founders.append(founder)
+
+    def test_ranked_by_overlap_in_one_query(self):
+        with self.assertNumQueries(2):
+            matches = matching.industry_matches(self.investor, self.profile, exclude={self.founders[0].id})
+        self.assertEqual(
+            [(m, m.industry_overlap) for m in matches],
+            [(self.founders[3], 3), (self.founders[1], 1)],
+        )
+
+    def test_index_follows_profile_edits(self):
+        profile = self.founders[2].entrepreneur_profile
+        profile.industries = 'AI'
+        profile.save()
+        self.assertEqual(set(ProfileIndustry.objects.filter(user=self.founders[2]).values_list('term', flat=True)), {'ai'})
+
+        profile.industries = 'quantum'
+        profile.profile_views = 5
+        profile.save(update_fields=['profile_views'])
+        self.assertTrue(ProfileIndustry.objects.filter(user=self.founders[2], term='ai').exists())
+
+
+class ConversationInboxTests(TestCase):
+    """The inbox reads Conversation summaries kept current on send and read"""
+
+    def setUp(self):
+        cache.clear()
+        self.me = User.objects.create_user('me@example.com', 'pw', role='investor')
+        self.others = [
+            User.objects.create_user(f'other{n}@example.com', 'pw', role='entrepreneur') for n in range(4)
+        ]
+        self.client.force_login(self.me)
+
+    def send(self, sender, receiver, content):
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def test_summary_tracks_latest_message_and_unread(self):
+        other = self.others[0]
+        self.send(other, self.me, 'hi')
+        last = self.send(other, self.me, 'are you there?')
+        self.send(self.me, self.others[1], 'hello')
+
+        user_a_id, user_b_id = Conversation.objects.pair(self.me.id, other.id)
+        conversation = Conversation.objects.get(user_a_id=user_a_id, user_b_id=user_b_id)
+        self.assertEqual(conversation.last_message_id, last.id)
+        self.assertEqual(conversation.last_message_preview, 'are you there?')
+        self.assertEqual((conversation.unread_for(self.me), conversation.unread_for(other)), (2, 0))
+        self.assertEqual(Conversation.objects.unread_total(self.me), 2)
+
+        self.client.get(reverse('investors:get_messages', args=[other.id]), HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_for(self.me), 0)
+        self.assertEqual(conversation.read_upto()[self.me.id], last.id)
+
+    def test_read_watermark_counts_only_newer_messages(self):
+        other = self.others[0]
+        first = self.send(other, self.me, 'one')
+        self.send(other, self.me, 'two')
+        self.send(other, self.me, 'three')
+
+        self.assertTrue(Conversation.objects.mark_read(self.me.id, other.id, first.id))
+        self.assertEqual(Conversation.objects.unread_total(self.me), 2)
+        # The watermark never moves backwards
+        self.assertFalse(Conversation.objects.mark_read(self.me.id, other.id, first.id))
+
+    def test_inbox_queries_do_not_grow_with_history(self):
+        def inbox_queries():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('investors:messages'))
+            return response, len(queries)
+
+        self.send(self.others[0], self.me, 'first')
+        _, baseline = inbox_queries()
+
+        for other in self.others:
+            for n in range(5):
+                self.send(other, self.me, f'message {n}')
+        response, queries = inbox_queries()
+
+        self.assertEqual(queries, baseline)
+        self.assertEqual(response.context['recents'][0], self.others[-1])
+        self.assertEqual(response.context['unread_counts'][self.others[0].id], 6)
+        self.assertEqual(response.context['total_unread_count'], 21)
+
+    def test_total_unread_counts_only_listed_conversations(self):
+        hidden = User.objects.create_user('hidden@example.com', 'pw', role='entrepreneur', message_privacy='private')
+        self.send(hidden, self.me, 'you cannot reply to this')
+        self.send(self.others[0], self.me, 'hi')
+
+        response = self.client.get(reverse('entrepreneurs:messages'))
+        self.assertEqual(response.context['recents'], [self.others[0]])
+        self.assertEqual(response.context['total_unread_count'], 1)
+
+
+class MessagingPrivacyTests(TestCase):
+    """can_message decisions are cached per pair and dropped when the rule's inputs change"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice@example.com', 'pw', role='investor')
+        self.bob = User.objects.create_user('bob@example.com', 'pw', role='entrepreneur')
+        self.carol = User.objects.create_user('carol@example.com', 'pw', role='entrepreneur', message_privacy='private')
+
+    def test_decision_is_cached_until_a_follow_changes(self):
+        self.assertFalse(privacy.can_message(self.alice.id, self.carol.id))
+        with self.assertNumQueries(0):
+            self.assertFalse(privacy.can_message(self.alice.id, self.carol.id))
+
+        favorite = Favorite.objects.create(user=self.carol, target_user=self.alice)
+        self.assertTrue(privacy.can_message(self.alice.id, self.carol.id))
+        favorite.delete()
+        self.assertFalse(privacy.can_message(self.alice.id, self.carol.id))
+
+    def test_decisions_ignore_stale_graph_snapshots(self):
+        favorite = Favorite.objects.create(user=self.carol, target_user=self.alice)
+        graph.links_many([self.alice.id, self.carol.id])
+        # Unfollowed through another worker: this process's graph cache never hears of it
+        with mock.patch.object(graph, 'invalidate'):
+            favorite.delete()
+        self.assertTrue(graph.are_friends(self.alice.id, self.carol.id))
+        self.assertFalse(privacy.can_message(self.alice.id, self.carol.id))
+
+    def test_message_settings_drop_decisions_about_the_user(self):
+        self.assertTrue(privacy.can_message(self.alice.id, self.bob.id))
+        self.assertTrue(privacy.can_message(self.carol.id, self.bob.id))
+        self.client.force_login(self.bob)
+        self.client.post(reverse('investors:message_settings'), {'message_privacy': 'private'})
+        self.assertFalse(privacy.can_message(self.alice.id, self.bob.id))
+        self.assertFalse(privacy.can_message(self.carol.id, self.bob.id))
+
+    def test_decisions_live_in_the_shared_cache(self):
+        self.assertTrue(privacy.can_message(self.alice.id, self.bob.id))
+        self.assertEqual(cache.get(privacy._decision_key(self.alice.id, self.bob.id)), (None, True))
+
+        # Bob's settings saved by another worker sharing the cache
+        User.objects.filter(id=self.bob.id).update(message_privacy='private')
+        cache.set(privacy._generation_key(self.bob.id), 'elsewhere')
+        self.assertFalse(privacy.can_message(self.alice.id, self.bob.id))
+
+    def test_messageable_decides_many_receivers_at_once(self):
+        others = [
+            User.objects.create_user(f'private{n}@example.com', 'pw', role='entrepreneur', message_privacy='private')
+            for n in range(5)
+        ]
+        Favorite.objects.create(user=others[0], target_user=self.alice)
+        Favorite.objects.create(user=self.alice, target_user=others[1])
+        with self.assertNumQueries(2):
+            allowed = privacy.messageable(self.alice.id, [self.alice.id, self.bob.id] + [u.id for u in others])
+        self.assertEqual(allowed, {self.bob.id, others[0].id, others[1].id})
+        with self.assertNumQueries(0):
+            privacy.messageable(self.alice.id, [self.bob.id] + [u.id for u in others])
+
+    def test_search_agrees_with_the_send_path(self):
+        favorite = Favorite.objects.create(user=self.carol, target_user=self.alice)
+        graph.links_many([self.alice.id, self.carol.id])
+        with mock.patch.object(graph, 'invalidate'):
+            favorite.delete()
+        self.client.force_login(self.alice)
+        for name in ('entrepreneurs:message_search', 'investors:message_search'):
+            results = self.client.get(reverse(name), {'q': 'carol'}).json()['results']
+            self.assertEqual([(r['id'], r['can_message']) for r in results], [(self.carol.id, False)])
+
+    @override_settings(MESSAGE_PRIVACY_CACHE_TTL=0)
+    def test_decisions_expire(self):
+        privacy.can_message(self.alice.id, self.bob.id)
+        with self.assertNumQueries(1):
+            privacy.can_message(self.alice.id, self.bob.id)
+
+
+class RetentionTests(TestCase):
+    """Old read notifications become monthly totals, a bounded batch at a time"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader@example.com', 'pw', role='investor')
+        self.fan = User.objects.create_user('fan@example.com', 'pw', role='entrepreneur')
+        old = timezone.now() - timedelta(days=200)
+        self.month = retention.month_of(old)
+        for n in range(5):
+            Notification.objects.create(user=self.user, sender=self.fan, notification_type='like',
+                                        title='Like', message='hi', actor_count=n + 1, is_read=True)
+        Notification.objects.create(user=self.user, notification_type='follow', title='Unread', message='hi')
+        Notification.objects.update(created_at=old)
+        Notification.objects.create(user=self.user, notification_type='like', title='Recent', message='hi', is_read=True)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_notifications', '--table', 'notifications', '--batch-size', '2', *args, stdout=out)
+        return out.getvalue()
+
+    def test_read_notifications_fold_into_monthly_totals(self):
+        self.assertIn('archived 5 rows', self.archive())
+        self.assertEqual(sorted(Notification.objects.values_list('title', flat=True)), ['Recent', 'Unread'])
+        archive = NotificationArchive.objects.get()
+        self.assertEqual((archive.user, archive.month, archive.notification_type), (self.user, self.month, 'like'))
+        self.assertEqual((archive.count, archive.actor_count), (5, 15))
+        self.assertFalse(RetentionCheckpoint.objects.exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notification_count, 1)
+
+    def test_batches_are_deleted_without_loading_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            retention.run('notifications', batch_size=10)
+        self.assertEqual(Notification.objects.count(), 2)
+        # One narrow SELECT of the batch; no per-row fetch for delete signals
+        notification_selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and '"title"' in q['sql']]
+        self.assertEqual(notification_selects, [])
+
+    def test_bounded_runs_resume_from_the_checkpoint(self):
+        self.assertIn('will resume', self.archive('--max-rows', '2'))
+        checkpoint = RetentionCheckpoint.objects.get()
+        self.assertEqual(checkpoint.archived, 2)
+        self.assertEqual(NotificationArchive.objects.get().count, 2)
+
+        self.archive()
+        self.assertEqual((NotificationArchive.objects.get().count, NotificationArchive.objects.get().actor_count), (5, 15))
+        self.assertFalse(RetentionCheckpoint.objects.exists())
+
+    def test_dry_run_changes_nothing(self):
+        self.assertIn('5 rows would be archived', self.archive('--dry-run'))
+        self.assertEqual(Notification.objects.count(), 7)
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    @override_settings(ACTIVITY_LOG_RETENTION_DAYS=30)
+    def test_activity_logs_archive_once_enabled(self):
+        for action in ('login', 'login', 'view_profile'):
+            ActivityLog.objects.create(user=self.user, action=action)
+        ActivityLog.objects.update(timestamp=timezone.now() - timedelta(days=60))
+        ActivityLog.objects.create(user=self.user, action='login')
+
+        call_command('archive_notifications', stdout=StringIO())
+        self.assertEqual(ActivityLog.objects.count(), 1)
+        self.assertEqual(dict(ActivityLogArchive.objects.values_list('action', 'count')), {'login': 2, 'view_profile': 1})
+        self.assertEqual(NotificationArchive.objects.get().count, 5)
+
+
+class PeopleSearchTests(TestCase):
+    """Search ranks prefix matches over names, organisations and startups from the FTS index"""
+
+    def setUp(self):
+        self.viewer = User.objects.create_user('viewer@example.com', 'pw', role='investor')
+        self.alice = User.objects.create_user('alice@example.com', 'pw', role='entrepreneur',
+                                              first_name='Alice', last_name='Archer')
+        EntrepreneurProfile.objects.create(user=self.alice, company_name='Acme Robotics', bio='Warehouse automation')
+        self.bob = User.objects.create_user('bob@example.com', 'pw', role='investor', first_name='Bob')
+        InvestorProfile.objects.create(user=self.bob, firm_name='Northwind Ventures', bio='Backs robotics founders')
+        self.client.force_login(self.viewer)
+
+    def names(self, query):
+        response = self.client.get(reverse('investors:search_results_page'), {'q': query})
+        return [user.first_name for user in response.context['users']], response.context['total_results']
+
+    def test_prefix_matches_across_profiles_and_startups(self):
+        self.assertEqual(self.names('ali acm'), (['Alice'], 1))
+        self.assertEqual(self.names('northw'), (['Bob'], 1))
+        Startup.objects.create(entrepreneur=self.alice, name='Zephyr Drones', description='Delivery', industry='tech',
+                               funding_goal=1000)
+        self.assertEqual(self.names('zephyr'), (['Alice'], 1))
+        self.assertEqual(self.names('viewer'), ([], 0))
+
+    def test_name_matches_rank_above_bio_matches(self):
+        self.assertEqual(self.names('robotics'), (['Alice', 'Bob'], 2))
+
+    def test_edits_and_deletes_update_the_index(self):
+        profile = self.bob.investor_profile
+        profile.firm_name = 'Southwind Capital'
+        profile.save()
+        self.assertEqual(self.names('northwind'), ([], 0))
+        self.assertEqual(self.names('southwind'), (['Bob'], 1))
+
+        self.alice.delete()
+        self.assertEqual(self.names('acme'), ([], 0))
+        self.assertEqual(search.rebuild(), 2)
+
+    def test_suggestions_are_json(self):
+        response = self.client.get(reverse('investors:search_users'), {'q': 'alic'})
+        self.assertEqual([user['id'] for user in response.json()['users']], [self.alice.id])
+        # FTS5 syntax in a query is searched for as words, never parsed
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('investors:search_users'), {'q': 'bob" *) ^'})
+        self.assertEqual([user['id'] for user in response.json()['users']], [self.bob.id])
+        self.assertFalse([q for q in queries if 'LIKE' in q['sql']])
+
+
+@override_settings(BLOB_STORE={'BACKEND': 'CoFound.storage.InMemoryBlobStore'})
+class MediaBlobMigrationTests(TransactionTestCase):
+    """The blob store migrations move BinaryField bytes into MediaBlob rows"""
+
+    before = [('Entrepreneurs', '0017_alter_user_managers_alter_user_role'), ('Investors', '0007_investorprofile_profile_views')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        # Leave the schema migrated even if the test fails half way
+        self.latest = MigrationExecutor(connection).loader.graph.leaf_nodes()
+        self.addCleanup(self.migrate, self.latest)
+
+    def test_bytes_move_into_deduplicated_blobs(self):
+        old = self.migrate(self.before)
+        OldUser = old.get_model('Entrepreneurs', 'User')
+        avatar = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+        founder = OldUser.objects.create(email='founder@example.com', role='entrepreneur')
+        investor = OldUser.objects.create(email='investor@example.com', role='investor')
+        old.get_model('Entrepreneurs', 'EntrepreneurProfile').objects.create(user=founder, image=avatar)
+        old.get_model('Investors', 'InvestorProfile').objects.create(user=investor, image=avatar)
+        post = old.get_model('Entrepreneurs', 'Post').objects.create(author=founder, content='deck')
+        old.get_model('Entrepreneurs', 'PostMedia').objects.create(
+            post=post, media_type='document', file_name='deck.pdf', file_type='application/x-deck', file_data=b'%PDF-1.4',
+        )
+
+        self.migrate(self.latest)
+        entrepreneur_profile = EntrepreneurProfile.objects.get(user_id=founder.pk)
+        investor_profile = InvestorProfile.objects.get(user_id=investor.pk)
+        self.assertEqual(entrepreneur_profile.image_blob_id, investor_profile.image_blob_id)
+        self.assertEqual(investor_profile.image.read(), avatar)
+        self.assertEqual(entrepreneur_profile.image_blob.mime_type, 'image/png')
+        media = Post.objects.get(pk=post.pk).media_files.get()
+        self.assertEqual((media.file_blob.mime_type, media.file_blob.size), ('application/x-deck', 8))
+        self.assertEqual(get_blob_store().read(media.file_blob_id), b'%PDF-1.4')
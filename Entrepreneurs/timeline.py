@@ -0,0 +1,117 @@
+"""
+Per-user home timelines, precomputed on write.
+
+Every new post is copied into the FeedEntry rows of its author, the author's
+followers (Favorite) and their accepted CollaborationRequest connections.
+Reading a feed is then one range scan over ``(user, created_at, post)``.
+Following someone copies in their most recent posts; unfollowing removes
+them unless the two users are still connected some other way.
+
+Users whose timeline holds nobody else's posts (new accounts, people who
+follow no one who has posted, or before the backfill command has run) are
+shown the global feed instead. Their own posts do not count, so writing a
+first post never empties someone's home feed. That is decided on the first
+page; the cursors of global pages say so, and later pages follow them.
+
+Follows and collaborations reach the timeline through signals.py, whatever
+code path creates or deletes the Favorite or CollaborationRequest row.
+"""
+from django.db.models import Q
+
+from CoFound.pagination import keyset_page
+from .models import CollaborationRequest, Favorite, FeedEntry, Post
+
+# How many of an author's latest posts are copied in when following them
+FOLLOW_BACKFILL = 200
+
+BATCH_SIZE = 1000
+
+# Prefix of the cursors of global fallback pages ('.' is not in the keyset
+# cursor alphabet)
+GLOBAL_CURSOR_PREFIX = 'all.'
+
+
+def _collaborator_ids(user_id):
+    ids = set()
+    for investor_id, entrepreneur_id in CollaborationRequest.objects.filter(
+        Q(investor_id=user_id) | Q(entrepreneur_id=user_id), status='accepted'
+    ).values_list('investor_id', 'entrepreneur_id'):
+        ids.add(investor_id)
+        ids.add(entrepreneur_id)
+    ids.discard(user_id)
+    return ids
+
+
+def audience_ids(author_id):
+    """Users whose timelines receive ``author_id``'s posts, the author included"""
+    ids = set(Favorite.objects.filter(target_user_id=author_id).values_list('user_id', flat=True))
+    ids |= _collaborator_ids(author_id)
+    ids.add(author_id)
+    return ids
+
+
+def source_ids(user_id):
+    """Authors whose posts belong in ``user_id``'s timeline, the user included"""
+    ids = set(Favorite.objects.filter(user_id=user_id).values_list('target_user_id', flat=True))
+    ids |= _collaborator_ids(user_id)
+    ids.add(user_id)
+    return ids
+
+
+def _insert(entries):
+    FeedEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Write ``post`` into the timeline of everyone in its author's audience"""
+    _insert(
+        FeedEntry(user_id=user_id, post_id=post.pk, created_at=post.created_at)
+        for user_id in audience_ids(post.author_id)
+    )
+
+
+def follow(user_id, author_id):
+    """Copy ``author_id``'s recent posts into ``user_id``'s timeline"""
+    recent = Post.objects.filter(author_id=author_id).values_list('pk', 'created_at')[:FOLLOW_BACKFILL]
+    _insert(FeedEntry(user_id=user_id, post_id=pk, created_at=created_at) for pk, created_at in recent)
+
+
+def unfollow(user_id, author_id):
+    """Drop ``author_id``'s posts from ``user_id``'s timeline if nothing else links them"""
+    if author_id in source_ids(user_id):
+        return
+    FeedEntry.objects.filter(user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild(user_id, limit=FOLLOW_BACKFILL):
+    """Recreate ``user_id``'s timeline from scratch; returns the number of entries"""
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    entries = [
+        FeedEntry(user_id=user_id, post_id=pk, created_at=created_at)
+        for author_id in source_ids(user_id)
+        for pk, created_at in Post.objects.filter(author_id=author_id).values_list('pk', 'created_at')[:limit]
+    ]
+    _insert(entries)
+    return len(entries)
+
+
+def timeline_page(user, cursor=None, limit=10):
+    """
+    Return ``(posts, next_cursor)`` for ``user``'s home feed. Raises
+    ValueError for a malformed cursor.
+    """
+    if not cursor:
+        fallback = not FeedEntry.objects.filter(user=user).exclude(post__author=user).exists()
+    else:
+        fallback = cursor.startswith(GLOBAL_CURSOR_PREFIX)
+        cursor = cursor.removeprefix(GLOBAL_CURSOR_PREFIX)
+    if fallback:
+        posts, next_cursor = keyset_page(Post.objects.for_feed(), cursor, limit)
+        return posts, next_cursor and GLOBAL_CURSOR_PREFIX + next_cursor
+
+    entries, next_cursor = keyset_page(
+        FeedEntry.objects.filter(user=user), cursor, limit, pk_field='post_id'
+    )
+    post_ids = [entry.post_id for entry in entries]
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return [posts[pk] for pk in post_ids if pk in posts], next_cursor
@@ -8,17 +8,16 @@ from .models import User, EntrepreneurProfile, Startup
 from .forms import EntrepreneurRegistrationForm, EntrepreneurProfileForm, StartupForm
 from django.http import JsonResponse
 from .forms import PostForm
-from .models import Post, PostMedia
+from .models import Post, PostMedia, mark_viewer_state
 from django.views.decorators.http import require_POST, require_http_methods
 from django.http import JsonResponse, HttpResponseForbidden
 from .models import Post, Comment, CollaborationRequest, EntrepreneurProfile, Favorite
 from .forms import CommentForm
 from django.shortcuts import get_object_or_404
-import base64
 from Investors.models import InvestorProfile, FundingRound, InvestmentCommitment
 from django.db.models import Q
 from django.db import transaction
-from .models import Message, MessageSerializer
+from .models import Conversation, Message, MessageSerializer
 from .forms import MessageForm
 from django.http import JsonResponse, HttpResponseForbidden
 from django.views.decorators.csrf import csrf_exempt
@@ -26,7 +25,9 @@ from django.db.models import Q
 from django.contrib.auth.decorators import login_required
 from django.db import models
 from .forms import MeetingRequestForm
+from . import privacy, search
 from .models import Meeting, Notification
+from CoFound.variants import sized_url
 
 # OAuth Authentication
 from allauth.socialaccount.models import SocialAccount
@@ -248,7 +249,7 @@ def entrepreneur_profile(request):
             profile = form.save(commit=False)
             image_file = request.FILES.get('image_upload')
             if image_file:
-                profile.image = image_file.read()
+                profile.image = image_file
             profile.save()
             form.save_m2m()
             messages.success(request, 'Profile updated successfully!')
@@ -290,7 +291,7 @@ def upload_startup_document(request):
                 file_obj = request.FILES['file']
                 document.file_name = file_obj.name
                 document.file_type = file_obj.content_type
-                document.file_data = file_obj.read()
+                document.file_data = file_obj
                 document.save()
                 messages.success(request, 'Document uploaded successfully!')
             else:
@@ -323,11 +324,11 @@ def create_post(request):
                 post.save()
                 # Only save each file once
                 for image in images:
-                    PostMedia.objects.create(post=post, media_type='image', file_name=image.name, file_type=image.content_type, file_data=image.read(), file_size=image.size)
+                    PostMedia.objects.create(post=post, media_type='image', file_name=image.name, file_type=image.content_type, file_data=image, file_size=image.size)
                 for video in videos:
-                    PostMedia.objects.create(post=post, media_type='video', file_name=video.name, file_type=video.content_type, file_data=video.read(), file_size=video.size)
+                    PostMedia.objects.create(post=post, media_type='video', file_name=video.name, file_type=video.content_type, file_data=video, file_size=video.size)
                 for document in documents:
-                    PostMedia.objects.create(post=post, media_type='document', file_name=document.name, file_type=document.content_type, file_data=document.read(), file_size=document.size)
+                    PostMedia.objects.create(post=post, media_type='document', file_name=document.name, file_type=document.content_type, file_data=document, file_size=document.size)
                 
                 # Send notification to followers
                 from Investors.services import notify_post_created
@@ -346,12 +347,8 @@ def create_post(request):
 def like_post(request, post_id):
     try:
         post = Post.objects.get(id=post_id)
-        if request.user in post.likes.all():
-            post.likes.remove(request.user)
-            liked = False
-        else:
-            post.likes.add(request.user)
-            liked = True
+        liked = post.toggle_like(request.user)
+        if liked:
             # Send notification to post author when someone likes their post
             if request.user != post.author:
                 from Investors.services import notify_like
@@ -360,7 +357,7 @@ def like_post(request, post_id):
         return JsonResponse({
             'success': True,
             'liked': liked,
-            'likes_count': post.likes.count()
+            'likes_count': post.like_count
         })
     except Post.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Post not found'})
@@ -375,30 +372,21 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            post.adjust_counter('comment_count', 1)
 
         # Send notification to post author when someone comments on their post
         if request.user != post.author:
             from Investors.services import notify_comment
             notify_comment(post, request.user)
 
-        # Safely resolve and encode profile image
-        image_bytes = None
-        try:
-            if hasattr(comment.author, 'entrepreneur_profile') and comment.author.entrepreneur_profile.image:
-                image_bytes = comment.author.entrepreneur_profile.image
-            elif hasattr(comment.author, 'investor_profile') and comment.author.investor_profile.image:
-                image_bytes = comment.author.investor_profile.image
-        except Exception:
-            image_bytes = None
-        author_image_b64 = base64.b64encode(image_bytes).decode('utf-8') if image_bytes else ''
-
         return JsonResponse({
             'success': True,
             'comment': {
                 'id': comment.id,
                 'author_name': comment.author.get_full_name() or comment.author.email,
-                'author_image': author_image_b64,
+                'author_image': sized_url(comment.author.profile_image_url, 64),
                 'content': comment.content,
                 'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M'),
             }
@@ -425,7 +413,11 @@ def delete_comment(request, comment_id):
 	comment = get_object_or_404(Comment, id=comment_id)
 	if comment.author != request.user:
 		return HttpResponseForbidden('Not allowed')
-	comment.delete()
+	with transaction.atomic():
+		# A repeated or concurrent delete finds no row and leaves the count alone
+		deleted, _ = comment.delete()
+		if deleted:
+			comment.post.adjust_counter('comment_count', -deleted)
 	return JsonResponse({'success': True})
 
 
@@ -458,7 +450,7 @@ def entrepreneur_profile_detail(request, user_id):
     from django.db.models import Q
     target_user = get_object_or_404(User, id=user_id, role='entrepreneur')
     profile = get_object_or_404(EntrepreneurProfile, user=target_user)
-    posts = Post.objects.filter(author=target_user).order_by('-created_at')
+    posts = mark_viewer_state(Post.objects.for_feed().filter(author=target_user).order_by('-created_at'), request.user)
     # Check connection status if viewer is investor
     connection = None
     if request.user.role == 'investor':
@@ -483,9 +475,7 @@ def entrepreneur_profile_detail(request, user_id):
 
 @login_required
 def my_posts(request):
-    posts = Post.objects.select_related(
-        'author', 'author__entrepreneur_profile', 'author__investor_profile'
-    ).prefetch_related('media_files', 'likes', 'comments').filter(author=request.user).order_by('-created_at')
+    posts = mark_viewer_state(Post.objects.for_feed().filter(author=request.user).order_by('-created_at'), request.user)
     return render(request, 'my_posts.html', { 'posts': posts })
 
 @login_required
@@ -549,12 +539,8 @@ def send_message(request):
         if form.is_valid():
             receiver = form.cleaned_data['receiver']
             # Privacy enforcement
-            if receiver.message_privacy == 'private':
-                # Allow if either user follows the other (more permissive friendship)
-                is_friend = (request.user.favorites.filter(target_user=receiver).exists() or
-                             request.user.favorited_by.filter(user=receiver).exists())
-                if not is_friend:
-                    return HttpResponseForbidden('User only accepts messages from friends.')
+            if not privacy.can_message(request.user.id, receiver.id):
+                return HttpResponseForbidden('User only accepts messages from friends.')
             msg = form.save(commit=False)
             msg.sender = request.user
             # Handle file upload
@@ -562,7 +548,7 @@ def send_message(request):
             if uploaded_file:
                 msg.file_name = uploaded_file.name
                 msg.file_type = uploaded_file.content_type
-                msg.file_data = uploaded_file.read()
+                msg.file_data = uploaded_file
                 msg.file_size = uploaded_file.size
             msg.save()
             serializer = MessageSerializer(msg)
@@ -572,86 +558,55 @@ def send_message(request):
             return JsonResponse({'success': False, 'errors': form.errors}, status=400)
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
 
+RECENT_CONVERSATIONS = 25
+
+
 @login_required
 def messages_page(request):
-    # Recent chats = users you've exchanged messages with OR you follow
-    recent_users = set()
-    from .models import Message, Favorite, User # Ensure User is imported
-    
+    # Recent chats come from the per-pair Conversation summaries, newest first
+    from .models import Conversation, User
+
     # Check if there's an open_chat parameter
     open_chat_id = request.GET.get('open_chat')
     open_chat_user = None
-    
+
     if open_chat_id:
         try:
-            user_id_int = int(open_chat_id) # Explicit conversion
-            open_chat_user = User.objects.get(id=user_id_int)
-            # Add the user to recent_users if they exist and are accessible
-            is_connected = (request.user.favorites.filter(target_user=open_chat_user).exists() or
-                            request.user.favorited_by.filter(user=open_chat_user).exists())
-            if open_chat_user.message_privacy == 'public' or is_connected:
-                recent_users.add(open_chat_user)
+            open_chat_user = User.objects.get(id=int(open_chat_id))
         except (ValueError, User.DoesNotExist): # Handle both potential errors
             # User not found or invalid ID, handled in template
             pass
-    
-    msg_users = set()
-    # Use select_related to pre-fetch sender and receiver to avoid N+1 queries
-    messages = Message.objects.filter(Q(sender=request.user) | Q(receiver=request.user)).select_related('sender', 'receiver').distinct()
-    for msg in messages:
-        try:
-            # Check if sender exists and is not the current user
-            if hasattr(msg, 'sender') and msg.sender and msg.sender != request.user:
-                msg_users.add(msg.sender.id)
-            # Check if receiver exists and is not the current user
-            if hasattr(msg, 'receiver') and msg.receiver and msg.receiver != request.user:
-                msg_users.add(msg.receiver.id)
-        except User.DoesNotExist:
-            # Skip messages with deleted users
-            continue
-    for uid in msg_users:
-        try:
-            u = User.objects.get(id=uid)
-            is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                            request.user.favorited_by.filter(user=u).exists())
-            if u.message_privacy == 'public' or is_connected:
-                recent_users.add(u)
-        except User.DoesNotExist:
-            pass
-    for f in Favorite.objects.filter(user=request.user).select_related('target_user'):
-        u = f.target_user
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        if u.message_privacy == 'public' or is_connected:
-            recent_users.add(u)
-    for f in Favorite.objects.filter(target_user=request.user).select_related('user'):
-        u = f.user
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        if u.message_privacy == 'public' or is_connected:
-            recent_users.add(u)
-    recent_users_with_data = []
-    total_unread_count = 0
-    for u in recent_users:
-        last_message = Message.objects.filter(
-            (Q(sender=request.user) & Q(receiver=u)) |
-            (Q(sender=u) & Q(receiver=request.user))
-        ).order_by('-timestamp').first()
-        unread_count = Message.objects.filter(sender=u, receiver=request.user, is_read=False).count()
-        total_unread_count += unread_count
-        if last_message:
-            recent_users_with_data.append({
-                'user': u,
-                'last_message': last_message,
-                'unread_count': unread_count,
-                'last_message_time': last_message.timestamp
-            })
-    recent_users_with_data.sort(key=lambda x: x['last_message_time'], reverse=True)
-    recent_list = [item['user'] for item in recent_users_with_data[:25]]
-    unread_counts = {item['user'].id: item['unread_count'] for item in recent_users_with_data[:25]}
-    last_messages = {item['user'].id: item['last_message'] for item in recent_users_with_data[:25]}
-    last_message_times = {item['user'].id: item['last_message_time'] for item in recent_users_with_data[:25]}
-    
+
+    recent_list = []
+    unread_counts = {}
+    last_messages = {}
+    last_message_times = {}
+    conversations = Conversation.objects.for_user(request.user).exclude(last_message_at=None).select_related(
+        'user_a', 'user_a__entrepreneur_profile', 'user_a__investor_profile',
+        'user_b', 'user_b__entrepreneur_profile', 'user_b__investor_profile',
+    )
+    # Read a batch at a time, skipping people the user may no longer message
+    start = 0
+    while len(recent_list) < RECENT_CONVERSATIONS:
+        batch = list(conversations[start:start + RECENT_CONVERSATIONS * 2])
+        if not batch:
+            break
+        start += len(batch)
+        allowed = privacy.messageable(request.user.id, [conversation.other(request.user).id for conversation in batch])
+        for conversation in batch:
+            u = conversation.other(request.user)
+            if u.id not in allowed or len(recent_list) == RECENT_CONVERSATIONS:
+                continue
+            recent_list.append(u)
+            unread_counts[u.id] = conversation.unread_for(request.user)
+            last_messages[u.id] = {
+                'content': conversation.last_message_preview,
+                'sender_id': conversation.last_sender_id,
+            }
+            last_message_times[u.id] = conversation.last_message_at
+    # Only the conversations listed; ones hidden by the privacy check do not count
+    total_unread_count = sum(unread_counts.values())
+
     return render(request, 'messages/index.html', {
         'recents': recent_list,
         'unread_counts': unread_counts,
@@ -674,17 +629,6 @@ def message_search(request):
         qs = qs.filter(Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(email__icontains=q))
     qs = qs.select_related('entrepreneur_profile', 'investor_profile')[:20]
 
-    def img64(u):
-        try:
-            if hasattr(u, 'entrepreneur_profile') and u.entrepreneur_profile.image:
-                import base64
-                return 'data:image/jpeg;base64,' + base64.b64encode(u.entrepreneur_profile.image).decode('utf-8')
-            if hasattr(u, 'investor_profile') and u.investor_profile.image:
-                import base64
-                return 'data:image/jpeg;base64,' + base64.b64encode(u.investor_profile.image).decode('utf-8')
-        except Exception:
-            return ''
-        return ''
 
     def profile_url(u):
         if u.role == 'investor':
@@ -692,25 +636,29 @@ def message_search(request):
         else:
             return f"/entrepreneur/profile/{u.id}/"
 
+    allowed = privacy.messageable(request.user.id, [u.id for u in qs])
     results = []
     for u in qs:
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        can_message = (u.message_privacy == 'public') or is_connected
         results.append({
             'id': u.id,
             'name': u.get_full_name() or u.email,
             'role': u.role,
-            'avatar': img64(u),
+            'avatar': sized_url(u.profile_image_url, 64),
             'profile_url': profile_url(u),
             'is_private': u.message_privacy == 'private',
-            'can_message': can_message,
+            'can_message': u.id in allowed,
         })
     return JsonResponse({ 'results': results })
 
 
+# Messages returned per request of a chat's history
+MESSAGE_PAGE_SIZE = 50
+
+
 @login_required
 def get_messages(request, user_id):
+    from Investors.services import send_read_receipt
+
     # Check if this is a direct access (not an AJAX request)
     # If it's a direct browser access, redirect to the chat page
     if not request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -724,21 +672,35 @@ def get_messages(request, user_id):
     try:
         # Enforce privacy: only show messages if allowed
         other = User.objects.get(id=user_id)
-        if other.message_privacy == 'private':
-            is_friend = (request.user.favorites.filter(target_user=other).exists() or
-                         request.user.favorited_by.filter(user=other).exists())
-            if not is_friend:
-                return HttpResponseForbidden('User only allows messages from friends.')
-        
-        qs = Message.objects.filter(
-            (Q(sender=request.user) & Q(receiver=other)) |
-            (Q(sender=other) & Q(receiver=request.user))
-        ).order_by('timestamp')
+        if not privacy.can_message(request.user.id, other.id):
+            return HttpResponseForbidden('User only allows messages from friends.')
         
-        # Mark unread messages as read
-        qs.filter(receiver=request.user, is_read=False).update(is_read=True)
-        serializer = MessageSerializer(qs, many=True)
-        return JsonResponse({'messages': serializer.data})
+        try:
+            before = int(request.GET['before']) if request.GET.get('before') else None
+            after = int(request.GET['after']) if request.GET.get('after') else None
+            if before is not None and after is not None:
+                raise ValueError('Pass either before or after, not both')
+            page, has_more = Message.objects.between(request.user.id, other.id).select_related(
+                'sender', 'receiver'
+            ).history(before=before, after=after, limit=MESSAGE_PAGE_SIZE)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Opening or syncing the chat reads up to the newest message fetched;
+        # the watermark only moves (and the peer only hears of it) if it advanced
+        if page and before is None and Conversation.objects.mark_read(request.user.id, other.id, page[-1].pk):
+            send_read_receipt(request.user.id, other.id, page[-1].pk)
+
+        user_a_id, user_b_id = Conversation.objects.pair(request.user.id, other.id)
+        summary = Conversation.objects.filter(user_a_id=user_a_id, user_b_id=user_b_id).first()
+        read_upto = summary.read_upto() if summary else {}
+
+        # Attachments are described by name, type, size and URL; the bytes
+        # are fetched separately from the media view
+        return JsonResponse({
+            'messages': MessageSerializer(page, many=True, context={'read_upto': read_upto}).data,
+            'has_more': has_more,
+        })
         
     except User.DoesNotExist:
         return JsonResponse({'error': 'User not found'}, status=404)
@@ -760,7 +722,7 @@ def create_startup(request):
             # Handle logo upload
             if 'logo' in request.FILES:
                 logo_file = request.FILES['logo']
-                startup.logo = logo_file.read()
+                startup.logo = logo_file
             
             startup.save()
             
@@ -779,15 +741,19 @@ def create_startup(request):
 
 
 # Notification Views
+NOTIFICATION_PAGE_SIZE = 50
+
+
 @login_required
 def notifications_list(request):
-    """Display user's notifications"""
+    """Display user's notifications, a page at a time (the rest through get_notifications_data)"""
     from Investors.services import NotificationService
-    notifications = NotificationService.get_user_notifications(request.user, limit=100)
+    notifications, next_cursor = NotificationService.get_user_notifications(request.user, limit=NOTIFICATION_PAGE_SIZE)
     unread_count = NotificationService.get_unread_count(request.user)
     
     return render(request, 'Investors/notifications.html', {
         'notifications': notifications,
+        'next_cursor': next_cursor,
         'unread_count': unread_count,
         'user': request.user
     })
@@ -828,32 +794,46 @@ def get_unread_count(request):
 
 @login_required
 def get_notifications_data(request):
-    """Get notifications data for AJAX requests"""
+    """
+    Notifications as JSON. ``cursor`` pages back through older ones (the
+    response's ``next_cursor``); ``since`` is the newest notification id the
+    client has and returns only newer ones, oldest first, with ``has_more``
+    if it should ask again.
+    """
     from Investors.services import NotificationService
-    notifications = NotificationService.get_user_notifications(request.user, limit=20)
-    unread_count = NotificationService.get_unread_count(request.user)
-    
-    notifications_data = []
-    for notification in notifications:
-        notifications_data.append({
-            'id': notification.id,
-            'type': notification.notification_type,
-            'title': notification.title,
-            'message': notification.message,
-            'sender_name': notification.sender.get_full_name() if notification.sender else None,
-            'time_ago': notification.time_ago,
-            'is_read': notification.is_read,
-            'related_object_id': notification.related_object_id,
-            'related_object_type': notification.related_object_type,
-        })
-    
+    try:
+        since = int(request.GET['since']) if request.GET.get('since') else None
+        cursor = request.GET.get('cursor')
+        if since is not None and cursor:
+            raise ValueError('Pass either cursor or since, not both')
+        if since is not None:
+            notifications, has_more = NotificationService.get_notifications_since(
+                request.user, since, limit=NOTIFICATION_PAGE_SIZE
+            )
+            paging = {'has_more': has_more}
+        else:
+            notifications, next_cursor = NotificationService.get_user_notifications(
+                request.user, cursor=cursor, limit=NOTIFICATION_PAGE_SIZE
+            )
+            paging = {'next_cursor': next_cursor}
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     return JsonResponse({
-        'notifications': notifications_data,
-        'unread_count': unread_count
+        'notifications': [
+            dict(NotificationService.payload(notification), is_read=notification.is_read)
+            for notification in notifications
+        ],
+        'unread_count': NotificationService.get_unread_count(request.user),
+        **paging,
     })
 
+SEARCH_SUGGESTIONS = 5
+SEARCH_RESULTS = 50
+
+
 def search_users(request):
-    """Search users by name, email, or role"""
+    """Search users by name, email, organisation, startup, bio or industry"""
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
@@ -861,39 +841,18 @@ def search_users(request):
     if not query or len(query) < 2:
         return JsonResponse({'users': [], 'total': 0})
     
-    # Search in User model (removed username since it doesn't exist)
-    users = User.objects.filter(
-        Q(first_name__icontains=query) | 
-        Q(last_name__icontains=query) | 
-        Q(email__icontains=query)
-    ).exclude(id=request.user.id)[:5]
+    # Ranked prefix matches from the full-text index (Entrepreneurs/search.py)
+    users, _ = search.search(query, exclude=request.user.id, limit=SEARCH_SUGGESTIONS)
     
     results = []
     for user in users:
-        # Get profile image for the user
-        profile_image = None
-        try:
-            if user.role == 'entrepreneur':
-                profile = getattr(user, 'entrepreneur_profile', None)
-                if profile and profile.image:
-                    import base64
-                    profile_image = 'data:image/jpeg;base64,' + base64.b64encode(profile.image).decode('utf-8')
-            elif user.role == 'investor':
-                profile = getattr(user, 'investor_profile', None)
-                if profile and profile.image:
-                    import base64
-                    profile_image = 'data:image/jpeg;base64,' + base64.b64encode(profile.image).decode('utf-8')
-        except Exception as e:
-            print(f"Error getting profile image for user {user.id}: {e}")
-            profile_image = None
-        
         user_data = {
             'id': user.id,
             'name': user.get_full_name() or user.email,
             'email': user.email,
             'role': user.role,
             'profile_url': f'/{user.role}/profile/{user.id}/' if user.role in ['investor', 'entrepreneur'] else '#',
-            'profile_image': profile_image
+            'profile_image': sized_url(user.profile_image_url, 64) or None
         }
         results.append(user_data)
     
@@ -912,32 +871,12 @@ def search_results_page(request):
     if not query:
         return redirect('home')
     
-    # Search in User model (removed username since it doesn't exist)
-    users = User.objects.filter(
-        Q(first_name__icontains=query) | 
-        Q(last_name__icontains=query) | 
-        Q(email__icontains=query)
-    ).exclude(id=request.user.id)
-    
-    # Get profile images for users
-    for user in users:
-        try:
-            if user.role == 'entrepreneur':
-                profile = getattr(user, 'entrepreneur_profile', None)
-                user.profile_image = profile.image if profile and profile.image else None
-            elif user.role == 'investor':
-                profile = getattr(user, 'investor_profile', None)
-                user.profile_image = profile.image if profile and profile.image else None
-            else:
-                user.profile_image = None
-        except Exception as e:
-            print(f"Error getting profile image for user {user.id}: {e}")
-            user.profile_image = None
+    users, total = search.search(query, exclude=request.user.id, limit=SEARCH_RESULTS)
     
     context = {
         'users': users,
         'query': query,
-        'total_results': users.count()
+        'total_results': total
     }
     
     return render(request, 'search_results.html', context)
@@ -1081,6 +1020,8 @@ def message_settings(request):
         form = MessageSettingsForm(request.POST, instance=request.user)
         if form.is_valid():
             form.save()
+            if 'message_privacy' in form.changed_data:
+                privacy.forget_receiver(request.user.id)
             # Redirect to the next parameter or default to messages page
             next_url = request.POST.get('next') or request.GET.get('next') or 'entrepreneurs:messages'
             return redirect(next_url)
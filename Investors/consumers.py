@@ -1,246 +1,265 @@
+import asyncio
 import json
+import logging
+from django.db import transaction
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
-from django.contrib.auth.models import AnonymousUser
-from Entrepreneurs.models import User
+from channels.consumer import get_handler_name
+from Entrepreneurs import privacy
 
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    """Channel-layer group every socket of ``user_id`` belongs to"""
+    return f'user_{user_id}'
+
+
+class UserConsumer(AsyncWebsocketConsumer):
+    """
+    The one WebSocket a signed-in tab keeps open. It joins the user's
+    ``user_<id>`` group and carries every realtime feature as typed frames:
+
+    client -> server (``action``): send_message, mark_read, typing,
+    mark_notification_read, mark_all_notifications_read
+
+    server -> client (``type``): chat_message, read_receipt, typing,
+    notification, unread_count, error
+
+    Connecting costs no queries; whether the user may message someone is
+    checked on each send instead. A send does all of its database work in
+    one thread hop (save_message) and awaits the channel-layer fan-out on
+    the event loop, so a busy chat never holds a database thread while
+    waiting on the layer.
+
+    ``mark_read`` frames carry a read watermark (``with``: the other user,
+    ``upto``: the newest message id seen). They are coalesced per
+    conversation for ``read_receipt_delay`` seconds and then written and
+    broadcast once, so scrolling through a chat sends one receipt rather
+    than one per message.
+    """
+
+    read_receipt_delay = 1.0
 
-class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope['user']
         if not self.user or not self.user.is_authenticated:
             await self.close()
             return
-        
-        self.other_user_id = self.scope['url_route']['kwargs']['user_id']
-        self.room_name = self.get_room_name(self.user.id, self.other_user_id)
-        self.room_group_name = f'chat_{self.room_name}'
-        
-        # Strict privacy enforcement - reject connection if not allowed
-        allowed = await self.is_allowed(self.user.id, int(self.other_user_id))
-        if not allowed:
-            print(f"WebSocket connection rejected: User {self.user.id} cannot message user {self.other_user_id} due to privacy settings")
-            await self.close(code=4001, reason="Privacy violation: User not allowed to message this user")
-            return
-        
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+
+        self.group_name = user_group(self.user.id)
+        self.pending_reads = {}
+        self.read_flush = None
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if hasattr(self, 'group_name'):
+            if self.read_flush is not None:
+                self.read_flush.cancel()
+            await self.flush_reads()
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def dispatch(self, message):
+        # channels closes stale database connections before every handler,
+        # which takes a turn on the shared database thread even for events
+        # that only forward a frame, so a burst of sends stalls every socket.
+        # All queries here go through database_sync_to_async, which already
+        # does that around each call.
+        handler = getattr(self, get_handler_name(message), None)
+        if handler is None:
+            raise ValueError(f"No handler for message type {message['type']}")
+        await handler(message)
 
     async def receive(self, text_data):
-        data = json.loads(text_data)
-        action = data.get('action')
-        if action == 'send_message':
-            await self.handle_send_message(data)
-        elif action == 'mark_read':
-            await self.handle_mark_read(data)
+        try:
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            return
+        handler = {
+            'send_message': self.handle_send_message,
+            'mark_read': self.handle_mark_read,
+            'typing': self.handle_typing,
+            'mark_notification_read': self.handle_mark_notification_read,
+            'mark_all_notifications_read': self.handle_mark_all_notifications_read,
+        }.get(data.get('action'))
+        if handler is not None:
+            await handler(data)
+
+    async def send_frame(self, frame_type, **payload):
+        await self.send(text_data=json.dumps({'type': frame_type, **payload}))
+
+    @staticmethod
+    def _user_id(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    # Chat
 
     async def handle_send_message(self, data):
-        content = data.get('content', '')
-        message_type = data.get('message_type', 'text')
-        file_data = data.get('file_data')  # base64 encoded, if any
-        file_name = data.get('file_name')
-        file_type = data.get('file_type')
-        file_size = data.get('file_size')
-        receiver_id = int(self.other_user_id)
-        # Save message
-        msg = await self.create_message(
-            sender_id=self.user.id,
+        receiver_id = self._user_id(data.get('to'))
+        if receiver_id is None:
+            await self.send_frame('error', error='Missing recipient', to=data.get('to'))
+            return
+
+        message, notification, unread_count, error = await self.save_message(
             receiver_id=receiver_id,
-            content=content,
-            message_type=message_type,
-            file_data=file_data,
-            file_name=file_name,
-            file_type=file_type,
-            file_size=file_size
+            content=data.get('content', ''),
+            message_type=data.get('message_type', 'text'),
+            # Attachments are uploaded over HTTP first (see chat_upload_start)
+            attachment_id=data.get('attachment_id'),
         )
-        if msg is None:
+        if error:
+            await self.send_frame('error', error=error, to=receiver_id)
             return
-        from Entrepreneurs.models import MessageSerializer
-        serializer = MessageSerializer(msg)
-        # Only send to group, not echo to sender as receiver
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'chat_message',
-                'message': serializer.data,
-                'sender_id': self.user.id
-            }
-        )
+
+        # Every open tab of both users, the sender's included, gets the message
+        event = {'type': 'chat_message', 'message': message}
+        sends = [self.channel_layer.group_send(user_group(user_id), event) for user_id in {self.user.id, receiver_id}]
+        if notification is not None:
+            sends.append(self.channel_layer.group_send(
+                user_group(receiver_id), {'type': 'notification_message', 'notification': notification}
+            ))
+            sends.append(self.channel_layer.group_send(
+                user_group(receiver_id), {'type': 'unread_count_update', 'count': unread_count}
+            ))
+        await asyncio.gather(*sends)
 
     async def handle_mark_read(self, data):
-        message_ids = data.get('message_ids', [])
-        await self.mark_messages_read(message_ids)
-        # Optionally notify sender of read receipt
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'read_receipt',
-                'message_ids': message_ids,
-                'reader_id': self.user.id
-            }
-        )
+        other_id, upto = self._user_id(data.get('with')), self._user_id(data.get('upto'))
+        if other_id is None or upto is None:
+            return
+        self.pending_reads[other_id] = max(upto, self.pending_reads.get(other_id, 0))
+        if self.read_flush is None:
+            self.read_flush = asyncio.ensure_future(self.flush_reads_later())
+
+    async def flush_reads_later(self):
+        await asyncio.sleep(self.read_receipt_delay)
+        self.read_flush = None
+        await self.flush_reads()
+
+    async def flush_reads(self):
+        pending, self.pending_reads = self.pending_reads, {}
+        for other_id, upto in pending.items():
+            if not await self.mark_messages_read(other_id, upto):
+                continue
+            event = {'type': 'read_receipt', 'reader_id': self.user.id, 'other_id': other_id, 'upto': upto}
+            for user_id in (self.user.id, other_id):
+                await self.channel_layer.group_send(user_group(user_id), event)
+
+    async def handle_typing(self, data):
+        receiver_id = self._user_id(data.get('to'))
+        if receiver_id is None or not await self.is_allowed(self.user.id, receiver_id):
+            return
+        await self.channel_layer.group_send(user_group(receiver_id), {
+            'type': 'typing_indicator',
+            'from_id': self.user.id,
+            'is_typing': bool(data.get('is_typing', True)),
+        })
 
     async def chat_message(self, event):
-        # Only send to the correct user (sender or receiver)
-        message = event['message']
-        sender_id = event.get('sender_id')
-        # Only send to the user if they are sender or receiver
-        if self.user.id == message['sender'] or self.user.id == message['receiver']:
-            await self.send(text_data=json.dumps({
-                'type': 'chat_message',
-                'message': message
-            }))
+        await self.send_frame('chat_message', message=event['message'])
 
     async def read_receipt(self, event):
-        await self.send(text_data=json.dumps({
-            'type': 'read_receipt',
-            'message_ids': event['message_ids'],
-            'reader_id': event['reader_id']
-        }))
+        await self.send_frame(
+            'read_receipt', reader_id=event['reader_id'], other_id=event['other_id'], upto=event['upto']
+        )
 
-    @staticmethod
-    def get_room_name(user1_id, user2_id):
-        # Deterministic room name for a pair of users
-        return '_'.join(sorted([str(user1_id), str(user2_id)]))
+    async def typing_indicator(self, event):
+        await self.send_frame('typing', from_id=event['from_id'], is_typing=event['is_typing'])
 
     @database_sync_to_async
     def is_allowed(self, user_id, other_id):
-        try:
-            user = User.objects.get(id=user_id)
-            other = User.objects.get(id=other_id)
-            if other.message_privacy == 'public':
-                return True
-            # Private: allow if either user follows the other (more permissive friendship)
-            is_friend = (user.favorites.filter(target_user=other).exists() or
-                         user.favorited_by.filter(user=other).exists())
-            return is_friend
-        except Exception:
-            return False
+        return privacy.can_message(user_id, other_id)
 
     @database_sync_to_async
-    def create_message(self, sender_id, receiver_id, content, message_type, file_data, file_name, file_type, file_size):
+    def save_message(self, receiver_id, content, message_type, attachment_id=None):
+        """
+        Check, save and notify a sent message in one transaction (one commit
+        for the message, its conversation summary and the notification).
+        Returns ``(message, notification, unread_count, error)``, the first
+        two serialized for the layer and the last two only set when the
+        receiver got a new notification.
+        """
+        from Entrepreneurs.models import ChatUpload, Message, MessageSerializer
+        from .services import NotificationService, notify_message_received
+
+        if not privacy.can_message(self.user.id, receiver_id):
+            return None, None, None, 'Message blocked by privacy settings'
         try:
-            from Entrepreneurs.models import Message
-            sender = User.objects.get(id=sender_id)
-            receiver = User.objects.get(id=receiver_id)
-            
-            # Double privacy enforcement - even though connection is protected
-            if receiver.message_privacy == 'private':
-                is_friend = (sender.favorites.filter(target_user=receiver).exists() or
-                             sender.favorited_by.filter(user=receiver).exists())
-                if not is_friend:
-                    print(f"Privacy violation blocked: User {sender_id} attempted to message private user {receiver_id}")
-                    return None
-            
-            msg = Message(
-                sender=sender,
-                receiver=receiver,
-                content=content,
-                message_type=message_type
-            )
-            if file_data:
-                import base64
-                msg.file_data = base64.b64decode(file_data)
-                msg.file_name = file_name
-                msg.file_type = file_type
-                msg.file_size = file_size or 0
-            msg.save()
-            
-            # Send notification to receiver
-            try:
-                from Investors.services import notify_message_received
-                notify_message_received(msg)
-            except Exception as e:
-                print(f"Error sending message notification: {e}")
-            
-            return msg
-        except Exception as e:
-            import traceback
-            print('Error in create_message:', e)
-            traceback.print_exc()
-            return None
+            with transaction.atomic():
+                msg = Message(
+                    sender=self.user,
+                    receiver_id=receiver_id,
+                    content=content,
+                    message_type=message_type
+                )
+                if attachment_id:
+                    upload = ChatUpload.objects.filter(
+                        pk=attachment_id, uploader_id=self.user.id, blob__isnull=False
+                    ).first()
+                    if upload is None:
+                        logger.warning('Unknown or incomplete attachment %s from user %s', attachment_id, self.user.id)
+                        return None, None, None, 'Message could not be sent'
+                    msg.file_blob_id = upload.blob_id
+                    msg.file_name = upload.file_name
+                    msg.file_type = upload.file_type
+                    msg.file_size = upload.size
+                msg.save()
+
+                # The receiver's notification is sent with the message, not from here
+                notification = unread_count = None
+                try:
+                    with transaction.atomic():
+                        received = notify_message_received(msg, realtime=False)
+                    # A message collapsed into an unread notification is not pushed again
+                    if not received.collapsed:
+                        notification = NotificationService.payload(received)
+                        unread_count = NotificationService.get_unread_count(received.user)
+                except Exception:
+                    logger.exception('Could not create the notification for message %s', msg.pk)
+        except Exception:
+            logger.exception('Could not save a message from user %s', self.user.id)
+            return None, None, None, 'Message could not be sent'
+
+        return MessageSerializer(msg).data, notification, unread_count, None
 
     @database_sync_to_async
-    def mark_messages_read(self, message_ids):
-        from Entrepreneurs.models import Message
-        Message.objects.filter(id__in=message_ids, receiver=self.user).update(is_read=True)
+    def mark_messages_read(self, other_id, upto):
+        """Advance the read watermark; False if it was already there"""
+        from Entrepreneurs.models import Conversation
+        return Conversation.objects.mark_read(self.user.id, other_id, upto)
 
+    # Notifications
 
-class NotificationConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        # Check if user is authenticated
-        if self.scope["user"].is_authenticated:
-            self.user = self.scope["user"]
-            self.room_group_name = f'notifications_{self.user.id}'
-
-            # Join room group
-            await self.channel_layer.group_add(
-                self.room_group_name,
-                self.channel_name
-            )
-
-            await self.accept()
-        else:
-            await self.close()
+    async def handle_mark_notification_read(self, data):
+        await self.send_unread_count(await self.mark_notification_read(data.get('notification_id')))
 
-    async def disconnect(self, close_code):
-        # Leave room group
-        if hasattr(self, 'room_group_name'):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
+    async def handle_mark_all_notifications_read(self, data):
+        await self.send_unread_count(await self.mark_all_notifications_read())
 
-    async def receive(self, text_data):
-        """Handle incoming messages from WebSocket"""
-        try:
-            text_data_json = json.loads(text_data)
-            message_type = text_data_json.get('type')
-            
-            if message_type == 'mark_read':
-                notification_id = text_data_json.get('notification_id')
-                await self.mark_notification_read(notification_id)
-            elif message_type == 'mark_all_read':
-                await self.mark_all_notifications_read()
-                
-        except json.JSONDecodeError:
-            pass
+    async def send_unread_count(self, count):
+        # To every tab of the user, so their badges agree
+        await self.channel_layer.group_send(self.group_name, {'type': 'unread_count_update', 'count': count})
 
     async def notification_message(self, event):
-        """Send notification to WebSocket"""
-        notification = event['notification']
-        
-        await self.send(text_data=json.dumps({
-            'type': 'notification',
-            'notification': notification
-        }))
+        await self.send_frame('notification', notification=event['notification'])
 
     async def unread_count_update(self, event):
-        """Send unread count update to WebSocket"""
-        count = event['count']
-        
-        await self.send(text_data=json.dumps({
-            'type': 'unread_count',
-            'count': count
-        }))
+        await self.send_frame('unread_count', count=event['count'])
 
     @database_sync_to_async
     def mark_notification_read(self, notification_id):
-        """Mark a notification as read"""
+        """Mark a notification as read; returns the new unread count"""
         from .services import NotificationService
-        return NotificationService.mark_as_read(notification_id, self.user)
+        NotificationService.mark_as_read(self._user_id(notification_id), self.user, realtime=False)
+        return NotificationService.get_unread_count(self.user)
 
     @database_sync_to_async
     def mark_all_notifications_read(self):
-        """Mark all notifications as read"""
+        """Mark all notifications as read; returns the new unread count"""
         from .services import NotificationService
-        NotificationService.mark_all_as_read(self.user)
+        NotificationService.mark_all_as_read(self.user, realtime=False)
+        return NotificationService.get_unread_count(self.user)
@@ -0,0 +1,191 @@
+"""
+Notifications sent to whole audiences, off the request path.
+
+A post notifies every follower of its author and a new startup or funding
+round notifies every investor, which can be thousands of users. The view
+only records a NotificationBroadcast; once its transaction commits the
+broadcast is run in a small thread pool (like the image variants in
+CoFound/variants.py). Each batch of ``BATCH_SIZE`` recipients is one
+bulk_create, committed together with the recipients' unread counts and the
+broadcast's cursor and progress, and the batch's socket events (each
+notification and its recipient's new count) are then sent concurrently.
+
+A failed run is retried after ``RETRY_DELAY`` seconds, doubling each time,
+up to ``MAX_ATTEMPTS`` runs, and resumes after the last committed batch.
+Broadcasts left pending or running by a stopped process are picked up by
+the ``run_notification_broadcasts`` command.
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from Entrepreneurs.models import Favorite, Notification, NotificationBroadcast, User, adjust_unread_notifications
+
+from .consumers import user_group
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+MAX_ATTEMPTS = 5
+
+RETRY_DELAY = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'NOTIFICATION_FANOUT_WORKERS', 1),
+                thread_name_prefix='notification-fanout',
+            )
+        return _executor
+
+
+def broadcast(sender, audience, notification_type, title, message,
+              related_object_id=None, related_object_type=None):
+    """Record a notification for ``audience`` and queue it once the current transaction commits"""
+    job = NotificationBroadcast.objects.create(
+        sender=sender,
+        audience=audience,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        related_object_id=related_object_id,
+        related_object_type=related_object_type,
+    )
+    transaction.on_commit(lambda: submit(job.pk))
+    return job
+
+
+def recipient_ids(job):
+    """The audience's user ids, ascending, without the sender"""
+    if job.audience == 'followers':
+        ids = Favorite.objects.filter(target_user_id=job.sender_id).values_list('user_id', flat=True)
+        field = 'user_id'
+    elif job.audience == 'investors':
+        ids = User.objects.filter(role='investor').values_list('id', flat=True)
+        field = 'id'
+    else:
+        raise ValueError(f'Unknown audience {job.audience!r}')
+    return ids.exclude(**{field: job.sender_id}).order_by(field), field
+
+
+async def _send_all(events):
+    channel_layer = get_channel_layer()
+    await asyncio.gather(*(channel_layer.group_send(group, event) for group, event in events))
+
+
+def _send_batch(notifications):
+    from .services import NotificationService
+    counts = dict(User.objects.filter(pk__in=[notification.user_id for notification in notifications]).values_list(
+        'id', 'unread_notification_count'
+    ))
+    events = []
+    for notification in notifications:
+        group = user_group(notification.user_id)
+        events.append((group, {'type': 'notification_message', 'notification': NotificationService.payload(notification)}))
+        events.append((group, {'type': 'unread_count_update', 'count': counts.get(notification.user_id, 0)}))
+    try:
+        async_to_sync(_send_all)(events)
+    except Exception:
+        # The rows are committed; the users see them on their next page load
+        logger.exception('Could not send %s broadcast notifications to sockets', len(notifications))
+
+
+def _write_batch(job, ids):
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                sender=job.sender,
+                notification_type=job.notification_type,
+                title=job.title,
+                message=job.message,
+                related_object_id=job.related_object_id,
+                related_object_type=job.related_object_type,
+            )
+            for user_id in ids
+        ])
+        # bulk_create sends no post_save, so count the batch here
+        adjust_unread_notifications(ids, 1)
+        job.cursor = ids[-1]
+        job.sent += len(ids)
+        job.save(update_fields=['cursor', 'sent', 'updated_at'])
+    return notifications
+
+
+def run(job_id):
+    """
+    Deliver broadcast ``job_id`` from its cursor onwards. Returns False if
+    the broadcast is not pending (another worker has it, or it finished).
+    """
+    claimed = NotificationBroadcast.objects.filter(pk=job_id, status='pending').update(
+        status='running', attempts=F('attempts') + 1
+    )
+    if not claimed:
+        return False
+    job = NotificationBroadcast.objects.select_related('sender').get(pk=job_id)
+
+    try:
+        ids, field = recipient_ids(job)
+        if not job.total:
+            job.total = ids.count()
+            job.save(update_fields=['total', 'updated_at'])
+        while True:
+            batch = list(ids.filter(**{f'{field}__gt': job.cursor})[:BATCH_SIZE])
+            if not batch:
+                break
+            _send_batch(_write_batch(job, batch))
+    except Exception as e:
+        logger.exception('Notification broadcast %s failed on attempt %s', job_id, job.attempts)
+        job.error = str(e)
+        job.status = 'pending' if job.attempts < MAX_ATTEMPTS else 'failed'
+        job.save(update_fields=['error', 'status', 'updated_at'])
+        if job.status == 'pending':
+            _retry_later(job_id, RETRY_DELAY * 2 ** (job.attempts - 1))
+        return True
+
+    job.status = 'done'
+    job.error = ''
+    job.save(update_fields=['status', 'error', 'updated_at'])
+    return True
+
+
+def _run_job(job_id):
+    close_old_connections()
+    try:
+        run(job_id)
+    except Exception:
+        logger.exception('Could not run notification broadcast %s', job_id)
+    finally:
+        with _executor_lock:
+            _pending.discard(job_id)
+        close_old_connections()
+
+
+def submit(job_id):
+    """Run broadcast ``job_id`` in the worker pool unless it is already queued"""
+    with _executor_lock:
+        if job_id in _pending:
+            return
+        _pending.add(job_id)
+    _get_executor().submit(_run_job, job_id)
+
+
+def _retry_later(job_id, delay):
+    timer = threading.Timer(delay, submit, args=(job_id,))
+    timer.daemon = True
+    timer.start()
@@ -1,6 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from Entrepreneurs.models import User
+from Entrepreneurs.models import User, MediaBlob, blob_property, blob_url
 from decimal import Decimal
 
 # Choice constants for InvestorProfile
@@ -56,11 +56,14 @@ class InvestorProfile(models.Model):
     preferred_industries = models.CharField(max_length=500, blank=True, choices=INDUSTRY_CHOICES)
     portfolio_companies = models.TextField(blank=True)
     notable_exits = models.TextField(blank=True)
-    image = models.BinaryField(editable=True, null=True, blank=True)
+    image_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     profile_views = models.PositiveIntegerField(default=0)
 
+    image = blob_property('image_blob', variants='avatar')
+    image_url = blob_url('image_blob')
+
     def __str__(self):
         return f"{self.user.get_full_name()}'s Investor Profile"
 
@@ -91,23 +94,15 @@ class InvestmentDocument(models.Model):
     )
     title = models.CharField(max_length=255)
 
-    # BLOB file storage for PDFs, contracts, etc.
+    # PDFs, contracts, etc. live in the blob store
     file_name = models.CharField(max_length=255)
     file_type = models.CharField(max_length=100, blank=True)  # e.g., "application/pdf"
-    file_data = models.BinaryField(editable=True,blank=True, null=True)
+    file_blob = models.ForeignKey(MediaBlob, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
-    def file_base64(self):
-        if self.file_data:
-            import base64
-            return base64.b64encode(self.file_data).decode('utf-8')
-        return None
-
-    @property
-    def file_data_display(self):
-        """Property to access file data as base64 string for templates"""
-        return self.file_base64()
+    file_data = blob_property('file_blob', mime_field='file_type')
+    file_url = blob_url('file_blob')
 
     def __str__(self):
         return f"{self.title} by {self.investor}"
@@ -1,10 +1,27 @@
 from django.contrib.auth import get_user_model
 User = get_user_model()
-from Entrepreneurs.models import Notification
+from Entrepreneurs.models import Notification, adjust_unread_notifications
+from CoFound.pagination import keyset_page
+from datetime import timedelta
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
+from . import fanout
+from .consumers import user_group
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Notification types whose repeats on the same object are collapsed into one
+# unread row, with the text they are then shown with
+COLLAPSED_MESSAGES = {
+    'like': '{name} and {others} liked your post',
+    'comment': '{name} and {others} commented on your post',
+    'message': '{name} sent you {count} messages',
+}
 
 
 class NotificationService:
@@ -12,7 +29,7 @@ class NotificationService:
     
     @staticmethod
     def create_notification(recipient, notification_type, title, message, sender=None, 
-                          related_object_id=None, related_object_type=None):
+                          related_object_id=None, related_object_type=None, realtime=True):
         """
         Create a notification and send real-time update
         
@@ -24,8 +41,26 @@ class NotificationService:
             sender: User who triggered the notification (optional)
             related_object_id: ID of related object (optional)
             related_object_type: Type of related object (optional)
+            realtime: Send it to the recipient's sockets; async callers pass
+                False and send payload(notification) themselves
+
+        Likes, comments and messages are collapsed: while the recipient has an
+        unread one for the same object from the last
+        NOTIFICATION_AGGREGATION_WINDOW seconds, that row takes the new actor
+        and count instead, and nothing is pushed again. The returned
+        notification's ``collapsed`` says which happened. A new row adds one
+        to the recipient's unread_notification_count (signals.py); it is
+        pushed, with the new count, when the surrounding transaction commits.
         """
         with transaction.atomic():
+            if notification_type in COLLAPSED_MESSAGES and sender is not None and related_object_id is not None:
+                notification = NotificationService.open_notification(
+                    recipient, notification_type, related_object_id, related_object_type
+                )
+                if notification is not None:
+                    NotificationService.collapse(notification, sender)
+                    return notification
+
             # Create the notification
             notification = Notification.objects.create(
                 user=recipient,
@@ -34,64 +69,155 @@ class NotificationService:
                 title=title,
                 message=message,
                 related_object_id=related_object_id,
-                related_object_type=related_object_type
+                related_object_type=related_object_type,
+                actor_ids=[sender.id] if notification_type in COLLAPSED_MESSAGES and sender is not None else [],
             )
+            notification.collapsed = False
             
-            # Send real-time notification via WebSocket
-            NotificationService.send_realtime_notification(recipient.id, notification)
+            # Send real-time notification via WebSocket once the row commits, so a
+            # client refetching on the push finds it and a rollback pushes nothing
+            if realtime:
+                def push():
+                    NotificationService.send_realtime_notification(recipient.id, notification)
+                    NotificationService.send_unread_count(recipient)
+                transaction.on_commit(push)
             
             return notification
     
+    @staticmethod
+    def open_notification(recipient, notification_type, related_object_id, related_object_type):
+        """The recipient's unread notification of this type for this object still open for collapsing"""
+        window = timedelta(seconds=getattr(settings, 'NOTIFICATION_AGGREGATION_WINDOW', 60 * 60))
+        return Notification.objects.select_for_update().filter(
+            user=recipient,
+            notification_type=notification_type,
+            related_object_id=related_object_id,
+            related_object_type=related_object_type,
+            is_read=False,
+            created_at__gte=timezone.now() - window,
+        ).order_by('-created_at').first()
+
+    @staticmethod
+    def collapse(notification, sender):
+        """Fold another event by ``sender`` into ``notification``"""
+        # Messages count each message; likes and comments count distinct actors,
+        # so one repeated (say, unlike and like again, or A, B, then A) is not
+        # counted twice. Rows from before actor_ids was kept start from their sender
+        if notification.notification_type == 'message':
+            notification.actor_count += 1
+        else:
+            if not notification.actor_ids and notification.sender_id is not None:
+                notification.actor_ids = [notification.sender_id]
+            if sender.id not in notification.actor_ids:
+                notification.actor_ids.append(sender.id)
+                notification.actor_count += 1
+        notification.sender = sender
+        if notification.actor_count > 1:
+            others = notification.actor_count - 1
+            notification.message = COLLAPSED_MESSAGES[notification.notification_type].format(
+                name=sender.get_full_name() or sender.email,
+                count=notification.actor_count,
+                others=f"{others} other{'s' if others != 1 else ''}",
+            )
+        notification.save(update_fields=['actor_count', 'actor_ids', 'sender', 'message'])
+        notification.collapsed = True
+
+    @staticmethod
+    def payload(notification):
+        """The notification as sent to the user's sockets"""
+        return {
+            "id": notification.id,
+            "type": notification.notification_type,
+            "title": notification.title,
+            "message": notification.message,
+            "sender_name": notification.sender.get_full_name() if notification.sender else None,
+            "time_ago": notification.time_ago,
+            "related_object_id": notification.related_object_id if notification.related_object_id else (notification.sender.id if notification.notification_type == 'follow' and notification.sender else None),
+            "related_object_type": notification.related_object_type,
+            "actor_count": notification.actor_count,
+        }
+
     @staticmethod
     def send_realtime_notification(user_id, notification):
         """Send real-time notification via WebSocket"""
         try:
             channel_layer = get_channel_layer()
             async_to_sync(channel_layer.group_send)(
-                f"notifications_{user_id}",
+                user_group(user_id),
                 {
                     "type": "notification_message",
-                    "notification": {
-                        "id": notification.id,
-                        "type": notification.notification_type,
-                        "title": notification.title,
-                        "message": notification.message,
-                        "sender_name": notification.sender.get_full_name() if notification.sender else None,
-                        "time_ago": notification.time_ago,
-                        "related_object_id": notification.related_object_id if notification.related_object_id else (notification.sender.id if notification.notification_type == 'follow' and notification.sender else None),
-                        "related_object_type": notification.related_object_type,
-                    }
+                    "notification": NotificationService.payload(notification),
                 }
             )
-        except Exception as e:
+        except Exception:
             # Log error but don't fail the notification creation
-            print(f"Error sending real-time notification: {e}")
+            logger.exception('Could not send notification %s to sockets', notification.pk)
     
     @staticmethod
-    def mark_as_read(notification_id, user):
-        """Mark a notification as read"""
+    def send_unread_count(user, count=None):
+        """Send the user's unread notification count to their sockets"""
+        if count is None:
+            count = NotificationService.get_unread_count(user)
         try:
-            notification = Notification.objects.get(id=notification_id, user=user)
-            notification.is_read = True
-            notification.save()
-            return True
-        except Notification.DoesNotExist:
-            return False
+            channel_layer = get_channel_layer()
+            async_to_sync(channel_layer.group_send)(
+                user_group(user.pk), {"type": "unread_count_update", "count": count}
+            )
+        except Exception:
+            logger.exception('Could not send the unread count of user %s', user.pk)
+
+    @staticmethod
+    def mark_as_read(notification_id, user, realtime=True):
+        """
+        Mark a notification as read; False if the user has no such notification.
+        ``realtime`` sends the new unread count to the user's sockets.
+        """
+        with transaction.atomic():
+            changed = Notification.objects.filter(id=notification_id, user=user, is_read=False).update(is_read=True)
+            if not changed:
+                return Notification.objects.filter(id=notification_id, user=user).exists()
+            adjust_unread_notifications(user.pk, -1)
+        if realtime:
+            NotificationService.send_unread_count(user)
+        return True
     
     @staticmethod
-    def mark_all_as_read(user):
+    def mark_all_as_read(user, realtime=True):
         """Mark all notifications as read for a user"""
-        Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        with transaction.atomic():
+            changed = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+            # Subtract only what this update read: a notification created
+            # meanwhile is still unread and still counted
+            if changed:
+                adjust_unread_notifications(user.pk, -changed)
+        if realtime:
+            NotificationService.send_unread_count(user)
     
     @staticmethod
     def get_unread_count(user):
-        """Get unread notification count for a user"""
-        return Notification.objects.filter(user=user, is_read=False).count()
+        """Get unread notification count for a user (the counter column, not a COUNT of rows)"""
+        return User.objects.filter(pk=user.pk).values_list('unread_notification_count', flat=True).first() or 0
     
     @staticmethod
-    def get_user_notifications(user, limit=50):
-        """Get user's notifications with pagination"""
-        return Notification.objects.filter(user=user)[:limit]
+    def get_user_notifications(user, cursor=None, limit=50):
+        """
+        One page of the user's notifications, newest first, as
+        ``(notifications, next_cursor)``; pass ``next_cursor`` back for the
+        page after. Raises ValueError for a malformed cursor.
+        """
+        return keyset_page(Notification.objects.filter(user=user).select_related('sender'), cursor=cursor, limit=limit)
+
+    @staticmethod
+    def get_notifications_since(user, since_id, limit=50):
+        """
+        The user's notifications newer than id ``since_id``, oldest first, as
+        ``(notifications, has_more)``: what a client that has seen up to
+        ``since_id`` missed, e.g. while its socket was reconnecting.
+        """
+        rows = list(
+            Notification.objects.filter(user=user, id__gt=since_id).select_related('sender').order_by('id')[:limit + 1]
+        )
+        return rows[:limit], len(rows) > limit
 
 
 # Convenience functions for specific notification types
@@ -108,23 +234,16 @@ def notify_follow(follower, followed_user):
     )
 
 def notify_post_created(post):
-    """Notify followers when a new post is created"""
-    from Entrepreneurs.models import Favorite
-    
-    # Get all users who follow the post author
-    followers = Favorite.objects.filter(target_user=post.author).values_list('user', flat=True)
-    
-    for follower_id in followers:
-        follower = post.author.__class__.objects.get(id=follower_id)
-        NotificationService.create_notification(
-            recipient=follower,
-            sender=post.author,
-            notification_type='post',
-            title='New Post',
-            message=f'{post.author.get_full_name() or post.author.email} created a new post',
-            related_object_id=post.id,
-            related_object_type='post'
-        )
+    """Notify followers when a new post is created (in the background, see fanout.py)"""
+    return fanout.broadcast(
+        sender=post.author,
+        audience='followers',
+        notification_type='post',
+        title='New Post',
+        message=f'{post.author.get_full_name() or post.author.email} created a new post',
+        related_object_id=post.id,
+        related_object_type='post'
+    )
 
 def notify_like(post, liker):
     """Notify post author when someone likes their post"""
@@ -153,40 +272,28 @@ def notify_comment(post, commenter):
         )
 
 def notify_startup_created(startup):
-    """Notify when a startup is created"""
-    from Entrepreneurs.models import User
-    
-    # Notify all investors about new startup
-    investors = User.objects.filter(role='investor')
-    
-    for investor in investors:
-        NotificationService.create_notification(
-            recipient=investor,
-            sender=startup.entrepreneur,
-            notification_type='startup',
-            title='New Startup',
-            message=f'{startup.entrepreneur.get_full_name() or startup.entrepreneur.email} created a new startup: {startup.name}',
-            related_object_id=startup.id,
-            related_object_type='startup'
-        )
+    """Notify all investors when a startup is created (in the background, see fanout.py)"""
+    return fanout.broadcast(
+        sender=startup.entrepreneur,
+        audience='investors',
+        notification_type='startup',
+        title='New Startup',
+        message=f'{startup.entrepreneur.get_full_name() or startup.entrepreneur.email} created a new startup: {startup.name}',
+        related_object_id=startup.id,
+        related_object_type='startup'
+    )
 
 def notify_funding_round_created(funding_round):
-    """Notify when a funding round is created"""
-    from Entrepreneurs.models import User
-    
-    # Notify all investors about new funding round
-    investors = User.objects.filter(role='investor')
-    
-    for investor in investors:
-        NotificationService.create_notification(
-            recipient=investor,
-            sender=funding_round.startup.entrepreneur,
-            notification_type='funding_round',
-            title='New Funding Round',
-            message=f'{funding_round.startup.name} created a new funding round: {funding_round.round_name}',
-            related_object_id=funding_round.id,
-            related_object_type='funding_round'
-        )
+    """Notify all investors when a funding round is created (in the background, see fanout.py)"""
+    return fanout.broadcast(
+        sender=funding_round.startup.entrepreneur,
+        audience='investors',
+        notification_type='funding_round',
+        title='New Funding Round',
+        message=f'{funding_round.startup.name} created a new funding round: {funding_round.round_name}',
+        related_object_id=funding_round.id,
+        related_object_type='funding_round'
+    )
 
 def notify_investment_committed(funding_round, investor, amount):
     """Notify startup when someone commits to their funding round"""
@@ -200,14 +307,26 @@ def notify_investment_committed(funding_round, investor, amount):
         related_object_type='funding_round'
     )
 
-def notify_message_received(message):
+def notify_message_received(message, realtime=True):
     """Notify user when they receive a new message"""
-    NotificationService.create_notification(
+    return NotificationService.create_notification(
         recipient=message.receiver,
         sender=message.sender,
         notification_type='message',
         title='New Message',
         message=f'{message.sender.get_full_name() or message.sender.email} sent you a message',
         related_object_id=message.sender.id,  # Use sender's user ID for correct redirect
-        related_object_type='user'
+        related_object_type='user',
+        realtime=realtime,
     )
+
+
+def send_read_receipt(reader_id, other_id, upto):
+    """Tell both users' sockets that ``reader_id`` has read their chat with ``other_id`` up to message ``upto``"""
+    try:
+        channel_layer = get_channel_layer()
+        event = {'type': 'read_receipt', 'reader_id': reader_id, 'other_id': other_id, 'upto': upto}
+        for user_id in (reader_id, other_id):
+            async_to_sync(channel_layer.group_send)(user_group(user_id), event)
+    except Exception:
+        logger.exception('Could not send the read receipt of user %s for chat with %s', reader_id, other_id)
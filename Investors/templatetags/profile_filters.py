@@ -1,30 +1,27 @@
-import base64
 from django import template
-from django.db.models import Q
-from Entrepreneurs.models import CollaborationRequest, Favorite
+from CoFound.variants import sized_url
+from Entrepreneurs import graph
 
 register = template.Library()
 
 @register.filter
-def b64encode_blob(value):
+def profile_image_url(user):
     """
-    Converts a BLOB (bytes) to a base64 string for embedding in <img> tags.
-    Returns an empty string if value is None or not bytes.
+    URL of the user's profile picture, served by the media view.
+    Returns an empty string if the user has no picture.
     """
-    if value and isinstance(value, (bytes, bytearray)):
-        return base64.b64encode(value).decode('utf-8')
-    return ''
-
-@register.filter
-def get_profile_image(user):
     try:
-        if hasattr(user, 'entrepreneur_profile') and user.entrepreneur_profile.image:
-            return user.entrepreneur_profile.image
-        elif hasattr(user, 'investor_profile') and user.investor_profile.image:
-            return user.investor_profile.image
+        return user.profile_image_url
     except Exception:
-        pass
-    return None
+        return ''
+
+@register.filter
+def sized(url, width):
+    """
+    Ask the media view for an image variant at least ``width`` pixels wide.
+    Usage: {{ user|profile_image_url|sized:64 }}
+    """
+    return sized_url(url, width)
 
 @register.filter
 def can_connect(viewer, target):
@@ -38,16 +35,7 @@ def connection_status(viewer, target):
     try:
         if not viewer.is_authenticated or viewer.id == target.id:
             return 'self'
-        if Favorite.objects.filter(user=viewer, target_user=target).exists():
-            return 'accepted'
-        req = CollaborationRequest.objects.filter(
-            Q(investor=viewer, entrepreneur=target) | Q(investor=target, entrepreneur=viewer)
-        ).order_by('-created_at').first()
-        if req and req.status == 'accepted':
-            return 'accepted'
-        if req and req.status == 'pending':
-            return 'pending'
-        return 'none'
+        return graph.connection_status(viewer.id, target.id)
     except Exception:
         return 'none'
 
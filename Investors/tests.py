@@ -1,3 +1,547 @@
-from django.test import TestCase
+import json
+import re
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from CoFound.storage import InMemoryBlobStore, get_blob_store
+from Entrepreneurs.models import (
+    User, EntrepreneurProfile, Post, PostMedia, Comment, Favorite, Message, Conversation, Notification,
+    FEED_COMMENTS,
+)
+from . import fanout
+from .consumers import UserConsumer, user_group
+from .models import InvestorProfile
+from .services import NotificationService, notify_follow, notify_like, notify_post_created
+
+
+class CountingBlobStore(InMemoryBlobStore):
+    """In-memory store that records how many bytes were handed out"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.bytes_read = 0
+
+    def open(self, key):
+        f = super().open(key)
+        self.bytes_read += len(self.blobs[key])
+        return f
+
+
+@override_settings(BLOB_STORE={'BACKEND': 'Investors.tests.CountingBlobStore'})
+class FeedBlobVolumeTests(TestCase):
+    """The feed must render from blob references without fetching any media bytes"""
+
+    def setUp(self):
+        self.entrepreneur = User.objects.create_user(
+            'founder@example.com', 'pw', role='entrepreneur', first_name='Ada', last_name='Founder'
+        )
+        self.investor = User.objects.create_user(
+            'investor@example.com', 'pw', role='investor', first_name='Ian', last_name='Vestor'
+        )
+        self.avatar = b'\x89PNG\r\n\x1a\n' + b'\x00' * 4096
+        EntrepreneurProfile.objects.create(user=self.entrepreneur, image=self.avatar)
+        InvestorProfile.objects.create(user=self.investor, image=b'\xff\xd8\xff' + b'\x01' * 4096)
+
+        for n in range(3):
+            post = Post.objects.create(author=self.entrepreneur, content=f'Update {n}')
+            for position, (media_type, file_type) in enumerate([
+                ('image', 'image/png'), ('video', 'video/mp4'), ('document', 'application/pdf'),
+            ]):
+                PostMedia.objects.create(
+                    post=post, media_type=media_type, file_name=f'{media_type}-{n}', file_type=file_type,
+                    file_data=bytes([n, position]) * 32 * 1024, position=position,
+                )
+            Comment.objects.create(post=post, author=self.investor, content='Nice')
+
+        self.store = get_blob_store()
+        self.store.bytes_read = 0
+
+    def test_home_feed_reads_no_blob_bytes(self):
+        self.client.force_login(self.investor)
+        response = self.client.get(reverse('home'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.store.bytes_read, 0)
+        media = PostMedia.objects.first()
+        self.assertContains(response, media.file_url)
+        self.assertContains(response, self.entrepreneur.entrepreneur_profile.image_url)
+
+    def test_bytes_only_loaded_through_explicit_read(self):
+        profile = EntrepreneurProfile.objects.get(user=self.entrepreneur)
+        self.assertTrue(profile.image)
+        self.assertEqual(self.store.bytes_read, 0)
+
+        self.assertEqual(profile.image.read(), self.avatar)
+        self.assertEqual(self.store.bytes_read, len(self.avatar))
+
+
+@mock.patch('Investors.views.FEED_PAGE_SIZE', 2)
+class FeedPageTests(TestCase):
+    """The home feed continues by cursor through feed_page as the user scrolls"""
+
+    def setUp(self):
+        self.reader = User.objects.create_user('reader@example.com', 'pw', role='investor')
+        author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.posts = [Post.objects.create(author=author, content=f'update {n}') for n in range(5)]
+        self.client.force_login(self.reader)
+
+    def post_ids(self, html):
+        return [int(post_id) for post_id in re.findall(r'class="post-card" data-post-id="(\d+)"', html)]
+
+    def test_cursors_chain_through_every_post(self):
+        home = self.client.get(reverse('home'))
+        seen = [post.id for post in home.context['posts']]
+        cursor = home.context['next_cursor']
+        while cursor:
+            data = self.client.get(reverse('investors:feed_page'), {'cursor': cursor}).json()
+            seen += self.post_ids(data['html'])
+            cursor = data['next_cursor']
+        self.assertEqual(seen, [post.id for post in reversed(self.posts)])
+
+    def test_cards_show_the_latest_comments_and_load_the_rest(self):
+        post = self.posts[-1]
+        comments = [Comment.objects.create(post=post, author=self.reader, content=f'comment {n}') for n in range(5)]
+        Post.objects.filter(pk=post.pk).update(comment_count=len(comments))
+
+        home = self.client.get(reverse('home'))
+        card = home.context['posts'][0]
+        self.assertEqual([c.id for c in card.recent_comments], [c.id for c in comments[-FEED_COMMENTS:]])
+        self.assertContains(home, reverse('investors:post_comments', args=[post.id]))
+
+        html = self.client.get(reverse('investors:post_comments', args=[post.id])).json()['html']
+        self.assertEqual([int(i) for i in re.findall(r'id="comment-(\d+)"', html)], [c.id for c in comments])
+
+    def test_rejects_a_malformed_cursor(self):
+        response = self.client.get(reverse('investors:feed_page'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MessageHistoryTests(TestCase):
+    """get_messages pages a chat's history by message id"""
+
+    def setUp(self):
+        self.me = User.objects.create_user('me@example.com', 'pw', role='investor')
+        self.other = User.objects.create_user('other@example.com', 'pw', role='entrepreneur')
+        self.messages = [
+            Message.objects.create(
+                sender=self.me if n % 2 else self.other,
+                receiver=self.other if n % 2 else self.me,
+                content=f'message {n}',
+            )
+            for n in range(120)
+        ]
+        self.url = reverse('investors:get_messages', args=[self.other.id])
+        self.client.force_login(self.me)
+
+    def history(self, **params):
+        return self.client.get(self.url, params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def ids(self, response):
+        return [message['id'] for message in response.json()['messages']]
+
+    def test_pages_back_and_syncs_forward(self):
+        expected = [message.id for message in self.messages]
+
+        latest = self.history()
+        self.assertEqual(self.ids(latest), expected[-50:])
+        self.assertTrue(latest.json()['has_more'])
+
+        older = self.history(before=expected[-50])
+        self.assertEqual(self.ids(older), expected[-100:-50])
+        oldest = self.history(before=expected[-100])
+        self.assertEqual(self.ids(oldest), expected[:20])
+        self.assertFalse(oldest.json()['has_more'])
+
+        self.assertEqual(self.ids(self.history(after=expected[-1])), [])
+        newer = Message.objects.create(sender=self.other, receiver=self.me, content='new')
+        self.assertEqual(self.ids(self.history(after=expected[-1])), [newer.id])
+
+    def test_attachments_are_metadata_only(self):
+        message = self.history().json()['messages'][-1]
+        self.assertNotIn('file_data', message)
+        self.assertLessEqual({'file_name', 'file_type', 'file_size', 'file_url'}, set(message))
+
+    def test_rejects_anchors_outside_the_conversation(self):
+        stranger = User.objects.create_user('stranger@example.com', 'pw', role='entrepreneur')
+        elsewhere = Message.objects.create(sender=stranger, receiver=self.me, content='hi')
+        self.assertEqual(self.history(before=elsewhere.id).status_code, 400)
+        self.assertEqual(self.history(after='abc').status_code, 400)
+        self.assertEqual(self.history(before=self.messages[5].id, after=self.messages[1].id).status_code, 400)
+
+
+class Socket:
+    """Minimal WebSocket test client for a consumer"""
+
+    def __init__(self, user):
+        scope = {'type': 'websocket', 'path': '/ws/user/', 'headers': [], 'subprotocols': [], 'user': user}
+        self.communicator = ApplicationCommunicator(UserConsumer.as_asgi(), scope)
+
+    async def connect(self):
+        await self.communicator.send_input({'type': 'websocket.connect'})
+        return (await self.communicator.receive_output(1))['type'] == 'websocket.accept'
+
+    async def send_json_to(self, data):
+        await self.communicator.send_input({'type': 'websocket.receive', 'text': json.dumps(data)})
+
+    async def receive_json_from(self, frame_type=None):
+        """The next frame, or the next one of ``frame_type`` if given"""
+        while True:
+            frame = json.loads((await self.communicator.receive_output(1))['text'])
+            if frame_type is None or frame['type'] == frame_type:
+                return frame
+
+    async def disconnect(self):
+        await self.communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.communicator.wait(1)
+
+
+class UserSocketTests(TestCase):
+    """One ws/user/ socket per tab carries chat, receipts, typing and notifications"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice@example.com', 'pw', role='investor')
+        self.bob = User.objects.create_user('bob@example.com', 'pw', role='entrepreneur')
+        self.carol = User.objects.create_user('carol@example.com', 'pw', role='entrepreneur', message_privacy='private')
+
+    def notify_follow(self, follower, user):
+        """notify_follow as a committed request would run it, pushing on commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            notify_follow(follower, user)
+
+    def run_sockets(self, scenario, *users):
+        async def run():
+            sockets = []
+            for user in users:
+                socket = Socket(user)
+                self.assertTrue(await socket.connect())
+                sockets.append(socket)
+            try:
+                return await scenario(*sockets)
+            finally:
+                for socket in sockets:
+                    await socket.disconnect()
+        return async_to_sync(run)()
+
+    def test_chat_reaches_both_users_and_receipts_return(self):
+        async def scenario(alice, bob):
+            await alice.send_json_to({'action': 'send_message', 'to': self.bob.id, 'content': 'hello'})
+            to_bob = await bob.receive_json_from('chat_message')
+            echo = await alice.receive_json_from('chat_message')
+
+            await bob.send_json_to({'action': 'typing', 'to': self.alice.id})
+            typing = await alice.receive_json_from()
+
+            await bob.send_json_to({'action': 'mark_read', 'with': self.alice.id, 'upto': to_bob['message']['id']})
+            receipt = await alice.receive_json_from()
+            return to_bob, echo, typing, receipt
+
+        with mock.patch.object(UserConsumer, 'read_receipt_delay', 0):
+            to_bob, echo, typing, receipt = self.run_sockets(scenario, self.alice, self.bob)
+        self.assertEqual((to_bob['type'], to_bob['message']['content']), ('chat_message', 'hello'))
+        self.assertEqual(echo['message']['id'], to_bob['message']['id'])
+        self.assertEqual((typing['type'], typing['from_id']), ('typing', self.bob.id))
+        self.assertEqual(
+            (receipt['type'], receipt['reader_id'], receipt['upto']),
+            ('read_receipt', self.bob.id, to_bob['message']['id'])
+        )
+        self.assertEqual(Conversation.objects.unread_total(self.bob), 0)
+
+    def test_read_frames_coalesce_into_one_receipt(self):
+        ids = [Message.objects.create(sender=self.alice, receiver=self.bob, content=str(n)).id for n in range(5)]
+
+        async def scenario(alice, bob):
+            for message_id in ids:
+                await bob.send_json_to({'action': 'mark_read', 'with': self.alice.id, 'upto': message_id})
+            receipt = await alice.receive_json_from('read_receipt')
+            self.assertTrue(await alice.communicator.receive_nothing(0.1))
+            return receipt
+
+        with mock.patch.object(UserConsumer, 'read_receipt_delay', 0.05):
+            receipt = self.run_sockets(scenario, self.alice, self.bob)
+        self.assertEqual(receipt['upto'], ids[-1])
+        self.assertEqual(Conversation.objects.unread_total(self.bob), 0)
+
+    def test_privacy_is_checked_on_each_send(self):
+        async def scenario(alice):
+            await alice.send_json_to({'action': 'send_message', 'to': self.carol.id, 'content': 'hi'})
+            return await alice.receive_json_from()
+
+        blocked = self.run_sockets(scenario, self.alice)
+        self.assertEqual((blocked['type'], blocked['to']), ('error', self.carol.id))
+        self.assertFalse(Message.objects.filter(receiver=self.carol).exists())
+
+        Favorite.objects.create(user=self.carol, target_user=self.alice)
+        allowed = self.run_sockets(scenario, self.alice)
+        self.assertEqual(allowed['type'], 'chat_message')
+
+    def test_sent_message_notifies_the_receiver(self):
+        async def scenario(alice, bob):
+            await alice.send_json_to({'action': 'send_message', 'to': self.bob.id, 'content': 'hello'})
+            return await bob.receive_json_from('notification')
+
+        frame = self.run_sockets(scenario, self.alice, self.bob)
+        self.assertEqual((frame['notification']['type'], frame['notification']['related_object_id']),
+                         ('message', self.alice.id))
+
+    def test_notifications_arrive_on_the_same_socket(self):
+        async def scenario(bob):
+            await database_sync_to_async(self.notify_follow)(self.alice, self.bob)
+            return await bob.receive_json_from()
+
+        frame = self.run_sockets(scenario, self.bob)
+        self.assertEqual((frame['type'], frame['notification']['type']), ('notification', 'follow'))
+
+    def test_unread_count_is_pushed_to_every_tab(self):
+        async def scenario(tab, other_tab):
+            await database_sync_to_async(self.notify_follow)(self.alice, self.bob)
+            arrived = [(await socket.receive_json_from('unread_count'))['count'] for socket in (tab, other_tab)]
+            await tab.send_json_to({'action': 'mark_all_notifications_read'})
+            read = [(await socket.receive_json_from('unread_count'))['count'] for socket in (tab, other_tab)]
+            return arrived, read
+
+        self.assertEqual(self.run_sockets(scenario, self.bob, self.bob), ([1, 1], [0, 0]))
+        self.bob.refresh_from_db()
+        self.assertEqual(self.bob.unread_notification_count, 0)
+
+
+@mock.patch.object(fanout, 'BATCH_SIZE', 2)
+class NotificationBroadcastTests(TestCase):
+    """Audience-wide notifications are queued by the request and written in batches"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.followers = [
+            User.objects.create_user(f'follower{n}@example.com', 'pw', role='investor') for n in range(5)
+        ]
+        for follower in self.followers:
+            Favorite.objects.create(user=follower, target_user=self.author)
+        self.post = Post.objects.create(author=self.author, content='launch day')
+
+    def test_request_only_queues_the_broadcast(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = notify_post_created(self.post)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(job.status, 'pending')
+        self.assertFalse(Notification.objects.exists())
+
+        self.assertTrue(fanout.run(job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.total), ('done', 5, 5))
+        self.assertEqual(
+            sorted(Notification.objects.filter(notification_type='post').values_list('user_id', flat=True)),
+            [follower.id for follower in self.followers],
+        )
+        self.assertFalse(fanout.run(job.pk))
+
+    def test_failed_run_resumes_after_the_last_batch(self):
+        job = notify_post_created(self.post)
+        write_batch = fanout._write_batch
+        calls = []
+
+        def fail_second_batch(job, ids):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise RuntimeError('database went away')
+            return write_batch(job, ids)
+
+        with mock.patch.object(fanout, '_write_batch', fail_second_batch), \
+                mock.patch.object(fanout, '_retry_later') as retry_later, \
+                self.assertLogs('Investors.fanout', 'ERROR'):
+            fanout.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.attempts, job.error), ('pending', 2, 1, 'database went away'))
+        retry_later.assert_called_once_with(job.pk, fanout.RETRY_DELAY)
+
+        fanout.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.sent, job.attempts, job.error), ('done', 5, 2, ''))
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_investor_broadcast_reaches_sockets(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(user_group(self.followers[0].id), channel)
+
+        job = fanout.broadcast(self.author, 'investors', 'startup', 'New Startup', 'Acme launched')
+        fanout.run(job.pk)
+
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual((event['type'], event['notification']['title']), ('notification_message', 'New Startup'))
+        self.assertEqual(Notification.objects.filter(notification_type='startup').count(), 5)
+        self.assertFalse(Notification.objects.filter(user=self.author).exists())
+
+
+class NotificationCollapsingTests(TestCase):
+    """Repeated likes, comments and messages on one object share an unread notification"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.fans = [
+            User.objects.create_user(f'fan{n}@example.com', 'pw', role='investor', first_name=f'Fan{n}')
+            for n in range(3)
+        ]
+        self.post = Post.objects.create(author=self.author, content='launch day')
+
+    def test_likes_collapse_and_push_once(self):
+        with mock.patch.object(NotificationService, 'send_realtime_notification') as push:
+            for fan in self.fans + self.fans[-1:]:
+                with self.captureOnCommitCallbacks(execute=True):
+                    notify_like(self.post, fan)
+
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual(notification.actor_count, 3)
+        self.assertEqual(notification.message, 'Fan2 and 2 others liked your post')
+        self.assertEqual(push.call_count, 1)
+
+    def test_returning_actor_is_counted_once(self):
+        a, b = self.fans[:2]
+        for fan in (a, b, a):
+            notify_like(self.post, fan)
+
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual(notification.actor_count, 2)
+        self.assertEqual(notification.message, 'Fan0 and 1 other liked your post')
+
+    def test_push_waits_for_commit(self):
+        with mock.patch.object(NotificationService, 'send_realtime_notification') as push:
+            with self.captureOnCommitCallbacks() as callbacks:
+                notify_follow(self.fans[0], self.author)
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    notify_follow(self.fans[1], self.author)
+                    raise RuntimeError('request failed')
+            push.assert_not_called()
+            # The rolled back notification's push went with it
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+        push.assert_called_once()
+        self.assertEqual(Notification.objects.filter(user=self.author).count(), 1)
+
+    def test_read_or_old_notifications_are_not_reopened(self):
+        notify_like(self.post, self.fans[0])
+        Notification.objects.update(is_read=True)
+        notify_like(self.post, self.fans[1])
+        with override_settings(NOTIFICATION_AGGREGATION_WINDOW=0):
+            notify_like(self.post, self.fans[2])
+        self.assertEqual(list(Notification.objects.order_by('id').values_list('actor_count', flat=True)), [1, 1, 1])
+
+    def test_chat_messages_collapse_per_sender(self):
+        consumer = UserConsumer()
+        consumer.user = self.fans[0]
+        send = async_to_sync(consumer.save_message)
+
+        notifications = [send(self.author.id, f'hi {n}', 'text')[1] for n in range(3)]
+        self.assertEqual(notifications[0]['type'], 'message')
+        self.assertEqual(notifications[1:], [None, None])
+        notification = Notification.objects.get(user=self.author)
+        self.assertEqual((notification.actor_count, notification.message), (3, 'Fan0 sent you 3 messages'))
+
+
+class UnreadNotificationCountTests(TestCase):
+    """The unread badge is a counter column on the user, not a COUNT of notifications"""
+
+    def setUp(self):
+        self.author = User.objects.create_user('author@example.com', 'pw', role='entrepreneur')
+        self.fans = [User.objects.create_user(f'fan{n}@example.com', 'pw', role='investor') for n in range(3)]
+        self.post = Post.objects.create(author=self.author, content='launch day')
+
+    def unread(self, user):
+        user.refresh_from_db(fields=['unread_notification_count'])
+        return user.unread_notification_count
+
+    def test_counter_follows_creates_collapses_and_reads(self):
+        notify_like(self.post, self.fans[0])
+        notify_like(self.post, self.fans[1])
+        notify_follow(self.fans[0], self.author)
+        self.assertEqual(self.unread(self.author), 2)
+
+        like = Notification.objects.get(user=self.author, notification_type='like')
+        for _ in range(2):
+            self.assertTrue(NotificationService.mark_as_read(like.id, self.author))
+        self.assertEqual(self.unread(self.author), 1)
+        self.assertFalse(NotificationService.mark_as_read(like.id, self.fans[0]))
+
+        NotificationService.mark_all_as_read(self.author)
+        self.assertEqual(self.unread(self.author), 0)
+
+        direct = Notification.objects.create(user=self.author, notification_type='meeting', title='Meeting', message='hi')
+        self.assertEqual(self.unread(self.author), 1)
+        direct.delete()
+        self.assertEqual(self.unread(self.author), 0)
+
+    def test_broadcast_batches_count_each_recipient(self):
+        for fan in self.fans:
+            Favorite.objects.create(user=fan, target_user=self.author)
+        with mock.patch.object(fanout, 'BATCH_SIZE', 2):
+            fanout.run(notify_post_created(self.post).pk)
+        self.assertEqual([self.unread(fan) for fan in self.fans], [1, 1, 1])
+
+    def test_pages_read_the_count_without_counting_rows(self):
+        notify_follow(self.fans[0], self.author)
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('investors:notifications_list'))
+        self.assertEqual(response.context['unread_notification_count'], 1)
+        self.assertFalse([q['sql'] for q in queries if 'COUNT' in q['sql'] and 'notification' in q['sql']])
+
+    def test_reconcile_repairs_drift(self):
+        notify_follow(self.fans[0], self.author)
+        User.objects.filter(pk=self.fans[1].pk).update(unread_notification_count=4)
+
+        call_command('reconcile_notification_counts', stdout=StringIO())
+        self.assertEqual((self.unread(self.author), self.unread(self.fans[1])), (1, 0))
+
+
+@mock.patch('Investors.views.NOTIFICATION_PAGE_SIZE', 2)
+class NotificationPagingTests(TestCase):
+    """Notifications page back by keyset cursor and sync forward by id"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader@example.com', 'pw', role='investor')
+        self.sender = User.objects.create_user('sender@example.com', 'pw', role='entrepreneur')
+        self.ids = [
+            Notification.objects.create(user=self.user, sender=self.sender, title=f'n{n}', message='hi').id
+            for n in range(5)
+        ]
+        Notification.objects.create(user=self.sender, title='not mine', message='hi')
+        self.client.force_login(self.user)
+        self.url = reverse('investors:get_notifications_data')
+
+    def test_cursor_pages_back_through_every_notification(self):
+        seen, cursor = [], None
+        while True:
+            data = self.client.get(self.url, {'cursor': cursor} if cursor else {}).json()
+            seen += [notification['id'] for notification in data['notifications']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, self.ids[::-1])
+        self.assertEqual(data['unread_count'], 5)
+
+    def test_since_returns_only_newer_notifications(self):
+        data = self.client.get(self.url, {'since': self.ids[1]}).json()
+        self.assertEqual(([n['id'] for n in data['notifications']], data['has_more']), (self.ids[2:4], True))
+        data = self.client.get(self.url, {'since': self.ids[3]}).json()
+        self.assertEqual(([n['id'] for n in data['notifications']], data['has_more']), (self.ids[4:], False))
+
+    def test_rejects_bad_anchors(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': '!!'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'since': 1, 'cursor': 'abc'}).status_code, 400)
+
+    def test_list_page_links_to_the_next_page(self):
+        response = self.client.get(reverse('investors:notifications_list'))
+        self.assertEqual([n.id for n in response.context['notifications']], self.ids[:2:-1])
+        self.assertContains(response, f'data-next-cursor="{response.context["next_cursor"]}"')
@@ -11,6 +11,8 @@ urlpatterns = [
 	path('profile/', views.investor_profile, name='profile'),
 	path('profile/<int:user_id>/', views.investor_profile_detail, name='profile_detail'),
 	path('create-post/', views.create_post, name='create_post'),
+	path('feed/', views.feed_page, name='feed_page'),
+	path('posts/<int:post_id>/comments/', views.post_comments, name='post_comments'),
 	path('like-post/<int:post_id>/', views.like_post, name='like_post'),
     path('my-posts/', views.my_posts, name='my_posts'),
     path('posts/<int:post_id>/edit/', views.edit_post, name='edit_post'),
@@ -1,5 +1,6 @@
 
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -8,14 +9,13 @@ from Entrepreneurs.models import User, Favorite, CollaborationRequest, Notificat
 from .models import InvestorProfile, InvestorPortfolio, InvestmentDocument, FundingRound, InvestmentCommitment
 from .forms import InvestorRegistrationForm, InvestorProfileForm, MessageSettingsForm
 from django.http import JsonResponse
-from Entrepreneurs.models import Post, PostMedia
+from Entrepreneurs.models import Post, PostMedia, mark_viewer_state
 from Entrepreneurs.forms import PostForm
 from django.views.decorators.http import require_POST, require_http_methods
 from django.http import JsonResponse, HttpResponseForbidden
-from Entrepreneurs.models import Post, Comment, CollaborationRequest, EntrepreneurProfile, Favorite, Message
+from Entrepreneurs.models import Post, Comment, CollaborationRequest, EntrepreneurProfile, Favorite, Message, MessageSerializer, Conversation
 from Entrepreneurs.forms import CommentForm
 from django.shortcuts import get_object_or_404
-import base64
 from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
@@ -23,7 +23,9 @@ from django.views.decorators.csrf import csrf_exempt
 from .models import FundingRound, InvestmentCommitment
 from django.db.models import Sum
 from decimal import Decimal
-from .services import NotificationService
+from .services import NotificationService, send_read_receipt
+from Entrepreneurs import graph, matching, privacy, search, timeline
+from CoFound.variants import sized_url
 from django.db import models
 from .forms import MeetingRequestForm
 from Entrepreneurs.models import Meeting
@@ -46,6 +48,8 @@ def message_settings(request):
         form = MessageSettingsForm(request.POST, instance=request.user)
         if form.is_valid():
             form.save()
+            if 'message_privacy' in form.changed_data:
+                privacy.forget_receiver(request.user.id)
             # Redirect to the next parameter or default to messages page
             next_url = request.POST.get('next') or request.GET.get('next') or 'investors:messages'
             return redirect(next_url)
@@ -53,86 +57,55 @@ def message_settings(request):
         form = MessageSettingsForm(instance=request.user)
     return render(request, 'messages/settings.html', { 'form': form })
 
+RECENT_CONVERSATIONS = 25
+
+
 @login_required
 def messages_page(request):
-    # Recent chats = users you've exchanged messages with OR you follow
-    recent_users = set()
-    from Entrepreneurs.models import Message, Favorite, User # Ensure User is imported
-    
+    # Recent chats come from the per-pair Conversation summaries, newest first
+    from Entrepreneurs.models import Conversation, User
+
     # Check if there's an open_chat parameter
     open_chat_id = request.GET.get('open_chat')
     open_chat_user = None
-    
+
     if open_chat_id:
         try:
-            user_id_int = int(open_chat_id) # Explicit conversion
-            open_chat_user = User.objects.get(id=user_id_int)
-            # Add the user to recent_users if they exist and are accessible
-            is_connected = (request.user.favorites.filter(target_user=open_chat_user).exists() or
-                            request.user.favorited_by.filter(user=open_chat_user).exists())
-            if open_chat_user.message_privacy == 'public' or is_connected:
-                recent_users.add(open_chat_user)
+            open_chat_user = User.objects.get(id=int(open_chat_id))
         except (ValueError, User.DoesNotExist): # Handle both potential errors
             # User not found or invalid ID, handled in template
             pass
-    
-    msg_users = set()
-    # Use select_related to pre-fetch sender and receiver to avoid N+1 queries
-    messages = Message.objects.filter(Q(sender=request.user) | Q(receiver=request.user)).select_related('sender', 'receiver').distinct()
-    for msg in messages:
-        try:
-            # Check if sender exists and is not the current user
-            if hasattr(msg, 'sender') and msg.sender and msg.sender != request.user:
-                msg_users.add(msg.sender.id)
-            # Check if receiver exists and is not the current user
-            if hasattr(msg, 'receiver') and msg.receiver and msg.receiver != request.user:
-                msg_users.add(msg.receiver.id)
-        except User.DoesNotExist:
-            # Skip messages with deleted users
-            continue
-    for uid in msg_users:
-        try:
-            u = User.objects.get(id=uid)
-            is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                            request.user.favorited_by.filter(user=u).exists())
-            if u.message_privacy == 'public' or is_connected:
-                recent_users.add(u)
-        except User.DoesNotExist:
-            pass
-    for f in Favorite.objects.filter(user=request.user).select_related('target_user'):
-        u = f.target_user
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        if u.message_privacy == 'public' or is_connected:
-            recent_users.add(u)
-    for f in Favorite.objects.filter(target_user=request.user).select_related('user'):
-        u = f.user
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        if u.message_privacy == 'public' or is_connected:
-            recent_users.add(u)
-    recent_users_with_data = []
-    total_unread_count = 0
-    for u in recent_users:
-        last_message = Message.objects.filter(
-            (Q(sender=request.user) & Q(receiver=u)) |
-            (Q(sender=u) & Q(receiver=request.user))
-        ).order_by('-timestamp').first()
-        unread_count = Message.objects.filter(sender=u, receiver=request.user, is_read=False).count()
-        total_unread_count += unread_count
-        if last_message:
-            recent_users_with_data.append({
-                'user': u,
-                'last_message': last_message,
-                'unread_count': unread_count,
-                'last_message_time': last_message.timestamp
-            })
-    recent_users_with_data.sort(key=lambda x: x['last_message_time'], reverse=True)
-    recent_list = [item['user'] for item in recent_users_with_data[:25]]
-    unread_counts = {item['user'].id: item['unread_count'] for item in recent_users_with_data[:25]}
-    last_messages = {item['user'].id: item['last_message'] for item in recent_users_with_data[:25]}
-    last_message_times = {item['user'].id: item['last_message_time'] for item in recent_users_with_data[:25]}
-    
+
+    recent_list = []
+    unread_counts = {}
+    last_messages = {}
+    last_message_times = {}
+    conversations = Conversation.objects.for_user(request.user).exclude(last_message_at=None).select_related(
+        'user_a', 'user_a__entrepreneur_profile', 'user_a__investor_profile',
+        'user_b', 'user_b__entrepreneur_profile', 'user_b__investor_profile',
+    )
+    # Read a batch at a time, skipping people the user may no longer message
+    start = 0
+    while len(recent_list) < RECENT_CONVERSATIONS:
+        batch = list(conversations[start:start + RECENT_CONVERSATIONS * 2])
+        if not batch:
+            break
+        start += len(batch)
+        allowed = privacy.messageable(request.user.id, [conversation.other(request.user).id for conversation in batch])
+        for conversation in batch:
+            u = conversation.other(request.user)
+            if u.id not in allowed or len(recent_list) == RECENT_CONVERSATIONS:
+                continue
+            recent_list.append(u)
+            unread_counts[u.id] = conversation.unread_for(request.user)
+            last_messages[u.id] = {
+                'content': conversation.last_message_preview,
+                'sender_id': conversation.last_sender_id,
+            }
+            last_message_times[u.id] = conversation.last_message_at
+    # Only the conversations listed; ones hidden by the privacy check do not count
+    total_unread_count = sum(unread_counts.values())
+
     return render(request, 'messages/index.html', {
         'recents': recent_list,
         'unread_counts': unread_counts,
@@ -154,17 +127,6 @@ def message_search(request):
         qs = qs.filter(Q(first_name__icontains=q) | Q(last_name__icontains=q) | Q(email__icontains=q))
     qs = qs.select_related('entrepreneur_profile', 'investor_profile')[:20]
 
-    def img64(u):
-        try:
-            if hasattr(u, 'entrepreneur_profile') and u.entrepreneur_profile.image:
-                import base64
-                return 'data:image/jpeg;base64,' + base64.b64encode(u.entrepreneur_profile.image).decode('utf-8')
-            if hasattr(u, 'investor_profile') and u.investor_profile.image:
-                import base64
-                return 'data:image/jpeg;base64,' + base64.b64encode(u.investor_profile.image).decode('utf-8')
-        except Exception:
-            return ''
-        return ''
 
     def profile_url(u):
         if u.role == 'investor':
@@ -172,23 +134,25 @@ def message_search(request):
         else:
             return f"/entrepreneur/profile/{u.id}/"
 
+    allowed = privacy.messageable(request.user.id, [u.id for u in qs])
     results = []
     for u in qs:
-        is_connected = (request.user.favorites.filter(target_user=u).exists() or
-                        request.user.favorited_by.filter(user=u).exists())
-        can_message = (u.message_privacy == 'public') or is_connected
         results.append({
             'id': u.id,
             'name': u.get_full_name() or u.email,
             'role': u.role,
-            'avatar': img64(u),
+            'avatar': sized_url(u.profile_image_url, 64),
             'profile_url': profile_url(u),
             'is_private': u.message_privacy == 'private',
-            'can_message': can_message,
+            'can_message': u.id in allowed,
         })
     return JsonResponse({ 'results': results })
 
 
+# Messages returned per request of a chat's history
+MESSAGE_PAGE_SIZE = 50
+
+
 @login_required
 def get_messages(request, user_id):
     """Get messages between current user and another user"""
@@ -207,39 +171,35 @@ def get_messages(request, user_id):
     try:
         # Enforce privacy: only show messages if allowed
         other = User.objects.get(id=user_id)
-        if other.message_privacy == 'private':
-            is_friend = (request.user.favorites.filter(target_user=other).exists() or
-                         request.user.favorited_by.filter(user=other).exists())
-            if not is_friend:
-                return HttpResponseForbidden('User only allows messages from friends.')
-        
-        qs = Message.objects.filter(
-            (Q(sender=request.user) & Q(receiver=other)) |
-            (Q(sender=other) & Q(receiver=request.user))
-        ).order_by('timestamp')
-        
-        # Mark unread messages as read
-        qs.filter(receiver=request.user, is_read=False).update(is_read=True)
+        if not privacy.can_message(request.user.id, other.id):
+            return HttpResponseForbidden('User only allows messages from friends.')
         
-        # Serialize messages
-        messages_data = []
-        for msg in qs:
-            message_data = {
-                'id': msg.id,
-                'content': msg.content,
-                'sender': msg.sender.id,
-                'receiver': msg.receiver.id,
-                'timestamp': msg.timestamp.isoformat(),
-                'is_read': msg.is_read,
-                'message_type': msg.message_type,
-                'file_name': msg.file_name,
-                'file_type': msg.file_type,
-                'file_size': msg.file_size,
-                'file_base64': base64.b64encode(msg.file_data).decode('utf-8') if msg.file_data else None
-            }
-            messages_data.append(message_data)
-        
-        return JsonResponse({'messages': messages_data})
+        try:
+            before = int(request.GET['before']) if request.GET.get('before') else None
+            after = int(request.GET['after']) if request.GET.get('after') else None
+            if before is not None and after is not None:
+                raise ValueError('Pass either before or after, not both')
+            page, has_more = Message.objects.between(request.user.id, other.id).select_related(
+                'sender', 'receiver'
+            ).history(before=before, after=after, limit=MESSAGE_PAGE_SIZE)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Opening or syncing the chat reads up to the newest message fetched;
+        # the watermark only moves (and the peer only hears of it) if it advanced
+        if page and before is None and Conversation.objects.mark_read(request.user.id, other.id, page[-1].pk):
+            send_read_receipt(request.user.id, other.id, page[-1].pk)
+
+        user_a_id, user_b_id = Conversation.objects.pair(request.user.id, other.id)
+        summary = Conversation.objects.filter(user_a_id=user_a_id, user_b_id=user_b_id).first()
+        read_upto = summary.read_upto() if summary else {}
+
+        # Attachments are described by name, type, size and URL; the bytes
+        # are fetched separately from the media view
+        return JsonResponse({
+            'messages': MessageSerializer(page, many=True, context={'read_upto': read_upto}).data,
+            'has_more': has_more,
+        })
     except User.DoesNotExist:
         return JsonResponse({'error': 'User not found'}, status=404)
 
@@ -305,6 +265,9 @@ def investor_logout(request):
     return redirect('index')  # Redirect to landing page
 
 
+FEED_PAGE_SIZE = 10
+
+
 @login_required
 def home(request):
     """Common home view for both investors and entrepreneurs"""
@@ -317,20 +280,8 @@ def home(request):
     else:
         profile = EntrepreneurProfile.objects.get_or_create(user=request.user)[0]
 
-    # Current accepted CollaborationRequest connections
-    accepted = CollaborationRequest.objects.filter(
-        Q(investor=request.user, status='accepted') | Q(entrepreneur=request.user, status='accepted')
-    )
-    connected_user_ids = set()
-    for r in accepted:
-        connected_user_ids.add(r.investor_id)
-        connected_user_ids.add(r.entrepreneur_id)
-    connected_user_ids.discard(request.user.id)
-
-    # Current favorites (same-role follows)
-    favorites = Favorite.objects.filter(user=request.user).select_related('target_user')
-    for f in favorites:
-        connected_user_ids.add(f.target_user_id)
+    # Users already connected through an accepted collaboration or a follow
+    connected_user_ids = graph.neighbor_ids(request.user.id)
 
     # Suggestions: both roles, exclude already connected and self
     users_qs = User.objects.exclude(id=request.user.id).select_related(
@@ -339,76 +290,58 @@ def home(request):
     suggestions_qs = users_qs.exclude(id__in=connected_user_ids)
     suggestions = list(suggestions_qs[:5])
 
-    # Build mutual friends from both accepted graph and favorites graph
-    def neighbors(u: User):
-        nbrs = set()
-        # collab neighbors
-        for r in CollaborationRequest.objects.filter(
-            Q(investor=u, status='accepted') | Q(entrepreneur=u, status='accepted')
-        ):
-            nbrs.add(r.investor)
-            nbrs.add(r.entrepreneur)
-        # favorites neighbors (following)
-        for f in Favorite.objects.filter(user=u).select_related('target_user'):
-            nbrs.add(f.target_user)
-        if u in nbrs:
-            nbrs.discard(u)
-        return nbrs
-
-    my_neighbors = neighbors(request.user)
-    second_degree = set()
-    for n in my_neighbors:
-        second_degree.update(neighbors(n))
-    # Exclude already connected/self and direct neighbors
-    rs_mutual = [u for u in second_degree if u.id not in connected_user_ids and u.id != request.user.id and u not in my_neighbors]
+    # People followed or collaborated with by the user's own connections
+    rs_mutual = graph.suggest_mutuals(request.user, k=5, neighbors=connected_user_ids)
 
     # Same industry suggestions (role-aware terms) still exclude connected
-    def split_terms(s):
-        if not s:
-            return set()
-        return set(t.strip().lower() for t in s.split(',') if t.strip())
+    rs_industry = matching.industry_matches(request.user, profile, exclude=connected_user_ids, k=5)
 
-    rs_industry = []
-    if request.user.role == 'investor':
-        inv_terms = split_terms(profile.preferred_industries)
-        for ep in EntrepreneurProfile.objects.select_related('user').all():
-            if ep.user.id in connected_user_ids or ep.user.id == request.user.id:
-                continue
-            if inv_terms and (split_terms(ep.industries) & inv_terms):
-                rs_industry.append(ep.user)
-    else:
-        ep_terms = split_terms(profile.industries)
-        for ip in InvestorProfile.objects.select_related('user').all():
-            if ip.user.id in connected_user_ids or ip.user.id == request.user.id:
-                continue
-            if ep_terms and (split_terms(ip.preferred_industries) & ep_terms):
-                rs_industry.append(ip.user)
-
-    # Posts feed unchanged...
+    # First page of the feed; the rest is fetched by feed_page as the user scrolls
     try:
-        posts = Post.objects.select_related(
-            'author', 
-            'author__entrepreneur_profile', 
-            'author__investor_profile'
-        ).prefetch_related(
-            'media_files', 'likes', 'comments',
-            'comments__author', 'comments__author__entrepreneur_profile', 'comments__author__investor_profile'
-        ).order_by('-created_at')
+        posts, next_cursor = timeline.timeline_page(request.user, limit=FEED_PAGE_SIZE)
+        mark_viewer_state(posts, request.user)
     except Exception as e:
         print(f"Error fetching posts: {e}")
-        posts = []
+        posts, next_cursor = [], None
 
     context = {
         'profile': profile,
         'users': users_qs,
         'posts': posts,
+        'next_cursor': next_cursor,
         'suggestions': suggestions,
-        'rs_mutual': rs_mutual[:5],
-        'rs_industry': rs_industry[:5],
+        'rs_mutual': rs_mutual,
+        'rs_industry': rs_industry,
     }
     return render(request, 'home.html', context)
 
 
+@login_required
+def feed_page(request):
+    """Next page of the home feed, as rendered post cards plus the cursor after them"""
+    try:
+        posts, next_cursor = timeline.timeline_page(
+            request.user, cursor=request.GET.get('cursor'), limit=FEED_PAGE_SIZE
+        )
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    mark_viewer_state(posts, request.user)
+    # One render for the whole page: context processors run once, not per card
+    html = render_to_string('partials/feed_posts.html', {'posts': posts, 'user': request.user}, request=request)
+    return JsonResponse({'html': html, 'next_cursor': next_cursor})
+
+
+@login_required
+def post_comments(request, post_id):
+    """All of a post's comments, rendered, for a card that shows only the latest few"""
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = post.comments.select_related(
+        'author', 'author__entrepreneur_profile', 'author__investor_profile'
+    ).order_by('created_at', 'id')
+    html = render_to_string('partials/post_comments.html', {'comments': comments, 'user': request.user}, request=request)
+    return JsonResponse({'html': html})
+
+
 @login_required
 def investor_dashboard(request):
     if request.user.role != 'investor':
@@ -487,7 +420,7 @@ def investor_profile(request):
             profile = form.save(commit=False)
             image_file = request.FILES.get('image_upload')
             if image_file:
-                profile.image = image_file.read()
+                profile.image = image_file
             profile.save()
             form.save_m2m()
             messages.success(request, 'Profile updated successfully!')
@@ -523,7 +456,7 @@ def upload_investment_document(request):
                 file_obj = request.FILES['file']
                 document.file_name = file_obj.name
                 document.file_type = file_obj.content_type
-                document.file_data = file_obj.read()
+                document.file_data = file_obj
                 document.save()
                 messages.success(request, 'Document uploaded successfully!')
             else:
@@ -572,7 +505,7 @@ def create_post(request):
                         media_type='image',
                         file_name=image.name,
                         file_type=image.content_type,
-                        file_data=image.read(),
+                        file_data=image,
                         file_size=image.size
                     )
                 
@@ -583,7 +516,7 @@ def create_post(request):
                         media_type='video',
                         file_name=video.name,
                         file_type=video.content_type,
-                        file_data=video.read(),
+                        file_data=video,
                         file_size=video.size
                     )
                 
@@ -594,7 +527,7 @@ def create_post(request):
                         media_type='document',
                         file_name=document.name,
                         file_type=document.content_type,
-                        file_data=document.read(),
+                        file_data=document,
                         file_size=document.size
                     )
                 
@@ -620,12 +553,8 @@ def like_post(request, post_id):
     """Like post view for investors - uses same logic as entrepreneurs"""
     try:
         post = Post.objects.get(id=post_id)
-        if request.user in post.likes.all():
-            post.likes.remove(request.user)
-            liked = False
-        else:
-            post.likes.add(request.user)
-            liked = True
+        liked = post.toggle_like(request.user)
+        if liked:
             # Send notification to post author
             from .services import notify_like
             notify_like(post, request.user)
@@ -633,7 +562,7 @@ def like_post(request, post_id):
         return JsonResponse({
             'success': True,
             'liked': liked,
-            'likes_count': post.likes.count()
+            'likes_count': post.like_count
         })
     except Post.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Post not found'})
@@ -648,29 +577,20 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            post.adjust_counter('comment_count', 1)
 
         # Send notification to post author
         from .services import notify_comment
         notify_comment(post, request.user)
 
-        # Safely resolve and encode profile image
-        image_bytes = None
-        try:
-            if hasattr(comment.author, 'investor_profile') and comment.author.investor_profile.image:
-                image_bytes = comment.author.investor_profile.image
-            elif hasattr(comment.author, 'entrepreneur_profile') and comment.author.entrepreneur_profile.image:
-                image_bytes = comment.author.entrepreneur_profile.image
-        except Exception:
-            image_bytes = None
-        author_image_b64 = base64.b64encode(image_bytes).decode('utf-8') if image_bytes else ''
-
         return JsonResponse({
             'success': True,
             'comment': {
                 'id': comment.id,
                 'author_name': comment.author.get_full_name() or comment.author.email,
-                'author_image': author_image_b64,
+                'author_image': sized_url(comment.author.profile_image_url, 64),
                 'content': comment.content,
                 'created_at': comment.created_at.strftime('%Y-%m-%d %H:%M'),
             }
@@ -696,26 +616,23 @@ def delete_comment(request, comment_id):
 	comment = get_object_or_404(Comment, id=comment_id)
 	if comment.author != request.user:
 		return HttpResponseForbidden('Not allowed')
-	comment.delete()
+	with transaction.atomic():
+		# A repeated or concurrent delete finds no row and leaves the count alone
+		deleted, _ = comment.delete()
+		if deleted:
+			comment.post.adjust_counter('comment_count', -deleted)
 	return JsonResponse({'success': True})
 
 @login_required
 @require_POST
 def toggle_save(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    user = request.user
-    if post.saved_by.filter(id=user.id).exists():
-        post.saved_by.remove(user)
-        return JsonResponse({'success': True, 'saved': False})
-    else:
-        post.saved_by.add(user)
-        return JsonResponse({'success': True, 'saved': True})
+    saved = post.toggle_save(request.user)
+    return JsonResponse({'success': True, 'saved': saved, 'saves_count': post.save_count})
 
 @login_required
 def saved_posts(request):
-    posts = Post.objects.select_related(
-        'author', 'author__entrepreneur_profile', 'author__investor_profile'
-    ).prefetch_related('media_files', 'likes', 'comments').filter(saved_by=request.user).order_by('-created_at')
+    posts = mark_viewer_state(Post.objects.for_feed().filter(saved_by=request.user).order_by('-created_at'), request.user)
     context = {
         'posts': posts,
         'saved_page': True,
@@ -750,7 +667,7 @@ def investor_profile_detail(request, user_id):
     from django.db.models import Q
     target_user = get_object_or_404(User, id=user_id, role='investor')
     profile = get_object_or_404(InvestorProfile, user=target_user)
-    posts = Post.objects.filter(author=target_user).order_by('-created_at')
+    posts = mark_viewer_state(Post.objects.for_feed().filter(author=target_user).order_by('-created_at'), request.user)
     # Check connection status if viewer is entrepreneur
     connection = None
     if request.user.role == 'entrepreneur':
@@ -775,9 +692,7 @@ def investor_profile_detail(request, user_id):
 
 @login_required
 def my_posts(request):
-    posts = Post.objects.select_related(
-        'author', 'author__entrepreneur_profile', 'author__investor_profile'
-    ).prefetch_related('media_files', 'likes', 'comments').filter(author=request.user).order_by('-created_at')
+    posts = mark_viewer_state(Post.objects.for_feed().filter(author=request.user).order_by('-created_at'), request.user)
     return render(request, 'my_posts.html', { 'posts': posts })
 
 @login_required
@@ -835,64 +750,17 @@ def toggle_connection(request, target_id):
 @login_required
 def my_network(request):
     # Build connections as union of accepted collab and favorites
-    conns_qs = CollaborationRequest.objects.filter(
-        Q(investor=request.user, status='accepted') | Q(entrepreneur=request.user, status='accepted')
-    ).select_related('investor', 'entrepreneur', 'investor__investor_profile', 'entrepreneur__entrepreneur_profile')
-    connections = []
-    connected_user_ids = set()
-    for r in conns_qs:
-        other = r.investor if r.investor_id != request.user.id else r.entrepreneur
-        if other.id != request.user.id:
-            connections.append(other)
-            connected_user_ids.add(other.id)
-    for f in Favorite.objects.filter(user=request.user).select_related('target_user'):
-        if f.target_user_id != request.user.id and f.target_user_id not in connected_user_ids:
-            connections.append(f.target_user)
-            connected_user_ids.add(f.target_user_id)
-
-    # mutual via neighbors-of-neighbors using union graph
-    def neighbors(u: User):
-        nbrs = set()
-        for r in CollaborationRequest.objects.filter(
-            Q(investor=u, status='accepted') | Q(entrepreneur=u, status='accepted')
-        ):
-            nbrs.add(r.investor)
-            nbrs.add(r.entrepreneur)
-        for f in Favorite.objects.filter(user=u).select_related('target_user'):
-            nbrs.add(f.target_user)
-        if u in nbrs:
-            nbrs.discard(u)
-        return nbrs
-
-    my_neighbors = neighbors(request.user)
-    second_degree = set()
-    for n in my_neighbors:
-        second_degree.update(neighbors(n))
-    mutual_suggestions = [u for u in second_degree if u.id not in connected_user_ids and u.id != request.user.id and u not in my_neighbors]
+    connected_user_ids = graph.neighbor_ids(request.user.id)
+    connections = list(User.objects.filter(id__in=connected_user_ids).select_related(
+        'entrepreneur_profile', 'investor_profile'
+    ))
 
-    # same-industry re-used from home logic
-    def split_terms(s):
-        if not s:
-            return set()
-        return set(t.strip().lower() for t in s.split(',') if t.strip())
+    mutual_suggestions = graph.suggest_mutuals(request.user, neighbors=connected_user_ids)
 
-    industry_suggestions = []
-    if request.user.role == 'investor':
-        inv = InvestorProfile.objects.get_or_create(user=request.user)[0]
-        inv_terms = split_terms(inv.preferred_industries)
-        for ep in EntrepreneurProfile.objects.select_related('user').all():
-            if ep.user.id in connected_user_ids or ep.user.id == request.user.id:
-                continue
-            if inv_terms and (split_terms(ep.industries) & inv_terms):
-                industry_suggestions.append(ep.user)
-    else:
-        ep = EntrepreneurProfile.objects.get_or_create(user=request.user)[0]
-        ep_terms = split_terms(ep.industries)
-        for ip in InvestorProfile.objects.select_related('user').all():
-            if ip.user.id in connected_user_ids or ip.user.id == request.user.id:
-                continue
-            if ep_terms and (split_terms(ip.preferred_industries) & ep_terms):
-                industry_suggestions.append(ip.user)
+    # same-industry re-used from home logic
+    profile_model = InvestorProfile if request.user.role == 'investor' else EntrepreneurProfile
+    profile = profile_model.objects.get_or_create(user=request.user)[0]
+    industry_suggestions = matching.industry_matches(request.user, profile, exclude=connected_user_ids)
 
     context = {
         'connections': connections,
@@ -904,81 +772,23 @@ def my_network(request):
 @login_required
 def network_data(request):
     # Union of favorites and accepted collab for connections
-    conns_qs = CollaborationRequest.objects.filter(
-        Q(investor=request.user, status='accepted') | Q(entrepreneur=request.user, status='accepted')
-    ).select_related('investor', 'entrepreneur', 'investor__investor_profile', 'entrepreneur__entrepreneur_profile')
-    connections = []
-    connected_ids = set()
-    for r in conns_qs:
-        other = r.investor if r.investor_id != request.user.id else r.entrepreneur
-        if other.id != request.user.id:
-            connections.append(other)
-            connected_ids.add(other.id)
-    for f in Favorite.objects.filter(user=request.user).select_related('target_user'):
-        if f.target_user_id != request.user.id and f.target_user_id not in connected_ids:
-            connections.append(f.target_user)
-            connected_ids.add(f.target_user_id)
-
-    def img64(u):
-        try:
-            if hasattr(u, 'entrepreneur_profile') and u.entrepreneur_profile.image:
-                import base64
-                return base64.b64encode(u.entrepreneur_profile.image).decode('utf-8')
-            if hasattr(u, 'investor_profile') and u.investor_profile.image:
-                import base64
-                return base64.b64encode(u.investor_profile.image).decode('utf-8')
-        except Exception:
-            return ''
-        return ''
-
-    def neighbors(u: User):
-        nbrs = set()
-        for r in CollaborationRequest.objects.filter(
-            Q(investor=u, status='accepted') | Q(entrepreneur=u, status='accepted')
-        ):
-            nbrs.add(r.investor)
-            nbrs.add(r.entrepreneur)
-        for f in Favorite.objects.filter(user=u).select_related('target_user'):
-            nbrs.add(f.target_user)
-        if u in nbrs:
-            nbrs.discard(u)
-        return nbrs
-
-    my_neighbors = neighbors(request.user)
-    second_degree = set()
-    for n in my_neighbors:
-        second_degree.update(neighbors(n))
-    mutual = [u for u in second_degree if u.id not in connected_ids and u.id != request.user.id and u not in my_neighbors]
-
-    def split_terms(s):
-        if not s:
-            return set()
-        return set(t.strip().lower() for t in s.split(',') if t.strip())
-
-    industry = []
-    if request.user.role == 'investor':
-        inv = InvestorProfile.objects.get_or_create(user=request.user)[0]
-        inv_terms = split_terms(inv.preferred_industries)
-        for ep in EntrepreneurProfile.objects.select_related('user').all():
-            if ep.user.id in connected_ids or ep.user.id == request.user.id:
-                continue
-            if inv_terms and (split_terms(ep.industries) & inv_terms):
-                industry.append(ep.user)
-    else:
-        ep = EntrepreneurProfile.objects.get_or_create(user=request.user)[0]
-        ep_terms = split_terms(ep.industries)
-        for ip in InvestorProfile.objects.select_related('user').all():
-            if ip.user.id in connected_ids or ip.user.id == request.user.id:
-                continue
-            if ep_terms and (split_terms(ip.preferred_industries) & ep_terms):
-                industry.append(ip.user)
+    connected_ids = graph.neighbor_ids(request.user.id)
+    connections = list(User.objects.filter(id__in=connected_ids).select_related(
+        'entrepreneur_profile', 'investor_profile'
+    ))
+
+    mutual = graph.suggest_mutuals(request.user, neighbors=connected_ids)
+
+    profile_model = InvestorProfile if request.user.role == 'investor' else EntrepreneurProfile
+    profile = profile_model.objects.get_or_create(user=request.user)[0]
+    industry = matching.industry_matches(request.user, profile, exclude=connected_ids)
 
     def to_json(u):
         return {
             'id': u.id,
             'name': u.get_full_name() or u.email,
             'role': u.role,
-            'avatar': img64(u),
+            'avatar': sized_url(u.profile_image_url, 64),
             'org': (getattr(getattr(u, 'entrepreneur_profile', None), 'company_name', '') if u.role == 'entrepreneur' else getattr(getattr(u, 'investor_profile', None), 'firm_name', ''))
         }
 
@@ -1248,14 +1058,18 @@ def investor_dashboard_offers(request):
 
 
 # Notification Views
+NOTIFICATION_PAGE_SIZE = 50
+
+
 @login_required
 def notifications_list(request):
-    """Display user's notifications"""
-    notifications = NotificationService.get_user_notifications(request.user, limit=100)
+    """Display user's notifications, a page at a time (the rest through get_notifications_data)"""
+    notifications, next_cursor = NotificationService.get_user_notifications(request.user, limit=NOTIFICATION_PAGE_SIZE)
     unread_count = NotificationService.get_unread_count(request.user)
     
     return render(request, 'Investors/notifications.html', {
         'notifications': notifications,
+        'next_cursor': next_cursor,
         'unread_count': unread_count,
         'user': request.user
     })
@@ -1293,27 +1107,37 @@ def get_unread_count(request):
 
 @login_required
 def get_notifications_data(request):
-    """Get notifications data for AJAX requests"""
-    notifications = NotificationService.get_user_notifications(request.user, limit=20)
-    unread_count = NotificationService.get_unread_count(request.user)
-    
-    notifications_data = []
-    for notification in notifications:
-        notifications_data.append({
-            'id': notification.id,
-            'type': notification.notification_type,
-            'title': notification.title,
-            'message': notification.message,
-            'sender_name': notification.sender.get_full_name() if notification.sender else None,
-            'time_ago': notification.time_ago,
-            'is_read': notification.is_read,
-            'related_object_id': notification.related_object_id,
-            'related_object_type': notification.related_object_type,
-        })
-    
+    """
+    Notifications as JSON. ``cursor`` pages back through older ones (the
+    response's ``next_cursor``); ``since`` is the newest notification id the
+    client has and returns only newer ones, oldest first, with ``has_more``
+    if it should ask again.
+    """
+    try:
+        since = int(request.GET['since']) if request.GET.get('since') else None
+        cursor = request.GET.get('cursor')
+        if since is not None and cursor:
+            raise ValueError('Pass either cursor or since, not both')
+        if since is not None:
+            notifications, has_more = NotificationService.get_notifications_since(
+                request.user, since, limit=NOTIFICATION_PAGE_SIZE
+            )
+            paging = {'has_more': has_more}
+        else:
+            notifications, next_cursor = NotificationService.get_user_notifications(
+                request.user, cursor=cursor, limit=NOTIFICATION_PAGE_SIZE
+            )
+            paging = {'next_cursor': next_cursor}
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     return JsonResponse({
-        'notifications': notifications_data,
-        'unread_count': unread_count
+        'notifications': [
+            dict(NotificationService.payload(notification), is_read=notification.is_read)
+            for notification in notifications
+        ],
+        'unread_count': NotificationService.get_unread_count(request.user),
+        **paging,
     })
 
 @login_required
@@ -1347,8 +1171,12 @@ def test_notification_redirect(request):
         'expected_behavior': 'Should redirect to messages page with open_chat parameter'
     })
 
+SEARCH_SUGGESTIONS = 5
+SEARCH_RESULTS = 50
+
+
 def search_users(request):
-    """Search users by name, email, or role"""
+    """Search users by name, email, organisation, startup, bio or industry"""
     if not request.user.is_authenticated:
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
@@ -1356,39 +1184,18 @@ def search_users(request):
     if not query or len(query) < 2:
         return JsonResponse({'users': [], 'total': 0})
     
-    # Search in User model (removed username since it doesn't exist)
-    users = User.objects.filter(
-        Q(first_name__icontains=query) | 
-        Q(last_name__icontains=query) | 
-        Q(email__icontains=query)
-    ).exclude(id=request.user.id)[:5]
+    # Ranked prefix matches from the full-text index (Entrepreneurs/search.py)
+    users, _ = search.search(query, exclude=request.user.id, limit=SEARCH_SUGGESTIONS)
     
     results = []
     for user in users:
-        # Get profile image for the user
-        profile_image = None
-        try:
-            if user.role == 'entrepreneur':
-                profile = getattr(user, 'entrepreneur_profile', None)
-                if profile and profile.image:
-                    import base64
-                    profile_image = 'data:image/jpeg;base64,' + base64.b64encode(profile.image).decode('utf-8')
-            elif user.role == 'investor':
-                profile = getattr(user, 'investor_profile', None)
-                if profile and profile.image:
-                    import base64
-                    profile_image = 'data:image/jpeg;base64,' + base64.b64encode(profile.image).decode('utf-8')
-        except Exception as e:
-            print(f"Error getting profile image for user {user.id}: {e}")
-            profile_image = None
-        
         user_data = {
             'id': user.id,
             'name': user.get_full_name() or user.email,
             'email': user.email,
             'role': user.role,
             'profile_url': f'/{user.role}/profile/{user.id}/' if user.role in ['investor', 'entrepreneur'] else '#',
-            'profile_image': profile_image
+            'profile_image': sized_url(user.profile_image_url, 64) or None
         }
         results.append(user_data)
     
@@ -1407,32 +1214,12 @@ def search_results_page(request):
     if not query:
         return redirect('home')
     
-    # Search in User model (removed username since it doesn't exist)
-    users = User.objects.filter(
-        Q(first_name__icontains=query) | 
-        Q(last_name__icontains=query) | 
-        Q(email__icontains=query)
-    ).exclude(id=request.user.id)
-    
-    # Get profile images for users
-    for user in users:
-        try:
-            if user.role == 'entrepreneur':
-                profile = getattr(user, 'entrepreneur_profile', None)
-                user.profile_image = profile.image if profile and profile.image else None
-            elif user.role == 'investor':
-                profile = getattr(user, 'investor_profile', None)
-                user.profile_image = profile.image if profile and profile.image else None
-            else:
-                user.profile_image = None
-        except Exception as e:
-            print(f"Error getting profile image for user {user.id}: {e}")
-            user.profile_image = None
+    users, total = search.search(query, exclude=request.user.id, limit=SEARCH_RESULTS)
     
     context = {
         'users': users,
         'query': query,
-        'total_results': users.count()
+        'total_results': total
     }
     
     return render(request, 'search_results.html', context)